@@ -100,9 +100,45 @@ export function adminUpload(file: File) {
     .catch((e) => {
       console.error(e)
       return Promise.reject(e)
-    }) as Promise<{ url: string }>
+    }) as Promise<{ url: string; deduplicated: boolean }>
 }
 
+export type ImportPreviewRow = { index: number; ok: boolean; errors: string[]; data: any }
+
+export type ImportPreviewOut = {
+  import_id: string | null
+  columns: string[]
+  rows: ImportPreviewRow[]
+  total_rows: number
+  ok_rows: number
+  error_rows: number
+  page: number
+  page_size: number
+}
+
+export type ImportJobOut = {
+  id: string
+  kind: 'preview' | 'commit'
+  status: 'queued' | 'running' | 'done' | 'failed'
+  import_id: string
+  filename: string | null
+  total_rows: number
+  processed_rows: number
+  ok_rows: number
+  error_rows: number
+  inserted: number
+  updated: number
+  skipped: number
+  rows_per_sec: number
+  attempts: number
+  error: string | null
+  error_samples: ImportPreviewRow[]
+  created_at: string
+  started_at: string | null
+  finished_at: string | null
+}
+
+// 上传后立即返回预览任务，解析进度用 adminImportJob 轮询
 export function adminUploadExcelPreview(file: File) {
   const fd = new FormData()
   fd.append('file', file)
@@ -116,5 +152,14 @@ export function adminUploadExcelPreview(file: File) {
     .catch((e) => {
       console.error(e)
       return Promise.reject(e)
-    }) as Promise<{ columns: string[]; rows: Array<{ index: number; ok: boolean; errors: string[]; data: any }>; total_rows: number }>
+    }) as Promise<ImportJobOut>
+}
+
+export function adminImportJob(jobId: string) {
+  return adminGet<ImportJobOut>(`/api/admin/import/jobs/${jobId}`)
+}
+
+export function adminImportRows(importId: string, params: { page: number; pageSize: number; status?: 'all' | 'error' }) {
+  const qs = `page=${params.page}&page_size=${params.pageSize}&status=${params.status || 'all'}`
+  return adminGet<ImportPreviewOut>(`/api/admin/import/${importId}/rows?${qs}`)
 }
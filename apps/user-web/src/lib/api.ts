@@ -12,15 +12,55 @@ export interface TeaItem {
   price_max: number | null
   intro: string | null
   cover_url: string
+  // 本地上传封面的缩略图（宽度升序），外链封面为空
+  cover_variants?: CoverVariant[]
   status: 'online' | 'offline'
   weight: number
 }
 
+export interface CoverVariant {
+  width: number
+  url: string
+}
+
+export function coverSrcset(tea: TeaItem) {
+  return (tea.cover_variants || []).map((v) => `${v.url} ${v.width}w`).join(', ') || undefined
+}
+
+// 图片加载失败：去掉 srcset 才能让兜底图生效
+export function onCoverError(e: Event) {
+  const img = e.target as HTMLImageElement
+  img.removeAttribute('srcset')
+  img.src = '/tea-mist.svg'
+}
+
+export interface FacetValueCount {
+  value: string
+  count: number
+}
+
+export interface FacetRangeCount {
+  min: number
+  max: number | null
+  count: number
+}
+
+export interface TeaFacets {
+  category: FacetValueCount[]
+  origin: FacetValueCount[]
+  spec: FacetValueCount[]
+  year: FacetRangeCount[]
+  price: FacetRangeCount[]
+}
+
 export interface TeaListResponse {
   items: TeaItem[]
   page: number
   page_size: number
-  total: number
+  total: number | null
+  next_cursor: string | null
+  session: string | null
+  facets: TeaFacets | null
 }
 
 const API_BASE = (import.meta as any).env?.VITE_API_BASE_URL || 'http://localhost:8000'
@@ -42,6 +82,15 @@ export function fetchTeas(params: {
   anonUserId?: string
   excludeIds?: number[]
   teaIds?: number[]
+  cursor?: string
+  session?: string
+  origin?: string
+  spec?: string
+  yearFrom?: number
+  yearTo?: number
+  priceMin?: number
+  priceMax?: number
+  withFacets?: boolean
 }) {
   const exclude = params.excludeIds?.length ? params.excludeIds.join(',') : undefined
   const teaIds = params.teaIds?.length ? params.teaIds.join(',') : undefined
@@ -51,7 +100,16 @@ export function fetchTeas(params: {
     page_size: params.pageSize,
     anon_user_id: params.anonUserId,
     exclude_ids: exclude,
-    tea_ids: teaIds
+    tea_ids: teaIds,
+    cursor: params.cursor,
+    session: params.session,
+    origin: params.origin,
+    spec: params.spec,
+    year_from: params.yearFrom,
+    year_to: params.yearTo,
+    price_min: params.priceMin,
+    price_max: params.priceMax,
+    with_facets: params.withFacets === false ? 'false' : undefined
   })}`
 
   return fetch(url)
@@ -76,6 +134,49 @@ export function postEvent(input: { anon_user_id: string; tea_id: number; type: '
     })
 }
 
+export type EventInput = { anon_user_id: string; tea_id: number; type: 'impression' | 'detail_open' }
+
+export function postEvents(items: EventInput[]) {
+  const url = `${API_BASE}/api/events/batch`
+  return fetch(url, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ items }),
+    keepalive: true
+  })
+    .then((r) => (r.ok ? r.json() : Promise.reject(r)))
+    .catch((e) => {
+      console.error(e)
+      return Promise.reject(e)
+    })
+}
+
+// 曝光事件先缓冲，攒够一批或定时后一次性上报
+const EVENT_FLUSH_SIZE = 50
+const EVENT_FLUSH_MS = 3000
+let eventBuffer: EventInput[] = []
+let eventTimer: ReturnType<typeof setTimeout> | undefined
+
+export function flushEvents() {
+  if (eventTimer) {
+    clearTimeout(eventTimer)
+    eventTimer = undefined
+  }
+  if (!eventBuffer.length) return Promise.resolve()
+  const items = eventBuffer
+  eventBuffer = []
+  return postEvents(items).catch(() => {})
+}
+
+export function queueEvent(input: EventInput) {
+  eventBuffer.push(input)
+  if (eventBuffer.length >= EVENT_FLUSH_SIZE) {
+    flushEvents()
+    return
+  }
+  if (!eventTimer) eventTimer = setTimeout(flushEvents, EVENT_FLUSH_MS)
+}
+
 export function postFeedback(input: { anon_user_id: string; tea_id: number; action: 'like' | 'dislike' }) {
   const url = `${API_BASE}/api/feedback`
   return fetch(url, {
@@ -1,34 +1,44 @@
 from __future__ import annotations
 
-import os
-from datetime import datetime
-from typing import List, Optional
-from uuid import uuid4
+from datetime import datetime, timedelta
+from typing import Optional
 
-import pandas as pd
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+import orjson
+from fastapi import APIRouter, Depends, File, HTTPException, Response, UploadFile
 from passlib.exc import UnknownHashError
-from sqlalchemy import func, select
+from sqlalchemy import case, func, select
 from sqlalchemy.orm import Session
 
 from app.api.deps import require_admin
 from app.core.config import get_settings
+from app.core.responses import FastJSONResponse, join_items
 from app.core.security import create_access_token, verify_password
-from app.db import get_db
-from app.models import Event, Feedback, Tea
+from app.db import get_db, get_read_db
+from app.models import DailyTeaStats, ImportJob, Tea, TeaStats, TeaTombstone
 from app.schemas import (
     DashboardRankOut,
-    DashboardRankRow,
     DashboardSummaryOut,
     ImportCommitIn,
+    ImportJobOut,
     ImportPreviewOut,
-    ImportPreviewRow,
     LoginIn,
     TeaBase,
     TeaListOut,
     TeaOut,
     TokenOut,
 )
+from app.services.catalog import catalog, row_dict, tea_columns, tea_dict, tea_fields
+from app.services.feed_session import served_recorder
+from app.services.generations import generations
+from app.services.images import cover_variants, variants
+from app.services.import_jobs import commit_items, import_jobs, rows_per_sec
+from app.services.importer import ImportFormatError, load_meta, purge_expired, read_page, save_upload
+from app.services.ranking import personal_prefs
+from app.services.search import fts_ready, search_hits
+from app.services.today_feedback import today_feedback
+from app.services.stats import day_key
+from app.services.uploads import UploadTooLarge, store_upload
+from app.services.writer import writer
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
 
@@ -71,41 +81,30 @@ def admin_list_teas(
     category: Optional[str] = None,
     page: int = 1,
     page_size: int = 20,
-    db: Session = Depends(get_db),
+    with_intro: bool = True,
+    db: Session = Depends(get_read_db),
 ):
-    q = select(Tea)
-    if keyword:
-        q = q.where(Tea.name.like(f"%{keyword}%"))
+    fields = tea_fields(with_intro)
+    q = select(*tea_columns(fields))
+    order = [Tea.updated_at.desc(), Tea.id.desc()]
+    if keyword and keyword.strip():
+        # 全文索引检索名称/产地/规格/简介，按相关度排序
+        hits = search_hits(keyword, fts_ready(db.connection()))
+        q = q.join(hits, hits.c.id == Tea.id)
+        order = [hits.c.rank, *order]
     if status:
         q = q.where(Tea.status == status)
     if category:
         q = q.where(Tea.category == category)
 
-    q = q.order_by(Tea.updated_at.desc(), Tea.id.desc())
+    q = q.order_by(*order)
 
     total = db.execute(select(func.count()).select_from(q.subquery())).scalar_one()
-    rows = db.execute(q.offset((page - 1) * page_size).limit(page_size)).scalars().all()
-
-    items = [
-        TeaOut(
-            id=r.id,
-            name=r.name,
-            category=r.category,
-            year=r.year,
-            origin=r.origin,
-            spec=r.spec,
-            price_min=r.price_min,
-            price_max=r.price_max,
-            intro=r.intro,
-            cover_url=r.cover_url,
-            status=r.status,
-            weight=r.weight,
-            created_at=r.created_at,
-            updated_at=r.updated_at,
-        )
-        for r in rows
-    ]
-    return TeaListOut(items=items, page=page, page_size=page_size, total=total)
+    rows = db.execute(q.offset((page - 1) * page_size).limit(page_size)).all()
+
+    # 投影查询的元组直接编码，不经 ORM 对象和 TeaOut
+    items = [row_dict(r, fields) for r in rows]
+    return FastJSONResponse({"items": items, "page": page, "page_size": page_size, "total": total})
 
 
 @router.post("/teas", response_model=TeaOut, dependencies=[Depends(require_admin)])
@@ -129,22 +128,9 @@ def admin_create_tea(body: TeaBase, db: Session = Depends(get_db)):
     db.add(tea)
     db.commit()
     db.refresh(tea)
-    return TeaOut(
-        id=tea.id,
-        name=tea.name,
-        category=tea.category,
-        year=tea.year,
-        origin=tea.origin,
-        spec=tea.spec,
-        price_min=tea.price_min,
-        price_max=tea.price_max,
-        intro=tea.intro,
-        cover_url=tea.cover_url,
-        status=tea.status,
-        weight=tea.weight,
-        created_at=tea.created_at,
-        updated_at=tea.updated_at,
-    )
+    catalog.bump()
+    variants.ensure([tea.cover_url])
+    return FastJSONResponse(tea_dict(tea))
 
 
 @router.put("/teas/{tea_id}", response_model=TeaOut, dependencies=[Depends(require_admin)])
@@ -169,23 +155,10 @@ def admin_update_tea(tea_id: int, body: TeaBase, db: Session = Depends(get_db)):
     db.add(tea)
     db.commit()
     db.refresh(tea)
+    catalog.bump()
+    variants.ensure([tea.cover_url])
 
-    return TeaOut(
-        id=tea.id,
-        name=tea.name,
-        category=tea.category,
-        year=tea.year,
-        origin=tea.origin,
-        spec=tea.spec,
-        price_min=tea.price_min,
-        price_max=tea.price_max,
-        intro=tea.intro,
-        cover_url=tea.cover_url,
-        status=tea.status,
-        weight=tea.weight,
-        created_at=tea.created_at,
-        updated_at=tea.updated_at,
-    )
+    return FastJSONResponse(tea_dict(tea))
 
 
 @router.delete("/teas/{tea_id}", dependencies=[Depends(require_admin)])
@@ -195,111 +168,113 @@ def admin_delete_tea(tea_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail={"code": "not_found", "message": "tea not found"})
 
     db.delete(tea)
+    # 同一事务写墓碑，增量同步据此通知客户端删除
+    db.merge(TeaTombstone(tea_id=tea_id, deleted_at=datetime.utcnow()))
     db.commit()
+    catalog.bump()
     return {"ok": True}
 
 
 @router.post("/upload", dependencies=[Depends(require_admin)])
 def admin_upload(file: UploadFile = File(...)):
-    uploads_dir = os.path.join(os.path.dirname(__file__), "..", "..", "data", "uploads")
-    os.makedirs(uploads_dir, exist_ok=True)
-
-    ext = os.path.splitext(file.filename or "")[1].lower() or ".bin"
-    name = f"{uuid4().hex}{ext}"
-    path = os.path.join(uploads_dir, name)
+    """图片按内容 sha256 命名存储：边读边写边算摘要，同样的图片重复上传返回已有地址。
 
-    content = file.file.read()
-    with open(path, "wb") as f:
-        f.write(content)
+    缩略图变体交给进程池在后台生成，不等结果。
+    """
+    try:
+        name, created = store_upload(file.file, file.filename, get_settings().upload_max_bytes)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail={"code": "payload_too_large", "message": str(e)})
+    url = f"/uploads/{name}"
+    variants.ensure([url])
+    return {"url": url, "deduplicated": not created, "variants": cover_variants(url)}
 
-    return {"url": f"/uploads/{name}"}
 
+IMPORT_PAGE_SIZE_MAX = 500
+IMPORT_STATUSES = ("all", "error")
+# 预览任务详情里附带的失败行样例条数
+IMPORT_ERROR_SAMPLES = 20
 
-@router.post("/import/excel", response_model=ImportPreviewOut, dependencies=[Depends(require_admin)])
-def import_excel(file: UploadFile = File(...)):
-    df = pd.read_excel(file.file)
 
-    required = ["名称", "分类", "年份", "产地", "规格", "主图URL"]
-    cols = list(df.columns)
-    missing = [c for c in required if c not in cols]
-    if missing:
-        raise HTTPException(status_code=400, detail={"code": "bad_request", "message": f"missing columns: {missing}"})
+def _load_import(import_id: str) -> dict:
+    try:
+        return load_meta(import_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail={"code": "not_found", "message": "import not found or expired"})
+
+
+def _preview_page(meta: dict, page: int, page_size: int, status: str) -> FastJSONResponse:
+    if page < 1 or page_size < 1 or page_size > IMPORT_PAGE_SIZE_MAX or status not in IMPORT_STATUSES:
+        raise HTTPException(status_code=400, detail={"code": "bad_request", "message": "invalid pagination"})
+    # 暂存行本身就是编码好的 JSON，直接拼接
+    lines = read_page(meta, (page - 1) * page_size, page_size, status)
+    body = join_items(
+        "rows",
+        lines,
+        import_id=meta["import_id"],
+        columns=meta["columns"],
+        total_rows=meta["total_rows"],
+        ok_rows=meta["ok_rows"],
+        error_rows=meta["error_rows"],
+        page=page,
+        page_size=page_size,
+    )
+    return FastJSONResponse(body)
 
-    rows: List[ImportPreviewRow] = []
-    for idx, row in df.iterrows():
-        errors: List[str] = []
-        name = str(row.get("名称") or "").strip()
-        category = str(row.get("分类") or "").strip()
-        origin = str(row.get("产地") or "").strip()
-        spec = str(row.get("规格") or "").strip()
-        cover_url = str(row.get("主图URL") or "").strip()
 
-        year_raw = row.get("年份")
+def _job_out(db: Session, job_id: str) -> ImportJobOut:
+    job = db.get(ImportJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail={"code": "not_found", "message": "import job not found"})
+    samples = []
+    if job.kind == "preview" and job.status == "done" and job.error_rows:
         try:
-            year = int(year_raw)
-        except Exception:
-            year = 0
-
-        if not name:
-            errors.append("名称必填")
-        if not category:
-            errors.append("分类必填")
-        if year <= 0:
-            errors.append("年份必须为数字")
-        if not origin:
-            errors.append("产地必填")
-        if not spec:
-            errors.append("规格必填")
-        if not cover_url:
-            errors.append("主图URL必填")
-
-        if errors:
-            rows.append(ImportPreviewRow(index=int(idx), ok=False, errors=errors, data=None))
-            continue
-
-        base = TeaBase(
-            name=name,
-            category=category,
-            year=year,
-            origin=origin,
-            spec=spec,
-            price_min=int(row.get("价格下限")) if str(row.get("价格下限") or "").strip() else None,
-            price_max=int(row.get("价格上限")) if str(row.get("价格上限") or "").strip() else None,
-            intro=str(row.get("简介") or "").strip() or None,
-            cover_url=cover_url,
-            status="online",
-            weight=0,
-        )
-        rows.append(ImportPreviewRow(index=int(idx), ok=True, errors=[], data=base))
+            samples = [orjson.loads(line) for line in read_page(load_meta(job.import_id), 0, IMPORT_ERROR_SAMPLES, "error")]
+        except KeyError:
+            pass
+    values = {c.name: getattr(job, c.name) for c in ImportJob.__table__.columns}
+    return ImportJobOut(**values, rows_per_sec=rows_per_sec(job), error_samples=samples)
+
+
+@router.post("/import/excel", response_model=ImportJobOut, status_code=202, dependencies=[Depends(require_admin)])
+def import_excel(file: UploadFile = File(...), db: Session = Depends(get_read_db)):
+    """上传文件落到暂存目录后立即返回预览任务；解析、校验在后台任务里跑，用 /import/jobs/{id} 轮询"""
+    ttl = get_settings().import_staging_ttl_seconds
+    purge_expired(ttl)
+    import_jobs.purge(ttl)
+    try:
+        import_id = save_upload(file.file, file.filename, get_settings().import_max_bytes)
+    except ImportFormatError as e:
+        raise HTTPException(status_code=400, detail={"code": "bad_request", "message": str(e)})
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail={"code": "payload_too_large", "message": str(e)})
+    return _job_out(db, import_jobs.create("preview", import_id, file.filename).id)
+
+
+@router.get("/import/jobs/{job_id}", response_model=ImportJobOut, dependencies=[Depends(require_admin)])
+def import_job(job_id: str, db: Session = Depends(get_read_db)):
+    """任务进度：已处理行数、成功/失败行数、写入计数、吞吐；预览完成后带前几条失败行"""
+    return _job_out(db, job_id)
 
-    return ImportPreviewOut(columns=cols, rows=rows, total_rows=len(df.index))
+
+@router.get("/import/{import_id}/rows", response_model=ImportPreviewOut, dependencies=[Depends(require_admin)])
+def import_preview_rows(import_id: str, page: int = 1, page_size: int = 100, status: str = "all"):
+    """翻页查看暂存的预览行；status=error 时只看失败行"""
+    return _preview_page(_load_import(import_id), page, page_size, status)
 
 
 @router.post("/import/commit", dependencies=[Depends(require_admin)])
-def import_commit(body: ImportCommitIn, db: Session = Depends(get_db)):
-    now = datetime.utcnow()
-    ok = 0
-    for item in body.items:
-        tea = Tea(
-            name=item.name,
-            category=item.category,
-            year=item.year,
-            origin=item.origin,
-            spec=item.spec,
-            price_min=item.price_min,
-            price_max=item.price_max,
-            intro=item.intro,
-            cover_url=item.cover_url,
-            status=item.status,
-            weight=item.weight,
-            created_at=now,
-            updated_at=now,
-        )
-        db.add(tea)
-        ok += 1
+def import_commit(body: ImportCommitIn, response: Response, db: Session = Depends(get_read_db)):
+    if body.import_id:
+        # 整份预览的导入放到后台任务里按批 upsert，立即返回任务
+        meta = _load_import(body.import_id)
+        job = import_jobs.create("commit", meta["import_id"], meta["filename"], total_rows=meta["ok_rows"])
+        response.status_code = 202
+        return _job_out(db, job.id)
 
-    db.commit()
-    return {"ok": True, "inserted": ok}
+    # 兼容旧用法：items 随请求体传来、量小，直接在请求里写入
+    report = commit_items(item.model_dump() for item in body.items)
+    return {"ok": True, **report}
 
 
 def _parse_range(from_: Optional[str], to: Optional[str]):
@@ -319,129 +294,151 @@ def _parse_range(from_: Optional[str], to: Optional[str]):
         raise HTTPException(status_code=400, detail={"code": "bad_request", "message": "invalid range"})
 
     # end 为当天 23:59:59 的上界：用 +1 day 的开区间
-    end_exclusive = end + pd.Timedelta(days=1)
-    return start, end_exclusive.to_pydatetime()
+    return start, end + timedelta(days=1)
+
+
+def _day_range(start: datetime, end: datetime):
+    # daily_tea_stats.day 为 YYYY-MM-DD，end 为开区间
+    return day_key(start), day_key(end)
 
 
 @router.get("/dashboard/summary", response_model=DashboardSummaryOut, dependencies=[Depends(require_admin)])
-def dashboard_summary(from_: Optional[str] = None, to: Optional[str] = None, db: Session = Depends(get_db)):
+def dashboard_summary(from_: Optional[str] = None, to: Optional[str] = None, db: Session = Depends(get_read_db)):
     start, end = _parse_range(from_, to)
 
-    ev_q = select(func.count()).select_from(Event).where(Event.type == "impression")
-    fb_like_q = select(func.count()).select_from(Feedback).where(Feedback.action == "like")
-    fb_dislike_q = select(func.count()).select_from(Feedback).where(Feedback.action == "dislike")
-
     if start and end:
-        ev_q = ev_q.where(Event.created_at >= start).where(Event.created_at < end)
-        fb_like_q = fb_like_q.where(Feedback.created_at >= start).where(Feedback.created_at < end)
-        fb_dislike_q = fb_dislike_q.where(Feedback.created_at >= start).where(Feedback.created_at < end)
+        d0, d1 = _day_range(start, end)
+        q = (
+            select(func.sum(DailyTeaStats.pv), func.sum(DailyTeaStats.likes), func.sum(DailyTeaStats.dislikes))
+            .where(DailyTeaStats.day >= d0)
+            .where(DailyTeaStats.day < d1)
+        )
+    else:
+        q = select(func.sum(TeaStats.pv), func.sum(TeaStats.likes), func.sum(TeaStats.dislikes))
 
-    pv = db.execute(ev_q).scalar_one()
-    likes = db.execute(fb_like_q).scalar_one()
-    dislikes = db.execute(fb_dislike_q).scalar_one()
+    pv, likes, dislikes = (int(x or 0) for x in db.execute(q).one())
     like_rate = (likes / pv) if pv else None
     return DashboardSummaryOut(pv=pv, likes=likes, dislikes=dislikes, like_rate=like_rate)
 
 
-@router.get("/dashboard/rank", response_model=DashboardRankOut, dependencies=[Depends(require_admin)])
-def dashboard_rank(sort: str = "like_rate", from_: Optional[str] = None, to: Optional[str] = None, db: Session = Depends(get_db)):
-    start, end = _parse_range(from_, to)
+def _rank_counts(start: Optional[datetime], end: Optional[datetime]):
+    """返回 (pv, likes, dislikes, joins)：计数列以及需要按 tea_id outer join 到 Tea 的来源"""
+    if not (start and end):
+        # 全量区间直接读增量维护的 tea_stats
+        return TeaStats.pv, TeaStats.likes, TeaStats.dislikes, [(TeaStats, TeaStats.tea_id)]
 
-    teas = db.execute(select(Tea).where(Tea.status == "online")).scalars().all()
+    d0, d1 = _day_range(start, end)
+    daily = (
+        select(
+            DailyTeaStats.tea_id.label("tea_id"),
+            func.sum(DailyTeaStats.pv).label("pv"),
+            func.sum(DailyTeaStats.likes).label("likes"),
+            func.sum(DailyTeaStats.dislikes).label("dislikes"),
+        )
+        .where(DailyTeaStats.day >= d0)
+        .where(DailyTeaStats.day < d1)
+        .group_by(DailyTeaStats.tea_id)
+        .subquery()
+    )
+    return daily.c.pv, daily.c.likes, daily.c.dislikes, [(daily, daily.c.tea_id)]
 
-    items: List[DashboardRankRow] = []
-    for t in teas:
-        pv_q = select(func.count()).select_from(Event).where(Event.tea_id == t.id).where(Event.type == "impression")
-        like_q = select(func.count()).select_from(Feedback).where(Feedback.tea_id == t.id).where(Feedback.action == "like")
-        dislike_q = select(func.count()).select_from(Feedback).where(Feedback.tea_id == t.id).where(Feedback.action == "dislike")
 
-        if start and end:
-            pv_q = pv_q.where(Event.created_at >= start).where(Event.created_at < end)
-            like_q = like_q.where(Feedback.created_at >= start).where(Feedback.created_at < end)
-            dislike_q = dislike_q.where(Feedback.created_at >= start).where(Feedback.created_at < end)
+RANK_SORTS = ("like_rate", "created_at", "pv", "likes", "dislikes")
 
-        pv = db.execute(pv_q).scalar_one()
-        likes = db.execute(like_q).scalar_one()
-        dislikes = db.execute(dislike_q).scalar_one()
-        like_rate = (likes / pv) if pv else None
 
-        items.append(
-            DashboardRankRow(
-                tea=TeaOut(
-                    id=t.id,
-                    name=t.name,
-                    category=t.category,
-                    year=t.year,
-                    origin=t.origin,
-                    spec=t.spec,
-                    price_min=t.price_min,
-                    price_max=t.price_max,
-                    intro=t.intro,
-                    cover_url=t.cover_url,
-                    status=t.status,
-                    weight=t.weight,
-                    created_at=t.created_at,
-                    updated_at=t.updated_at,
-                ),
-                pv=pv,
-                likes=likes,
-                dislikes=dislikes,
-                like_rate=like_rate,
-            )
-        )
+@router.get("/dashboard/rank", response_model=DashboardRankOut, dependencies=[Depends(require_admin)])
+def dashboard_rank(
+    sort: str = "like_rate",
+    from_: Optional[str] = None,
+    to: Optional[str] = None,
+    limit: int = 50,
+    offset: int = 0,
+    with_intro: bool = False,
+    db: Session = Depends(get_read_db),
+):
+    if limit < 1 or limit > 200 or offset < 0:
+        raise HTTPException(status_code=400, detail={"code": "bad_request", "message": "invalid pagination"})
+    if sort not in RANK_SORTS:
+        raise HTTPException(status_code=400, detail={"code": "bad_request", "message": "invalid sort"})
 
-    if sort == "created_at":
-        items.sort(key=lambda x: x.tea.created_at, reverse=True)
-    else:
-        items.sort(key=lambda x: (x.like_rate or 0.0), reverse=True)
+    start, end = _parse_range(from_, to)
+    pv_col, likes_col, dislikes_col, joins = _rank_counts(start, end)
 
-    return DashboardRankOut(items=items)
+    pv = func.coalesce(pv_col, 0)
+    likes = func.coalesce(likes_col, 0)
+    dislikes = func.coalesce(dislikes_col, 0)
+
+    fields = tea_fields(with_intro)
+    q = select(*tea_columns(fields), pv.label("pv"), likes.label("likes"), dislikes.label("dislikes")).where(
+        Tea.status == "online"
+    )
+    for target, tea_id_col in joins:
+        q = q.outerjoin(target, tea_id_col == Tea.id)
+
+    # 一次 GROUP BY 聚合 + 数据库内排序分页，不再逐条 COUNT
+    if sort == "created_at":
+        q = q.order_by(Tea.created_at.desc(), Tea.id.asc())
+    elif sort in ("pv", "likes", "dislikes"):
+        q = q.order_by({"pv": pv, "likes": likes, "dislikes": dislikes}[sort].desc(), Tea.id.asc())
+    else:  # like_rate
+        like_rate_expr = case((pv > 0, likes * 1.0 / pv), else_=0.0)
+        q = q.order_by(like_rate_expr.desc(), Tea.id.asc())
+
+    total = db.execute(select(func.count()).select_from(Tea).where(Tea.status == "online")).scalar_one()
+    rows = db.execute(q.offset(offset).limit(limit)).all()
+
+    n = len(fields)
+    items = []
+    for row in rows:
+        row_pv, row_likes, row_dislikes = row[n:]
+        items.append(
+            {
+                "tea": row_dict(row, fields),
+                "pv": row_pv,
+                "likes": row_likes,
+                "dislikes": row_dislikes,
+                "like_rate": (row_likes / row_pv) if row_pv else None,
+            }
+        )
+    return FastJSONResponse({"items": items, "total": total})
 
 
 @router.get("/dashboard/trend", dependencies=[Depends(require_admin)])
-def dashboard_trend(from_: str, to: str, db: Session = Depends(get_db)):
+def dashboard_trend(from_: str, to: str, db: Session = Depends(get_read_db)):
     start, end = _parse_range(from_, to)
 
     if not start or not end:
         raise HTTPException(status_code=400, detail={"code": "bad_request", "message": "from/to required"})
 
-    # SQLite 的 date() 输出 YYYY-MM-DD
-    pv_rows = db.execute(
-        select(func.date(Event.created_at).label("d"), func.count())
-        .select_from(Event)
-        .where(Event.type == "impression")
-        .where(Event.created_at >= start)
-        .where(Event.created_at < end)
-        .group_by("d")
-    ).all()
-
-    like_rows = db.execute(
-        select(func.date(Feedback.created_at).label("d"), func.count())
-        .select_from(Feedback)
-        .where(Feedback.action == "like")
-        .where(Feedback.created_at >= start)
-        .where(Feedback.created_at < end)
-        .group_by("d")
+    d0, d1 = _day_range(start, end)
+    rows = db.execute(
+        select(DailyTeaStats.day, func.sum(DailyTeaStats.pv), func.sum(DailyTeaStats.likes), func.sum(DailyTeaStats.dislikes))
+        .where(DailyTeaStats.day >= d0)
+        .where(DailyTeaStats.day < d1)
+        .group_by(DailyTeaStats.day)
     ).all()
-
-    dislike_rows = db.execute(
-        select(func.date(Feedback.created_at).label("d"), func.count())
-        .select_from(Feedback)
-        .where(Feedback.action == "dislike")
-        .where(Feedback.created_at >= start)
-        .where(Feedback.created_at < end)
-        .group_by("d")
-    ).all()
-
-    pv_map = {d: c for d, c in pv_rows}
-    like_map = {d: c for d, c in like_rows}
-    dislike_map = {d: c for d, c in dislike_rows}
+    by_day = {d: (pv, likes, dislikes) for d, pv, likes, dislikes in rows}
 
     points = []
     cursor = start
     while cursor < end:
         d = cursor.strftime("%Y-%m-%d")
-        points.append({"date": d, "pv": int(pv_map.get(d, 0)), "likes": int(like_map.get(d, 0)), "dislikes": int(dislike_map.get(d, 0))})
-        cursor = cursor + pd.Timedelta(days=1)
+        pv, likes, dislikes = by_day.get(d, (0, 0, 0))
+        points.append({"date": d, "pv": int(pv), "likes": int(likes), "dislikes": int(dislikes)})
+        cursor = cursor + timedelta(days=1)
 
     return {"points": points}
+
+
+@router.get("/metrics", dependencies=[Depends(require_admin)])
+def admin_metrics():
+    return {
+        "writer": writer.stats(),
+        "import_jobs": import_jobs.stats(),
+        "feed_sessions": served_recorder.stats(),
+        "images": variants.stats(),
+        "catalog": catalog.stats(),
+        "today_feedback": today_feedback.stats(),
+        "personal_prefs": personal_prefs.stats(),
+        "generations": generations.snapshot(),
+    }
@@ -1,14 +1,15 @@
 from __future__ import annotations
 
-from fastapi import Depends, HTTPException, Request
-from sqlalchemy.orm import Session
+from fastapi import HTTPException, Request
 
 from app.core.config import get_settings
-from app.core.security import decode_token
-from app.db import get_db
+from app.core.security import VerifiedTokenCache, verify_token
 
+# 后台看板会并发发出大量请求，验签结果缓存到 token 过期
+token_cache = VerifiedTokenCache(maxsize=1024)
 
-def require_admin(request: Request, db: Session = Depends(get_db)):
+
+def require_admin(request: Request):
     settings = get_settings()
     auth = request.headers.get("Authorization", "")
     if not auth.startswith("Bearer "):
@@ -16,11 +17,10 @@ def require_admin(request: Request, db: Session = Depends(get_db)):
 
     token = auth.removeprefix("Bearer ").strip()
     try:
-        payload = decode_token(token, settings.jwt_secret)
+        sub = verify_token(token, settings.jwt_secret, token_cache)
     except Exception:
         raise HTTPException(status_code=401, detail={"code": "unauthorized", "message": "invalid token"})
 
-    sub = payload.get("sub")
     if sub != settings.admin_username:
         raise HTTPException(status_code=401, detail={"code": "unauthorized", "message": "invalid subject"})
 
@@ -1,38 +1,146 @@
 from __future__ import annotations
 
+import base64
+import json
 from datetime import datetime, timedelta
-from typing import Optional, Tuple
+from typing import AbstractSet, Dict, List, Optional, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import func, select
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import func, insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 
-from app.db import get_db
+from app.core.config import get_settings
+from app.core.http_cache import make_etag, not_modified, not_modified_response, set_cache_headers
+from app.core.responses import FastJSONResponse, join_items
+from app.db import get_read_db
 from app.models import Event, Feedback, MessageFeedback, Tea
-from app.schemas import FeedbackIn, MessageFeedbackIn, TeaListOut, TeaOut, EventIn
+from app.schemas import EventBatchIn, FeedbackIn, MessageFeedbackIn, TeaChangesOut, TeaListOut, TeaOut, TeaSearchOut, EventIn
+from app.services.catalog import TeaRecord, catalog, tea_changes_query, tea_columns, tombstones_query
+from app.services.facets import FacetFilter
+from app.services.feed_session import ServedSet, new_token, served_recorder
+from app.services.generations import generations
+from app.services.ranking import SortKey, personal_prefs, ranking_engine
+from app.services.search import fts_ready, search_hits
+from app.services.stats import apply_stat_deltas, day_key, feedback_delta
+from app.services.today_feedback import today_feedback
+from app.services.writer import writer
 
 router = APIRouter(prefix="/api", tags=["public"])
 
+EVENT_TYPES = {"impression", "detail_open"}
 
-def _today_range() -> Tuple[datetime, datetime]:
-    now = datetime.utcnow()
-    start = datetime(now.year, now.month, now.day)
-    end = start + timedelta(days=1)
-    return start, end
+# list_teas 的 session 取此值时新建 feed 会话
+NEW_SESSION = "new"
+
+
+def _public_cache_control() -> str:
+    return f"public, max-age={get_settings().http_cache_max_age_seconds}"
+
+
+# 带 anon_user_id 的 feed 因人而异，只允许浏览器缓存并每次回源校验
+PRIVATE_CACHE_CONTROL = "private, no-cache"
+# feed 会话的响应随翻页推进，不可缓存
+NO_STORE_CACHE_CONTROL = "no-store"
+
+
+_EPOCH = datetime(1970, 1, 1)
+
+# 增量同步的 since 往回留一点余量：并发的后台写入可能晚提交、时间戳却更早，
+# 在余量窗口内的变更会重复下发一次（客户端按 id 覆盖，幂等）
+CHANGES_OVERLAP = timedelta(seconds=2)
+
+
+def _to_marker(dt: datetime) -> int:
+    # 微秒级 UTC 时间戳，避免与库里的微秒精度比较时反复命中同一条
+    return (dt - _EPOCH) // timedelta(microseconds=1)
+
+
+# datetime 能表示的最大时间对应的标记，更大的 since 无法换算
+_MAX_MARKER = _to_marker(datetime.max)
+
+
+def _from_marker(marker: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=marker)
+
+
+def _encode_cursor(key: SortKey) -> str:
+    raw = json.dumps(list(key), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> SortKey:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        score, created_ts, tea_id = json.loads(raw)
+        return float(score), float(created_ts), int(tea_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail={"code": "bad_request", "message": "invalid cursor"})
+
+
+def _feed_etag_parts(
+    anon_user_id: Optional[str],
+    page: int,
+    page_size: int,
+    cursor: Optional[str],
+    with_total: bool,
+    with_intro: bool,
+    with_facets: bool,
+    flt: FacetFilter,
+    exclude: AbstractSet[int],
+    include: AbstractSet[int],
+) -> tuple:
+    """feed ETag 中除打分数组摘要外的部分，只读共享内存里的代数，不查库。
+
+    代数在处理请求之前读取：处理期间发生的写入只会让响应比 ETag 代表的版本更新，不会更旧。
+    带 anon_user_id 时今日已反馈、个人偏好取决于反馈代数与当天日期。
+    """
+    parts: tuple = ("feed", catalog.version, page, page_size, cursor, with_total, with_intro, with_facets, flt)
+    parts += (",".join(map(str, sorted(exclude))), ",".join(map(str, sorted(include))))
+    if anon_user_id:
+        parts += (anon_user_id, generations.get("feedback"), day_key(datetime.utcnow()))
+    return parts
 
 
 @router.get("/teas", response_model=TeaListOut)
 def list_teas(
+    request: Request,
     category: Optional[str] = None,
     page: int = 1,
     page_size: int = 10,
     anon_user_id: Optional[str] = None,
     exclude_ids: Optional[str] = None,
     tea_ids: Optional[str] = None,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    with_total: bool = False,
+    session: Optional[str] = None,
+    with_intro: bool = True,
+    origin: Optional[str] = None,
+    spec: Optional[str] = None,
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+    price_min: Optional[int] = None,
+    price_max: Optional[int] = None,
+    with_facets: bool = True,
+    db: Session = Depends(get_read_db),
 ):
     if page < 1 or page_size < 1 or page_size > 50:
         raise HTTPException(status_code=400, detail={"code": "bad_request", "message": "invalid pagination"})
+    if (year_from is not None and year_to is not None and year_from > year_to) or (
+        price_min is not None and price_max is not None and price_min > price_max
+    ):
+        raise HTTPException(status_code=400, detail={"code": "bad_request", "message": "invalid filter range"})
+    flt = FacetFilter(
+        category=category or None,
+        origin=origin or None,
+        spec=spec or None,
+        year_from=year_from,
+        year_to=year_to,
+        price_min=price_min,
+        price_max=price_max,
+    )
+
+    after = _decode_cursor(cursor) if cursor else None
 
     exclude: set[int] = set()
     if exclude_ids:
@@ -56,122 +164,266 @@ def list_teas(
             except ValueError:
                 continue
 
-    q = select(Tea).where(Tea.status == "online")
-    if category:
-        q = q.where(Tea.category == category)
-
+    # feed 会话：session=new 新建，之后带上返回的 token，已下发的条目由服务端排除；指定 tea_ids 时不使用
     if include:
-        q = q.where(Tea.id.in_(include))
+        session = None
+
+    # 条件请求：ETag 只由目录 / 反馈代数、打分数组摘要和请求参数决定，先于一切查询计算，
+    # 缓存仍有效时不碰数据库。feed 会话每次翻页内容都不同（已下发的被排除），不做条件请求。
+    etag_parts: Optional[tuple] = None
+    etag: Optional[str] = None
+    if session:
+        cache_control = NO_STORE_CACHE_CONTROL
     else:
-        # 只有在没有指定tea_ids时才排除今日已反馈的茶叶
-        if anon_user_id:
-            start, end = _today_range()
-            sub = (
-                select(Feedback.tea_id)
-                .where(Feedback.anon_user_id == anon_user_id)
-                .where(Feedback.created_at >= start)
-                .where(Feedback.created_at < end)
-            )
-            q = q.where(Tea.id.not_in(sub))
-
-    if exclude:
-        q = q.where(Tea.id.not_in(exclude))
-
-    # 排序：weight desc, created_at desc（推荐打分会在后续迭代扩展）
-    q = q.order_by(Tea.weight.desc(), Tea.created_at.desc())
-
-    total = db.execute(select(func.count()).select_from(q.subquery())).scalar_one()
-
-    offset = (page - 1) * page_size
-    rows = db.execute(q.offset(offset).limit(page_size)).scalars().all()
-
-    items = [
-        TeaOut(
-            id=r.id,
-            name=r.name,
-            category=r.category,
-            year=r.year,
-            origin=r.origin,
-            spec=r.spec,
-            price_min=r.price_min,
-            price_max=r.price_max,
-            intro=r.intro,
-            cover_url=r.cover_url,
-            status=r.status,
-            weight=r.weight,
-            created_at=r.created_at,
-            updated_at=r.updated_at,
+        cache_control = PRIVATE_CACHE_CONTROL if anon_user_id else _public_cache_control()
+        etag_parts = _feed_etag_parts(
+            anon_user_id, page, page_size, cursor, with_total, with_intro, with_facets, flt, exclude, include
         )
-        for r in rows
-    ]
+        cached = ranking_engine.peek()
+        if cached is not None:
+            etag = make_etag(*etag_parts, cached.digest)
+            if not_modified(request, etag):
+                return not_modified_response(etag, cache_control)
+
+    today_ids: AbstractSet[int] = frozenset()
+    if not include and anon_user_id:
+        # 只有在没有指定tea_ids时才排除今日已反馈的茶叶（内存索引，不走 SQL）
+        today_ids = today_feedback.tea_ids(db, anon_user_id)
+
+    served: Optional[ServedSet] = None
+    new_session = False
+    if session:
+        if session != NEW_SESSION:
+            served = served_recorder.load(db, session, anon_user_id)
+        if served is None:
+            # 新建，或旧会话已过期 / 不属于该用户
+            session, served, new_session = new_token(), ServedSet(), True
 
-    return TeaListOut(items=items, page=page, page_size=page_size, total=total)
+    # 分面筛选与计数都取自目录快照上的分面索引，不走 SQL
+    snap = catalog.get(db)
+    allowed = snap.facets.match(flt) if flt.narrows() else None
+    facets = snap.facets.counts(flt) if with_facets else None
+
+    # 排序：score = weight + 100*likeRate + personal_boost + recency_boost（docs/design.md §4.2）
+    arrays = ranking_engine.get(db)
+    prefs = personal_prefs.get(anon_user_id) if anon_user_id else None
+    result = arrays.rank(
+        category=flt.category,
+        include=include or None,
+        exclude=exclude | today_ids,
+        served=served.bits if served is not None else None,
+        allowed=allowed,
+        prefs=prefs,
+        after=after,
+        offset=0 if (after is not None or served is not None) else (page - 1) * page_size,
+        limit=page_size,
+    )
+
+    # 本页内容直接取自内存目录快照，不再回表
+    records = [rec for rec in map(snap.get, result.ids) if rec is not None]
+
+    # 游标模式下 total 仅在 with_total=true 时返回
+    total = result.total if (cursor is None or with_total) else None
+    next_cursor = _encode_cursor(result.next_key) if result.next_key else None
+
+    if etag_parts is not None:
+        # 打分数组按 TTL 重建后摘要不变（统计没变）时仍能命中
+        etag = make_etag(*etag_parts, arrays.digest)
+        if not_modified(request, etag):
+            return not_modified_response(etag, cache_control)
+
+    if session:
+        # 交给单写线程后立即返回，不等组提交
+        served_recorder.record(session, anon_user_id, result.ids, get_settings().feed_session_ttl_seconds, new_session)
+
+    # 条目直接拼接快照里预编码好的 JSON
+    body = join_items(
+        "items",
+        (rec.to_json(with_intro) for rec in records),
+        page=page,
+        page_size=page_size,
+        total=total,
+        next_cursor=next_cursor,
+        session=session,
+        facets=facets,
+    )
+    response = FastJSONResponse(body)
+    if etag is not None:
+        set_cache_headers(response, etag, cache_control)
+    else:
+        response.headers["Cache-Control"] = cache_control
+    return response
+
+
+def search_query(hits):
+    return select(Tea.id).join(hits, hits.c.id == Tea.id).where(Tea.status == "online")
+
+
+def search_page_query(hits):
+    # 带窗口计数：本页与总数出自同一条语句（同一读快照）
+    return (
+        select(*tea_columns(), func.count().over().label("total"))
+        .join(hits, hits.c.id == Tea.id)
+        .where(Tea.status == "online")
+        .order_by(hits.c.rank, Tea.id.desc())
+    )
+
+
+@router.get("/teas/search", response_model=TeaSearchOut)
+def search_teas(
+    keyword: str,
+    limit: int = 20,
+    offset: int = 0,
+    with_intro: bool = True,
+    db: Session = Depends(get_read_db),
+):
+    """在线茶叶全文搜索（名称/产地/规格/简介），按相关度排序"""
+    keyword = keyword.strip()
+    if not keyword or len(keyword) > 100:
+        raise HTTPException(status_code=400, detail={"code": "bad_request", "message": "invalid keyword"})
+    if limit < 1 or limit > 50 or offset < 0:
+        raise HTTPException(status_code=400, detail={"code": "bad_request", "message": "invalid pagination"})
+
+    hits = search_hits(keyword, fts_ready(db.connection()))
+    # 条目直接取库、不走目录快照：快照可能落后于库，条目和总数必须出自同一处
+    page = db.execute(search_page_query(hits).offset(offset).limit(limit)).all()
+    if page:
+        total = page[0].total
+    else:
+        # 翻过了最后一页，窗口计数没有行可带
+        total = db.execute(select(func.count()).select_from(search_query(hits).subquery())).scalar_one()
+
+    records = [TeaRecord(*row[:-1]) for row in page]
+    body = join_items("items", (rec.to_json(with_intro) for rec in records), total=total, limit=limit, offset=offset)
+    return FastJSONResponse(body)
+
+
+@router.get("/teas/changes", response_model=TeaChangesOut)
+def tea_changes(since: Optional[int] = None, db: Session = Depends(get_read_db)):
+    """增量同步：返回 since 之后新增/修改的在线茶叶，以及下线/删除的 id；不带 since 时返回全部在线茶叶"""
+    if since is not None and not 0 <= since <= _MAX_MARKER:
+        raise HTTPException(status_code=400, detail={"code": "bad_request", "message": "invalid since"})
+
+    next_since = _to_marker(datetime.utcnow() - CHANGES_OVERLAP)
+    if since is None:
+        snap = catalog.get(db)
+        body = join_items("changed", (r.json for r in snap.by_id.values()), removed=[], next_since=next_since)
+        return FastJSONResponse(body)
+
+    since_dt = _from_marker(since)
+    changed: List[TeaRecord] = []
+    removed: set[int] = set()
+    for row in db.execute(tea_changes_query(since_dt)):
+        rec = TeaRecord(*row)
+        if rec.status == "online":
+            changed.append(rec)
+        else:
+            removed.add(rec.id)
+    removed.update(db.execute(tombstones_query(since_dt)).scalars())
+    # id 可能被新茶叶复用，仍在线的以 changed 为准
+    removed.difference_update(r.id for r in changed)
+
+    body = join_items(
+        "changed", (r.json for r in changed), removed=sorted(removed), next_since=max(since, next_since)
+    )
+    return FastJSONResponse(body)
 
 
 @router.get("/teas/{tea_id}", response_model=TeaOut)
-def get_tea(tea_id: int, db: Session = Depends(get_db)):
-    tea = db.get(Tea, tea_id)
-    if not tea or tea.status != "online":
+def get_tea(tea_id: int, request: Request, db: Session = Depends(get_read_db)):
+    rec = catalog.get(db).get(tea_id)
+    if rec is None:
         raise HTTPException(status_code=404, detail={"code": "not_found", "message": "tea not found"})
 
-    return TeaOut(
-        id=tea.id,
-        name=tea.name,
-        category=tea.category,
-        year=tea.year,
-        origin=tea.origin,
-        spec=tea.spec,
-        price_min=tea.price_min,
-        price_max=tea.price_max,
-        intro=tea.intro,
-        cover_url=tea.cover_url,
-        status=tea.status,
-        weight=tea.weight,
-        created_at=tea.created_at,
-        updated_at=tea.updated_at,
-    )
+    etag = make_etag("tea", rec.id, rec.updated_at.isoformat())
+    cache_control = _public_cache_control()
+    if not_modified(request, etag, rec.updated_at):
+        return not_modified_response(etag, cache_control, rec.updated_at)
+
+    response = FastJSONResponse(rec.json)
+    set_cache_headers(response, etag, cache_control, rec.updated_at)
+    return response
+
+
+def _record_events(items: List[EventIn]):
+    def op(db: Session) -> int:
+        # 原始记录与计数共用同一时间戳，保证落在同一天
+        now = datetime.utcnow()
+        deltas: Dict[int, Tuple[int, int, int]] = {}
+        for ev in items:
+            if ev.type == "impression":
+                pv, _, _ = deltas.get(ev.tea_id, (0, 0, 0))
+                deltas[ev.tea_id] = (pv + 1, 0, 0)
+
+        db.execute(
+            insert(Event),
+            [{"anon_user_id": ev.anon_user_id, "tea_id": ev.tea_id, "type": ev.type, "created_at": now} for ev in items],
+        )
+        apply_stat_deltas(db, deltas, now)
+        return len(items)
+
+    return op
 
 
 @router.post("/events")
-def post_event(body: EventIn, db: Session = Depends(get_db)):
-    ev = Event(anon_user_id=body.anon_user_id, tea_id=body.tea_id, type=body.type)
-    db.add(ev)
-    db.commit()
+def post_event(body: EventIn):
+    writer.run(_record_events([body]))
     return {"ok": True}
 
 
+@router.post("/events/batch")
+def post_events_batch(body: EventBatchIn):
+    bad = sorted({ev.type for ev in body.items} - EVENT_TYPES)
+    if bad:
+        raise HTTPException(status_code=400, detail={"code": "bad_request", "message": f"invalid event type: {bad}"})
+    if not body.items:
+        return {"ok": True, "inserted": 0}
+
+    # 整批一次 executemany，与其他写入一起组提交
+    inserted = writer.run(_record_events(body.items))
+    return {"ok": True, "inserted": inserted}
+
+
 @router.post("/feedback")
-def post_feedback(body: FeedbackIn, db: Session = Depends(get_db)):
+def post_feedback(body: FeedbackIn, db: Session = Depends(get_read_db)):
     if body.action not in ("like", "dislike"):
         raise HTTPException(status_code=400, detail={"code": "bad_request", "message": "invalid action"})
 
-    start, end = _today_range()
-    exists = db.execute(
-        select(func.count())
-        .select_from(Feedback)
-        .where(Feedback.anon_user_id == body.anon_user_id)
-        .where(Feedback.tea_id == body.tea_id)
-        .where(Feedback.created_at >= start)
-        .where(Feedback.created_at < end)
-    ).scalar_one()
-
-    if exists:
+    # 今天已反馈过的直接判重，不进写队列
+    if today_feedback.contains(db, body.anon_user_id, body.tea_id):
         return {"ok": True, "dedup": True}
 
-    fb = Feedback(anon_user_id=body.anon_user_id, tea_id=body.tea_id, action=body.action)
-    db.add(fb)
-    db.commit()
+    def op(db: Session) -> bool:
+        now = datetime.utcnow()
+        # 唯一索引 (anon_user_id, tea_id, day) 判重：冲突时不插入，rowcount 为 0
+        stmt = (
+            sqlite_insert(Feedback)
+            .values(anon_user_id=body.anon_user_id, tea_id=body.tea_id, action=body.action, created_at=now, day=day_key(now))
+            .on_conflict_do_nothing(index_elements=[Feedback.anon_user_id, Feedback.tea_id, Feedback.day])
+        )
+        if db.execute(stmt).rowcount == 0:
+            return False
+        apply_stat_deltas(db, {body.tea_id: feedback_delta(body.action)}, now)
+        return True
+
+    if not writer.run(op):
+        return {"ok": True, "dedup": True}
+    today_feedback.add(body.anon_user_id, body.tea_id)
     return {"ok": True}
 
 
 @router.post("/feedback/message")
-def post_message_feedback(body: MessageFeedbackIn, db: Session = Depends(get_db)):
-    msg = MessageFeedback(
-        anon_user_id=body.anon_user_id,
-        tea_id=body.tea_id,
-        message=body.message,
-        contact=body.contact,
-    )
-    db.add(msg)
-    db.commit()
+def post_message_feedback(body: MessageFeedbackIn):
+    def op(db: Session) -> None:
+        db.execute(
+            insert(MessageFeedback).values(
+                anon_user_id=body.anon_user_id,
+                tea_id=body.tea_id,
+                message=body.message,
+                contact=body.contact,
+                created_at=datetime.utcnow(),
+            )
+        )
+
+    writer.run(op)
     return {"ok": True}
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import os
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse, RedirectResponse
+
+from app.services.images import VARIANTS_DIR, parse_variant, variants
+from app.services.uploads import UPLOADS_DIR
+
+router = APIRouter()
+
+# 变体名由原图文件名决定，原图按内容命名后不会变
+VARIANT_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# 现生成一张原图全部变体的最长等待
+RENDER_TIMEOUT_SECONDS = 15
+
+
+@router.get("/uploads/v/{name}")
+def upload_variant(name: str):
+    """封面变体。已生成的直接返回（线上由 nginx 直出，只有缺失的才会打到这里）；
+
+    缺失时在进程池里现生成该原图的全部变体；生成失败时重定向到原图，卡片不至于裂图。
+    """
+    parsed = parse_variant(name)
+    if parsed is None:
+        raise HTTPException(status_code=404, detail={"code": "not_found", "message": "variant not found"})
+    source, _width = parsed
+    path = os.path.join(VARIANTS_DIR, name)
+    if not os.path.exists(path):
+        if not os.path.exists(os.path.join(UPLOADS_DIR, source)):
+            raise HTTPException(status_code=404, detail={"code": "not_found", "message": "variant not found"})
+        try:
+            variants.submit(source).result(RENDER_TIMEOUT_SECONDS)
+        except Exception:
+            # 超时、原图损坏或不是图片
+            return RedirectResponse(f"/uploads/{source}", status_code=307)
+    return FileResponse(path, media_type="image/webp", headers={"Cache-Control": VARIANT_CACHE_CONTROL})
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import List, Optional
 import os
 
@@ -23,8 +24,35 @@ class Settings:
 
     log_level: str
 
+    rank_cache_ttl_seconds: float
+    http_cache_max_age_seconds: int
+    feed_session_ttl_seconds: float
+    today_feedback_max_users: int
+    personal_prefs_max_users: int
+    import_staging_ttl_seconds: float
+    upload_max_bytes: int
+    import_max_bytes: int
+    image_workers: int
+    import_job_workers: int
+    import_job_stale_seconds: float
+    import_job_poll_seconds: float
 
+    writer_max_batch: int
+    writer_max_delay_ms: float
+    writer_timeout_seconds: float
+
+    sqlite_journal_mode: str
+    sqlite_synchronous: str
+    sqlite_busy_timeout_ms: int
+    sqlite_mmap_size: int
+    sqlite_cache_size: int
+    sqlite_temp_store: str
+    sqlite_read_pool_size: int
+
+
+@lru_cache(maxsize=1)
 def get_settings() -> Settings:
+    """读取环境变量构造配置，进程内只构造一次；修改环境变量后调用 reload_settings()"""
     app_env = os.getenv("APP_ENV", "dev")
     cors_origins = _split_csv(os.getenv("APP_CORS_ORIGINS", ""))
 
@@ -37,6 +65,33 @@ def get_settings() -> Settings:
 
     log_level = os.getenv("LOG_LEVEL", "INFO")
 
+    rank_cache_ttl_seconds = float(os.getenv("RANK_CACHE_TTL_SECONDS", "30"))
+    http_cache_max_age_seconds = int(os.getenv("HTTP_CACHE_MAX_AGE_SECONDS", "10"))
+    feed_session_ttl_seconds = float(os.getenv("FEED_SESSION_TTL_SECONDS", "3600"))
+    today_feedback_max_users = int(os.getenv("TODAY_FEEDBACK_MAX_USERS", "50000"))
+    personal_prefs_max_users = int(os.getenv("PERSONAL_PREFS_MAX_USERS", "50000"))
+    import_staging_ttl_seconds = float(os.getenv("IMPORT_STAGING_TTL_SECONDS", "86400"))
+    upload_max_bytes = int(os.getenv("UPLOAD_MAX_BYTES", str(10 * 1024 * 1024)))
+    import_max_bytes = int(os.getenv("IMPORT_MAX_BYTES", str(50 * 1024 * 1024)))
+    image_workers = int(os.getenv("IMAGE_WORKERS", "2"))
+    import_job_workers = int(os.getenv("IMPORT_JOB_WORKERS", "1"))
+    # 运行中任务超过这么久没有心跳，视为所在 worker 已退出，重新排队
+    import_job_stale_seconds = float(os.getenv("IMPORT_JOB_STALE_SECONDS", "60"))
+    import_job_poll_seconds = float(os.getenv("IMPORT_JOB_POLL_SECONDS", "5"))
+
+    writer_max_batch = int(os.getenv("WRITER_MAX_BATCH", "200"))
+    writer_max_delay_ms = float(os.getenv("WRITER_MAX_DELAY_MS", "5"))
+    writer_timeout_seconds = float(os.getenv("WRITER_TIMEOUT_SECONDS", "10"))
+
+    sqlite_journal_mode = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    sqlite_synchronous = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    sqlite_busy_timeout_ms = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    sqlite_mmap_size = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    # 负数表示 KiB：-65536 即 64MB
+    sqlite_cache_size = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))
+    sqlite_temp_store = os.getenv("SQLITE_TEMP_STORE", "MEMORY")
+    sqlite_read_pool_size = int(os.getenv("SQLITE_READ_POOL_SIZE", "8"))
+
     return Settings(
         app_env=app_env,
         cors_origins=cors_origins,
@@ -46,4 +101,32 @@ def get_settings() -> Settings:
         jwt_secret=jwt_secret,
         jwt_expire_minutes=jwt_expire_minutes,
         log_level=log_level,
+        rank_cache_ttl_seconds=rank_cache_ttl_seconds,
+        http_cache_max_age_seconds=http_cache_max_age_seconds,
+        feed_session_ttl_seconds=feed_session_ttl_seconds,
+        today_feedback_max_users=today_feedback_max_users,
+        personal_prefs_max_users=personal_prefs_max_users,
+        import_staging_ttl_seconds=import_staging_ttl_seconds,
+        upload_max_bytes=upload_max_bytes,
+        import_max_bytes=import_max_bytes,
+        image_workers=image_workers,
+        import_job_workers=import_job_workers,
+        import_job_stale_seconds=import_job_stale_seconds,
+        import_job_poll_seconds=import_job_poll_seconds,
+        writer_max_batch=writer_max_batch,
+        writer_max_delay_ms=writer_max_delay_ms,
+        writer_timeout_seconds=writer_timeout_seconds,
+        sqlite_journal_mode=sqlite_journal_mode,
+        sqlite_synchronous=sqlite_synchronous,
+        sqlite_busy_timeout_ms=sqlite_busy_timeout_ms,
+        sqlite_mmap_size=sqlite_mmap_size,
+        sqlite_cache_size=sqlite_cache_size,
+        sqlite_temp_store=sqlite_temp_store,
+        sqlite_read_pool_size=sqlite_read_pool_size,
     )
+
+
+def reload_settings() -> Settings:
+    """丢弃缓存重新读取环境变量。已按旧配置创建的对象（数据库连接池、写线程等）不受影响"""
+    get_settings.cache_clear()
+    return get_settings()
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response
+
+
+def make_etag(*parts) -> str:
+    """由内容版本信息生成强 ETag"""
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:20]
+    return f'"{digest}"'
+
+
+def http_date(dt: datetime) -> str:
+    # 库里是 naive UTC
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return format_datetime(dt.astimezone(timezone.utc), usegmt=True)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # If-None-Match 用弱比较（RFC 9110 §13.1.2）
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+def not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """按 If-None-Match / If-Modified-Since 判断客户端缓存是否仍有效；有 If-None-Match 时忽略 If-Modified-Since"""
+    inm = request.headers.get("if-none-match")
+    if inm is not None:
+        return _etag_matches(inm, etag)
+
+    ims = request.headers.get("if-modified-since")
+    if ims and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(ims)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        modified = last_modified if last_modified.tzinfo is not None else last_modified.replace(tzinfo=timezone.utc)
+        # HTTP 日期只精确到秒
+        return modified.replace(microsecond=0) <= since
+    return False
+
+
+def set_cache_headers(
+    response: Response, etag: str, cache_control: str, last_modified: Optional[datetime] = None
+) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+    if last_modified is not None:
+        response.headers["Last-Modified"] = http_date(last_modified)
+
+
+def not_modified_response(etag: str, cache_control: str, last_modified: Optional[datetime] = None) -> Response:
+    response = Response(status_code=304)
+    set_cache_headers(response, etag, cache_control, last_modified)
+    return response
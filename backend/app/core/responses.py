@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from typing import Any, Iterable
+
+import orjson
+from fastapi import Response
+
+
+def dumps(obj: Any) -> bytes:
+    # naive datetime 输出为不带时区的 ISO 格式，与 pydantic 一致
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+
+def join_items(key: str, items: Iterable[bytes], **fields: Any) -> bytes:
+    """把已编码好的条目拼成 {"<key>": [...], **fields}，条目本身不再重新编码"""
+    head = b'{"' + key.encode("utf-8") + b'":[' + b",".join(items) + b"]"
+    if not fields:
+        return head + b"}"
+    return head + b"," + dumps(fields)[1:]
+
+
+class FastJSONResponse(Response):
+    """orjson 编码的 JSON 响应；content 为 bytes 时视为已编码好的 JSON 原样输出"""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, (bytes, bytearray)):
+            return bytes(content)
+        return dumps(content)
@@ -1,6 +1,11 @@
 from __future__ import annotations
 
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
 
 from jose import jwt
 from passlib.context import CryptContext
@@ -25,3 +30,55 @@ def create_access_token(subject: str, secret: str, expires_minutes: int) -> str:
 
 def decode_token(token: str, secret: str) -> dict:
     return jwt.decode(token, secret, algorithms=["HS256"])
+
+
+class VerifiedTokenCache:
+    """已验签 token 的 LRU：按 (密钥, token) 摘要索引，缓存 sub 与 exp，过期即失效"""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._items: "OrderedDict[bytes, Tuple[str, float]]" = OrderedDict()
+
+    @staticmethod
+    def _key(token: str, secret: str) -> bytes:
+        # 密钥参与摘要：更换 JWT_SECRET 后旧条目自然失效
+        return hashlib.sha256(f"{secret}\0{token}".encode("utf-8")).digest()
+
+    def get(self, token: str, secret: str) -> Optional[str]:
+        key = self._key(token, secret)
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            sub, exp = item
+            if exp <= time.time():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return sub
+
+    def put(self, token: str, secret: str, payload: dict) -> None:
+        exp = payload.get("exp")
+        if exp is None:
+            return
+        key = self._key(token, secret)
+        with self._lock:
+            self._items[key] = (payload.get("sub"), float(exp))
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+def verify_token(token: str, secret: str, cache: VerifiedTokenCache) -> str:
+    """返回 token 的 sub；命中缓存时跳过 JWT 验签，失败时抛出 jose 异常"""
+    sub = cache.get(token, secret)
+    if sub is not None:
+        return sub
+    payload = decode_token(token, secret)
+    cache.put(token, secret, payload)
+    return payload.get("sub")
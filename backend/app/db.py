@@ -1,15 +1,57 @@
 from __future__ import annotations
 
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 
+from app.core.config import Settings, get_settings
+
 DB_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "app.db")
 DB_URL = f"sqlite:///{os.path.abspath(DB_PATH)}"
 
+_settings = get_settings()
+
+
+def _apply_pragmas(dbapi_conn, settings: Settings, read_only: bool) -> None:
+    cur = dbapi_conn.cursor()
+    try:
+        if not read_only:
+            # journal_mode 写进库文件，只需写连接设置一次
+            cur.execute(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+        cur.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+        cur.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+        cur.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+        cur.execute(f"PRAGMA cache_size={int(settings.sqlite_cache_size)}")
+        cur.execute(f"PRAGMA temp_store={settings.sqlite_temp_store}")
+        if read_only:
+            cur.execute("PRAGMA query_only=ON")
+    finally:
+        cur.close()
+
+
+# 写库：写线程、后台管理写接口使用
 engine = create_engine(DB_URL, connect_args={"check_same_thread": False})
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 
+# 只读库：公共 GET 与看板查询使用独立连接池，WAL 下读不阻塞写
+read_engine = create_engine(
+    DB_URL,
+    connect_args={"check_same_thread": False},
+    pool_size=_settings.sqlite_read_pool_size,
+    max_overflow=_settings.sqlite_read_pool_size,
+)
+ReadSessionLocal = sessionmaker(bind=read_engine, autocommit=False, autoflush=False)
+
+
+@event.listens_for(engine, "connect")
+def _on_write_connect(dbapi_conn, _record):
+    _apply_pragmas(dbapi_conn, _settings, read_only=False)
+
+
+@event.listens_for(read_engine, "connect")
+def _on_read_connect(dbapi_conn, _record):
+    _apply_pragmas(dbapi_conn, _settings, read_only=True)
+
 
 def get_db():
     db = SessionLocal()
@@ -17,3 +59,11 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
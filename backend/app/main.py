@@ -8,15 +8,23 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 
 from app.api.admin import router as admin_router
 from app.api.public import router as public_router
+from app.api.uploads import router as uploads_router
 from app.core.config import get_settings, Settings
-from app.db import engine
-from app.models import Base
+from app.db import SessionLocal, engine
+from app.migrations import init_db
+from app.services.images import variants
+from app.services.import_jobs import import_jobs
+from app.services.stats import ensure_stats
+from app.services.today_feedback import today_feedback
+from app.services.uploads import UPLOADS_DIR
+from app.services.writer import RETRY_AFTER_SECONDS, WriteTimeout, writer
 
 
 def setup_logging(settings: Settings):
@@ -66,16 +74,27 @@ def create_app() -> FastAPI:
     )
     logger.info(f"CORS configured with origins: {allow_origins}")
 
+    # 封面变体路由要在 /uploads 挂载之前注册，缺失的变体才能落到这里现生成
+    app.include_router(uploads_router)
+
     # 静态上传文件
-    uploads_dir = os.path.join(os.path.dirname(__file__), "..", "data", "uploads")
-    os.makedirs(uploads_dir, exist_ok=True)
-    app.mount("/uploads", StaticFiles(directory=uploads_dir), name="uploads")
-    logger.info(f"Static files mounted at /uploads -> {uploads_dir}")
+    os.makedirs(UPLOADS_DIR, exist_ok=True)
+    app.mount("/uploads", StaticFiles(directory=UPLOADS_DIR), name="uploads")
+    logger.info(f"Static files mounted at /uploads -> {UPLOADS_DIR}")
 
     app.include_router(public_router)
     app.include_router(admin_router)
     logger.info("Routers registered: /api (public), /api/admin (admin)")
 
+    @app.exception_handler(WriteTimeout)
+    def _write_timeout(_request: Request, exc: WriteTimeout):
+        # 写入仍在队列里、之后可能提交：重试非幂等写入（事件、留言）可能产生重复
+        return JSONResponse(
+            status_code=503,
+            content={"detail": {"code": "write_timeout", "message": str(exc)}},
+            headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+        )
+
     @app.get("/health")
     def health():
         return {"ok": True}
@@ -83,11 +102,36 @@ def create_app() -> FastAPI:
     @app.on_event("startup")
     def _startup():
         logger.info("Creating database tables if not exist...")
-        Base.metadata.create_all(bind=engine)
+        applied = init_db(engine)
+        if applied:
+            logger.info(f"Database migrated: {applied}")
+        with SessionLocal() as db:
+            if ensure_stats(db):
+                logger.info("tea_stats/daily_tea_stats backfilled from event/feedback history")
+            users = today_feedback.warm(db)
+            logger.info(f"Today-feedback index warmed ({users} users)")
         logger.info("✅ Database initialization completed")
+        # 进程池先于写线程、导入线程拉起子进程
+        variants.start()
+        logger.info(f"Image variant pool started ({variants.workers} processes)")
+        writer.start()
+        logger.info(f"DB writer started (batch<={writer.max_batch}, delay<={writer.max_delay * 1000:.0f}ms)")
+        # 启动时会接上重启前没跑完的导入任务
+        import_jobs.start()
+        logger.info(f"Import job runner started ({import_jobs.workers} workers)")
         logger.info("🚀 Server is ready to accept requests")
         logger.info("=" * 50)
 
+    @app.on_event("shutdown")
+    def _shutdown():
+        # 先停导入任务（未完成的退回排队），它的批次还要经写线程提交
+        import_jobs.stop()
+        logger.info("Import job runner stopped")
+        writer.stop()
+        logger.info("DB writer stopped")
+        variants.stop()
+        logger.info("Image variant pool stopped")
+
     return app
 
 
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import logging
+from typing import Callable, Dict, List, Tuple
+
+from sqlalchemy import Engine
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.models import Base, Event, Feedback, FeedSession, ImportJob, Tea, TeaTombstone
+
+logger = logging.getLogger(__name__)
+
+# 版本号记在 PRAGMA user_version。
+# create_all 只会建缺失的表，已有表上的新索引/新列要靠这里补；每一步都必须可重复执行
+# （新库先经 create_all 建好了最新结构，再跑一遍迁移不能报错）。
+
+
+def _create_indexes(conn: Connection, model, *names: str) -> None:
+    """只建本次迁移引入的索引（名字写死）：模型上后来新增的索引可能依赖后续迁移才加的列"""
+    indexes = {index.name: index for index in model.__table__.indexes}
+    for name in names:
+        indexes[name].create(conn, checkfirst=True)
+
+
+def _m001_composite_indexes(conn: Connection) -> None:
+    _create_indexes(conn, Tea, "ix_tea_status_category_weight")
+    _create_indexes(conn, Event, "ix_event_type_created", "ix_event_type_tea")
+    _create_indexes(conn, Feedback, "ix_feedback_user_created", "ix_feedback_tea_action_created")
+
+
+def _m002_tea_changes(conn: Connection) -> None:
+    TeaTombstone.__table__.create(conn, checkfirst=True)
+    _create_indexes(conn, Tea, "ix_tea_updated_at")
+    _create_indexes(conn, TeaTombstone, "ix_tea_tombstone_deleted_at")
+
+
+def _m003_feed_session(conn: Connection) -> None:
+    FeedSession.__table__.create(conn, checkfirst=True)
+    _create_indexes(conn, FeedSession, "ix_feed_session_expires_at")
+
+
+def _table_info(conn: Connection, table: str) -> Dict[str, bool]:
+    """列名 -> 是否 NOT NULL"""
+    return {row[1]: bool(row[3]) for row in conn.exec_driver_sql(f"PRAGMA table_info({table})")}
+
+
+# 迁移 4 之后的 feedback 表结构（与 create_all 建出的一致）；写死，不随模型变
+_FEEDBACK_V4 = """
+CREATE TABLE feedback_v4 (
+    id INTEGER NOT NULL,
+    anon_user_id VARCHAR(64) NOT NULL,
+    tea_id INTEGER NOT NULL,
+    action VARCHAR(20) NOT NULL,
+    created_at DATETIME NOT NULL,
+    day VARCHAR(10) NOT NULL,
+    PRIMARY KEY (id),
+    FOREIGN KEY(tea_id) REFERENCES tea (id)
+)
+"""
+
+
+def _m004_feedback_day(conn: Connection) -> None:
+    from app.services.stats import rebuild_daily_tea_stats, rebuild_tea_stats
+
+    columns = _table_info(conn, "feedback")
+    if "day" not in columns:
+        conn.exec_driver_sql("ALTER TABLE feedback ADD COLUMN day VARCHAR(10)")
+    conn.exec_driver_sql("UPDATE feedback SET day = date(created_at) WHERE day IS NULL")
+
+    # 同一用户同一茶叶同一天只保留最早的一条
+    removed = conn.exec_driver_sql(
+        "DELETE FROM feedback WHERE id NOT IN "
+        "(SELECT MIN(id) FROM feedback GROUP BY anon_user_id, tea_id, day)"
+    ).rowcount
+    if removed:
+        logger.info(f"Removed {removed} duplicate feedback rows, rebuilding stats")
+        with Session(bind=conn) as db:
+            rebuild_tea_stats(db)
+            rebuild_daily_tea_stats(db)
+
+    if not columns.get("day"):
+        # SQLite 加列不能带 NOT NULL（无默认值时），回填后重建表，结构与新库一致
+        conn.exec_driver_sql(_FEEDBACK_V4)
+        conn.exec_driver_sql(
+            "INSERT INTO feedback_v4 (id, anon_user_id, tea_id, action, created_at, day) "
+            "SELECT id, anon_user_id, tea_id, action, created_at, day FROM feedback"
+        )
+        # 旧表上的索引随表一起删掉，下面按原名重建
+        conn.exec_driver_sql("DROP TABLE feedback")
+        conn.exec_driver_sql("ALTER TABLE feedback_v4 RENAME TO feedback")
+        _create_indexes(conn, Feedback, "ix_feedback_user_created", "ix_feedback_tea_action_created")
+
+    _create_indexes(conn, Feedback, "ux_feedback_user_tea_day")
+
+
+def _m005_tea_fts(conn: Connection) -> None:
+    from app.services.search import create_fts
+
+    create_fts(conn)
+
+
+def _m006_tea_natural_key(conn: Connection) -> None:
+    # 非唯一：历史数据里可能已有同名同年同规格的茶叶，导入时按 id 最小的一条去重
+    _create_indexes(conn, Tea, "ix_tea_natural_key")
+
+
+def _m007_import_job(conn: Connection) -> None:
+    ImportJob.__table__.create(conn, checkfirst=True)
+    _create_indexes(conn, ImportJob, "ix_import_job_status_heartbeat")
+
+
+def _m008_change_seq(conn: Connection) -> None:
+    from app.services.catalog import create_change_seq
+
+    for table in ("tea", "tea_tombstone"):
+        if "change_seq" not in _table_info(conn, table):
+            conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN change_seq INTEGER")
+    _create_indexes(conn, Tea, "ix_tea_change_seq")
+    _create_indexes(conn, TeaTombstone, "ix_tea_tombstone_change_seq")
+    # 已有行保持 NULL：快照总是先全量加载，之后的改动才会带上序号
+    create_change_seq(conn)
+
+
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "composite indexes on tea/event/feedback", _m001_composite_indexes),
+    (2, "tea.updated_at index and tea_tombstone for delta sync", _m002_tea_changes),
+    (3, "feed_session served-set table", _m003_feed_session),
+    (4, "feedback.day with unique (anon_user_id, tea_id, day)", _m004_feedback_day),
+    (5, "tea_fts trigram full-text index with sync triggers", _m005_tea_fts),
+    (6, "tea (name, year, spec) natural key index for import upsert", _m006_tea_natural_key),
+    (7, "import_job table for background imports", _m007_import_job),
+    (8, "commit-ordered change_seq on tea/tea_tombstone for catalog refresh", _m008_change_seq),
+]
+
+
+def schema_version(conn: Connection) -> int:
+    return int(conn.exec_driver_sql("PRAGMA user_version").scalar() or 0)
+
+
+def run_migrations(engine: Engine) -> List[int]:
+    applied: List[int] = []
+    with engine.begin() as conn:
+        current = schema_version(conn)
+        for version, desc, fn in MIGRATIONS:
+            if version <= current:
+                continue
+            logger.info(f"Applying migration {version}: {desc}")
+            fn(conn)
+            conn.exec_driver_sql(f"PRAGMA user_version = {version}")
+            applied.append(version)
+    return applied
+
+
+def init_db(engine: Engine) -> List[int]:
+    """建表 + 迁移到最新版本，返回本次执行的迁移版本号"""
+    Base.metadata.create_all(bind=engine)
+    return run_migrations(engine)
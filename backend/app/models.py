@@ -3,7 +3,7 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, LargeBinary, String, Text
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
 
@@ -13,6 +13,12 @@ class Base(DeclarativeBase):
 
 class Tea(Base):
     __tablename__ = "tea"
+    __table_args__ = (
+        Index("ix_tea_status_category_weight", "status", "category", "weight"),
+        Index("ix_tea_updated_at", "updated_at"),
+        Index("ix_tea_natural_key", "name", "year", "spec"),
+        Index("ix_tea_change_seq", "change_seq"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     name: Mapped[str] = mapped_column(String(200))
@@ -31,10 +37,16 @@ class Tea(Base):
 
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    # 变更序号：由触发器在写事务内分配，按提交顺序递增（目录增量刷新用），应用不要写
+    change_seq: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
 
 
 class Event(Base):
     __tablename__ = "event"
+    __table_args__ = (
+        Index("ix_event_type_created", "type", "created_at"),
+        Index("ix_event_type_tea", "type", "tea_id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     anon_user_id: Mapped[str] = mapped_column(String(64))
@@ -45,12 +57,20 @@ class Event(Base):
 
 class Feedback(Base):
     __tablename__ = "feedback"
+    __table_args__ = (
+        Index("ix_feedback_user_created", "anon_user_id", "created_at"),
+        Index("ix_feedback_tea_action_created", "tea_id", "action", "created_at"),
+        # 同一用户同一茶叶每天只记一次，由数据库保证
+        Index("ux_feedback_user_tea_day", "anon_user_id", "tea_id", "day", unique=True),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     anon_user_id: Mapped[str] = mapped_column(String(64))
     tea_id: Mapped[int] = mapped_column(Integer, ForeignKey("tea.id"))
     action: Mapped[str] = mapped_column(String(20))
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    # created_at 的 UTC 日期 YYYY-MM-DD
+    day: Mapped[str] = mapped_column(String(10))
 
 
 class MessageFeedback(Base):
@@ -62,3 +82,89 @@ class MessageFeedback(Base):
     message: Mapped[str] = mapped_column(Text)
     contact: Mapped[Optional[str]] = mapped_column(String(120), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class TeaStats(Base):
+    """按茶叶累计的计数器，随 event/feedback 写入在同一事务内增量维护"""
+
+    __tablename__ = "tea_stats"
+
+    tea_id: Mapped[int] = mapped_column(Integer, ForeignKey("tea.id"), primary_key=True)
+    pv: Mapped[int] = mapped_column(Integer, default=0)
+    likes: Mapped[int] = mapped_column(Integer, default=0)
+    dislikes: Mapped[int] = mapped_column(Integer, default=0)
+    last_updated: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class DailyTeaStats(Base):
+    """按天汇总的计数（UTC 日期），看板按日期区间直接求和"""
+
+    __tablename__ = "daily_tea_stats"
+
+    day: Mapped[str] = mapped_column(String(10), primary_key=True)
+    tea_id: Mapped[int] = mapped_column(Integer, ForeignKey("tea.id"), primary_key=True)
+    pv: Mapped[int] = mapped_column(Integer, default=0)
+    likes: Mapped[int] = mapped_column(Integer, default=0)
+    dislikes: Mapped[int] = mapped_column(Integer, default=0)
+
+
+class TeaTombstone(Base):
+    """已删除茶叶的墓碑记录，供增量同步接口告知客户端删除"""
+
+    __tablename__ = "tea_tombstone"
+    __table_args__ = (
+        Index("ix_tea_tombstone_deleted_at", "deleted_at"),
+        Index("ix_tea_tombstone_change_seq", "change_seq"),
+    )
+
+    # 茶叶已删除，不加外键
+    tea_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    deleted_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    # 与 tea.change_seq 同一序列
+    change_seq: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+
+
+class FeedSession(Base):
+    """feed 会话：记录本次浏览已下发过的茶叶，翻页时服务端自行排除"""
+
+    __tablename__ = "feed_session"
+    __table_args__ = (Index("ix_feed_session_expires_at", "expires_at"),)
+
+    token: Mapped[str] = mapped_column(String(32), primary_key=True)
+    anon_user_id: Mapped[str] = mapped_column(String(64), default="")
+    # 已下发 id 的位图（packbits + zlib）
+    served: Mapped[bytes] = mapped_column(LargeBinary)
+    expires_at: Mapped[datetime] = mapped_column(DateTime)
+
+
+class ImportJob(Base):
+    """导入后台任务：preview（解析 + 校验 + 暂存）或 commit（分批 upsert）。
+
+    进度随每批写回，worker 重启后由其它 worker 或重启后的进程按表继续。
+    """
+
+    __tablename__ = "import_job"
+    __table_args__ = (Index("ix_import_job_status_heartbeat", "status", "heartbeat_at"),)
+
+    id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    kind: Mapped[str] = mapped_column(String(20))
+    # queued | running | done | failed
+    status: Mapped[str] = mapped_column(String(20), default="queued")
+    import_id: Mapped[str] = mapped_column(String(32))
+    filename: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+
+    total_rows: Mapped[int] = mapped_column(Integer, default=0)
+    processed_rows: Mapped[int] = mapped_column(Integer, default=0)
+    ok_rows: Mapped[int] = mapped_column(Integer, default=0)
+    error_rows: Mapped[int] = mapped_column(Integer, default=0)
+    inserted: Mapped[int] = mapped_column(Integer, default=0)
+    updated: Mapped[int] = mapped_column(Integer, default=0)
+    skipped: Mapped[int] = mapped_column(Integer, default=0)
+
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    heartbeat_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
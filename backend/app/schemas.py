@@ -19,17 +19,69 @@ class TeaBase(BaseModel):
     weight: int = 0
 
 
+class CoverVariant(BaseModel):
+    width: int
+    url: str
+
+
 class TeaOut(TeaBase):
     id: int
     created_at: datetime
     updated_at: datetime
+    # 本地上传封面的 webp 缩略图，按宽度升序（外链封面为空）
+    cover_variants: List[CoverVariant] = []
+
+
+class FacetValueCount(BaseModel):
+    value: str
+    count: int
+
+
+class FacetRangeCount(BaseModel):
+    # 闭区间；价格最后一段 max 为 null
+    min: int
+    max: Optional[int] = None
+    count: int
+
+
+class FacetCounts(BaseModel):
+    # 某一维度的计数按除它自己以外的筛选条件计算
+    category: List[FacetValueCount]
+    origin: List[FacetValueCount]
+    spec: List[FacetValueCount]
+    year: List[FacetRangeCount]
+    price: List[FacetRangeCount]
 
 
 class TeaListOut(BaseModel):
     items: List[TeaOut]
     page: int
     page_size: int
+    # 游标模式下仅在 with_total=true 时返回
+    total: Optional[int] = None
+    # 下一页游标（keyset），没有更多时为 null
+    next_cursor: Optional[str] = None
+    # feed 会话 token，下一页带上即可自动排除已下发条目
+    session: Optional[str] = None
+    # 筛选项计数，with_facets=false 时为 null
+    facets: Optional[FacetCounts] = None
+
+
+class TeaSearchOut(BaseModel):
+    # 按相关度排序
+    items: List[TeaOut]
     total: int
+    limit: int
+    offset: int
+
+
+class TeaChangesOut(BaseModel):
+    # since 之后新增/修改且在线的茶叶
+    changed: List[TeaOut]
+    # since 之后下线或删除的茶叶 id
+    removed: List[int]
+    # 下次请求带上的 since
+    next_since: int
 
 
 class EventIn(BaseModel):
@@ -38,6 +90,10 @@ class EventIn(BaseModel):
     type: str
 
 
+class EventBatchIn(BaseModel):
+    items: List[EventIn] = Field(max_length=500)
+
+
 class FeedbackIn(BaseModel):
     anon_user_id: str
     tea_id: int
@@ -68,13 +124,48 @@ class ImportPreviewRow(BaseModel):
 
 
 class ImportPreviewOut(BaseModel):
+    # 暂存 id：翻页预览、确认导入时带上
+    import_id: Optional[str] = None
     columns: List[str]
+    # 当前页的行（按 status 过滤）
     rows: List[ImportPreviewRow]
     total_rows: int
+    ok_rows: int = 0
+    error_rows: int = 0
+    page: int = 1
+    page_size: int = 0
 
 
 class ImportCommitIn(BaseModel):
-    items: List[TeaBase]
+    # 带 import_id 时后台导入该次预览里全部可导入的行（返回任务），忽略 items
+    items: List[TeaBase] = []
+    import_id: Optional[str] = None
+
+
+class ImportJobOut(BaseModel):
+    id: str
+    # preview | commit
+    kind: str
+    # queued | running | done | failed
+    status: str
+    import_id: str
+    filename: Optional[str] = None
+    # preview 解析完才知道总行数；commit 为可导入行数
+    total_rows: int
+    processed_rows: int
+    ok_rows: int
+    error_rows: int
+    inserted: int
+    updated: int
+    skipped: int
+    rows_per_sec: float
+    attempts: int
+    # 任务级错误（表头不符、暂存过期等）；行级错误见 error_samples 与预览翻页接口
+    error: Optional[str] = None
+    error_samples: List[ImportPreviewRow] = []
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
 
 
 class DashboardSummaryOut(BaseModel):
@@ -94,6 +185,7 @@ class DashboardRankRow(BaseModel):
 
 class DashboardRankOut(BaseModel):
     items: List[DashboardRankRow]
+    total: int = 0
 
 
 class DashboardTrendPoint(BaseModel):
@@ -0,0 +1,324 @@
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import column, select, table
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.core.responses import dumps
+from app.models import Tea, TeaTombstone
+from app.schemas import TeaOut
+from app.services.facets import FacetIndex
+from app.services.images import cover_variants
+from app.services.generations import GenerationBus, generations
+
+TEA_FIELDS = (
+    "id",
+    "name",
+    "category",
+    "year",
+    "origin",
+    "spec",
+    "price_min",
+    "price_max",
+    "intro",
+    "cover_url",
+    "status",
+    "weight",
+    "created_at",
+    "updated_at",
+)
+
+# 列表视图默认不带长文本 intro（with_intro=true 时带上）
+TEA_LIST_FIELDS = tuple(name for name in TEA_FIELDS if name != "intro")
+
+
+def tea_columns(fields: Sequence[str] = TEA_FIELDS):
+    return [getattr(Tea, name) for name in fields]
+
+
+def tea_fields(with_intro: bool) -> Tuple[str, ...]:
+    return TEA_FIELDS if with_intro else TEA_LIST_FIELDS
+
+
+def _with_variants(d: dict) -> dict:
+    # cover_variants 由 cover_url 推出，不存库
+    if "cover_url" in d:
+        d["cover_variants"] = cover_variants(d["cover_url"])
+    return d
+
+
+def tea_dict(obj, fields: Sequence[str] = TEA_FIELDS) -> dict:
+    """ORM 对象或记录 -> 可直接编码的 dict"""
+    return _with_variants({name: getattr(obj, name) for name in fields})
+
+
+def row_dict(row, fields: Sequence[str] = TEA_FIELDS) -> dict:
+    """投影查询的结果元组 -> 可直接编码的 dict"""
+    return _with_variants(dict(zip(fields, row)))
+
+
+class TeaRecord:
+    """在线茶叶的只读记录，字段与 TeaOut 一致；完整 JSON 在构造时预先编码"""
+
+    __slots__ = TEA_FIELDS + ("json", "_brief_json")
+
+    id: int
+    name: str
+    category: str
+    year: int
+    origin: str
+    spec: str
+    price_min: Optional[int]
+    price_max: Optional[int]
+    intro: Optional[str]
+    cover_url: str
+    status: str
+    weight: int
+    created_at: datetime
+    updated_at: datetime
+
+    json: bytes
+
+    def __init__(self, *values):
+        for name, value in zip(TEA_FIELDS, values):
+            object.__setattr__(self, name, value)
+        object.__setattr__(self, "json", dumps(row_dict(values)))
+        object.__setattr__(self, "_brief_json", None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("TeaRecord is immutable")
+
+    def to_out(self) -> TeaOut:
+        return TeaOut(**tea_dict(self))
+
+    def to_json(self, with_intro: bool = True) -> bytes:
+        if with_intro:
+            return self.json
+        brief = self._brief_json
+        if brief is None:
+            # 按需编码一次后缓存，并发时重复编码也无妨
+            brief = dumps(tea_dict(self, TEA_LIST_FIELDS))
+            object.__setattr__(self, "_brief_json", brief)
+        return brief
+
+    def approx_bytes(self) -> int:
+        return sys.getsizeof(self) + sum(sys.getsizeof(getattr(self, name)) for name in TEA_FIELDS + ("json",))
+
+
+class CatalogSnapshot:
+    """某个目录版本下全部在线茶叶的不可变快照"""
+
+    __slots__ = ("version", "by_id", "facets", "seq", "build_ms", "approx_bytes", "incremental")
+
+    def __init__(
+        self,
+        version: int,
+        by_id: Dict[int, TeaRecord],
+        facets: FacetIndex,
+        seq: int,
+        build_ms: float,
+        approx_bytes: int,
+        incremental: bool = False,
+    ):
+        self.version = version
+        self.by_id = by_id
+        self.facets = facets
+        # 开始读库前的变更序号：序号不超过它的改动都已包含，下次增量刷新取更大的
+        self.seq = seq
+        self.build_ms = build_ms
+        self.approx_bytes = approx_bytes
+        self.incremental = incremental
+
+    def __len__(self) -> int:
+        return len(self.by_id)
+
+    def get(self, tea_id: int) -> Optional[TeaRecord]:
+        return self.by_id.get(tea_id)
+
+
+# 单行计数器 + 触发器：tea / tea_tombstone 每写一行就在同一写事务内取下一个序号。
+# SQLite 同一时刻只有一个写事务，序号按提交顺序分配；按时间戳取变更时，
+# 排队或等锁晚提交的行时间戳更早，会被跳过。
+_CHANGE_SEQ_DDL = [
+    "CREATE TABLE IF NOT EXISTS catalog_seq (id INTEGER PRIMARY KEY CHECK (id = 1), seq INTEGER NOT NULL)",
+    "INSERT OR IGNORE INTO catalog_seq (id, seq) VALUES (1, 0)",
+    "CREATE TRIGGER IF NOT EXISTS tea_seq_ai AFTER INSERT ON tea BEGIN "
+    "UPDATE catalog_seq SET seq = seq + 1 WHERE id = 1; "
+    "UPDATE tea SET change_seq = (SELECT seq FROM catalog_seq WHERE id = 1) WHERE id = new.id; "
+    "END",
+    # 触发器自己改 change_seq 时不再触发
+    "CREATE TRIGGER IF NOT EXISTS tea_seq_au AFTER UPDATE ON tea WHEN new.change_seq IS old.change_seq BEGIN "
+    "UPDATE catalog_seq SET seq = seq + 1 WHERE id = 1; "
+    "UPDATE tea SET change_seq = (SELECT seq FROM catalog_seq WHERE id = 1) WHERE id = new.id; "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS tea_tombstone_seq_ai AFTER INSERT ON tea_tombstone BEGIN "
+    "UPDATE catalog_seq SET seq = seq + 1 WHERE id = 1; "
+    "UPDATE tea_tombstone SET change_seq = (SELECT seq FROM catalog_seq WHERE id = 1) WHERE tea_id = new.tea_id; "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS tea_tombstone_seq_au AFTER UPDATE ON tea_tombstone "
+    "WHEN new.change_seq IS old.change_seq BEGIN "
+    "UPDATE catalog_seq SET seq = seq + 1 WHERE id = 1; "
+    "UPDATE tea_tombstone SET change_seq = (SELECT seq FROM catalog_seq WHERE id = 1) WHERE tea_id = new.tea_id; "
+    "END",
+]
+
+catalog_seq = table("catalog_seq", column("seq"))
+
+
+def create_change_seq(conn: Connection) -> None:
+    for ddl in _CHANGE_SEQ_DDL:
+        conn.exec_driver_sql(ddl)
+
+
+def current_seq(db: Session) -> int:
+    return db.execute(select(catalog_seq.c.seq)).scalar_one()
+
+
+# 变更行数超过 max(下限, 快照条数 * 比例) 时（如批量导入）直接全量重建
+FULL_REFRESH_MIN_ROWS = 256
+FULL_REFRESH_RATIO = 0.25
+
+
+def catalog_query():
+    return select(*tea_columns()).where(Tea.status == "online")
+
+
+def tea_changes_query(since: datetime):
+    return select(*tea_columns()).where(Tea.updated_at > since)
+
+
+def tombstones_query(since: datetime):
+    return select(TeaTombstone.tea_id).where(TeaTombstone.deleted_at > since)
+
+
+def seq_changes_query(after: int):
+    return select(*tea_columns()).where(Tea.change_seq > after)
+
+
+def seq_tombstones_query(after: int):
+    return select(TeaTombstone.tea_id).where(TeaTombstone.change_seq > after)
+
+
+def load_snapshot(db: Session, version: int) -> CatalogSnapshot:
+    t0 = time.perf_counter()
+    # 先读序号再读行：读到的行可能比序号新，下次刷新会再取一遍（按 id 覆盖，幂等）
+    seq = current_seq(db)
+    records = [TeaRecord(*row) for row in db.execute(catalog_query())]
+    return CatalogSnapshot(
+        version,
+        {r.id: r for r in records},
+        FacetIndex.build(records),
+        seq,
+        (time.perf_counter() - t0) * 1000,
+        sum(r.approx_bytes() for r in records),
+    )
+
+
+def refresh_snapshot(db: Session, prev: CatalogSnapshot, version: int) -> CatalogSnapshot:
+    """在上一个快照上只应用序号大于 prev.seq 的变更（新增/修改的行 + 墓碑）；变更太多时退回全量重建"""
+    t0 = time.perf_counter()
+    seq = current_seq(db)
+    rows = db.execute(seq_changes_query(prev.seq)).all()
+    removed = set(db.execute(seq_tombstones_query(prev.seq)).scalars())
+    if len(rows) + len(removed) > max(FULL_REFRESH_MIN_ROWS, len(prev) * FULL_REFRESH_RATIO):
+        return load_snapshot(db, version)
+
+    changed: List[TeaRecord] = []
+    for row in rows:
+        rec = TeaRecord(*row)
+        if rec.status == "online":
+            changed.append(rec)
+        else:
+            removed.add(rec.id)
+    # id 可能被新茶叶复用，仍在线的以 changed 为准
+    removed.difference_update(r.id for r in changed)
+
+    by_id = dict(prev.by_id)
+    approx_bytes = prev.approx_bytes
+    for tea_id in removed:
+        old = by_id.pop(tea_id, None)
+        if old is not None:
+            approx_bytes -= old.approx_bytes()
+    for rec in changed:
+        old = by_id.get(rec.id)
+        if old is not None:
+            approx_bytes -= old.approx_bytes()
+        by_id[rec.id] = rec
+        approx_bytes += rec.approx_bytes()
+
+    return CatalogSnapshot(
+        version,
+        by_id,
+        prev.facets.updated(removed, changed),
+        seq,
+        (time.perf_counter() - t0) * 1000,
+        approx_bytes,
+        incremental=True,
+    )
+
+
+class Catalog:
+    """目录版本号 + 当前快照。后台增删改/导入后 bump()，读接口发现版本变化时在旧快照上增量刷新并原子替换。
+
+    版本号存在跨进程的代数计数器里，任一 worker 的后台写入都会让所有 worker 的快照失效。
+    """
+
+    def __init__(self, bus: GenerationBus, slot: str = "catalog"):
+        self.bus = bus
+        self.slot = slot
+        self._lock = threading.Lock()
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._refreshes = 0
+        self._incremental = 0
+
+    @property
+    def version(self) -> int:
+        return self.bus.get(self.slot)
+
+    def bump(self) -> int:
+        return self.bus.bump(self.slot)
+
+    def get(self, db: Session) -> CatalogSnapshot:
+        snap = self._snapshot
+        version = self.version
+        if snap is not None and snap.version == version:
+            return snap
+
+        with self._lock:
+            snap = self._snapshot
+            version = self.version
+            if snap is not None and snap.version == version:
+                return snap
+            snap = refresh_snapshot(db, snap, version) if snap is not None else load_snapshot(db, version)
+            self._snapshot = snap
+            self._refreshes += 1
+            self._incremental += snap.incremental
+            return snap
+
+    def stats(self) -> dict:
+        snap = self._snapshot
+        version = self.version
+        if snap is None:
+            return {"version": version, "loaded": False, "refreshes": self._refreshes}
+        n = len(snap)
+        return {
+            "version": version,
+            "loaded": True,
+            "snapshot_version": snap.version,
+            "change_seq": snap.seq,
+            "teas": n,
+            "refreshes": self._refreshes,
+            "incremental_refreshes": self._incremental,
+            "refresh_ms": round(snap.build_ms, 3),
+            "approx_bytes": snap.approx_bytes,
+            "approx_bytes_per_tea": round(snap.approx_bytes / n, 1) if n else 0.0,
+        }
+
+
+catalog = Catalog(generations)
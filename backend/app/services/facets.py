@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from app.services.reco import YEAR_BUCKET
+
+# 价格段：[100, 300) 记为 100-299，最后一段不设上限；茶叶价格区间与某段有交集即计入该段
+PRICE_BANDS = (0, 100, 300, 600, 1000, 3000)
+
+# 取值型维度（按取值计数）；年份按 YEAR_BUCKET 年一段、价格按 PRICE_BANDS 分段计数
+VALUE_FACETS = ("category", "origin", "spec")
+
+# 每个索引版本缓存的筛选组合数上限
+COUNTS_CACHE_SIZE = 256
+
+_NONE = -1
+# 只填了起价的茶叶，价格区间上限视为无穷
+_UNBOUNDED = np.iinfo(np.int64).max
+
+
+@dataclass(frozen=True)
+class FacetFilter:
+    """feed 的筛选条件；年份、价格为闭区间，茶叶的价格区间 [price_min, price_max] 与之有交集即命中"""
+
+    category: Optional[str] = None
+    origin: Optional[str] = None
+    spec: Optional[str] = None
+    year_from: Optional[int] = None
+    year_to: Optional[int] = None
+    price_min: Optional[int] = None
+    price_max: Optional[int] = None
+
+    def narrows(self) -> bool:
+        # category 由打分数组自己过滤，其余条件需要额外的 id 位图
+        return any(
+            v is not None
+            for v in (self.origin, self.spec, self.year_from, self.year_to, self.price_min, self.price_max)
+        )
+
+
+class FacetIndex:
+    """在线茶叶的分面索引：各维度按茶叶 id 下标存成 numpy 数组。
+
+    跟随目录快照：全量加载时整体构建，后台增删改后按变更的 id 复制一份再改（写时复制，
+    正在读旧版本的请求不受影响）。计数用 bincount 现算，同一版本下同一筛选组合的结果缓存。
+    """
+
+    def __init__(
+        self,
+        online: np.ndarray,
+        codes: Dict[str, np.ndarray],
+        vocab: Dict[str, Dict[str, int]],
+        year: np.ndarray,
+        price_lo: np.ndarray,
+        price_hi: np.ndarray,
+    ):
+        self.online = online
+        self.codes = codes
+        self.vocab = vocab
+        self.year = year
+        # 价格区间端点；未标价格的 price_lo 为 _NONE，不参与价格筛选与计数
+        self.price_lo = price_lo
+        self.price_hi = price_hi
+        self._labels = {name: list(v) for name, v in vocab.items()}
+        self._lock = threading.Lock()
+        self._counts: Dict[FacetFilter, dict] = {}
+
+    @classmethod
+    def build(cls, records: Sequence) -> "FacetIndex":
+        size = max((r.id for r in records), default=0) + 1
+        index = cls(
+            online=np.zeros(size, dtype=bool),
+            codes={name: np.full(size, _NONE, dtype=np.int32) for name in VALUE_FACETS},
+            vocab={name: {} for name in VALUE_FACETS},
+            year=np.zeros(size, dtype=np.int32),
+            price_lo=np.full(size, _NONE, dtype=np.int64),
+            price_hi=np.full(size, _NONE, dtype=np.int64),
+        )
+        index._put(records)
+        # 不带筛选的计数随索引一起算好
+        index.counts(FacetFilter())
+        return index
+
+    def updated(self, removed: Iterable[int], changed: Sequence) -> "FacetIndex":
+        """返回应用了变更的新索引：removed 为下线/删除的 id，changed 为新增或修改后仍在线的记录"""
+        size = max(self.online.size, max((r.id for r in changed), default=0) + 1)
+        index = FacetIndex(
+            online=_grow(self.online, size, False),
+            codes={name: _grow(arr, size, _NONE) for name, arr in self.codes.items()},
+            vocab={name: dict(v) for name, v in self.vocab.items()},
+            year=_grow(self.year, size, 0),
+            price_lo=_grow(self.price_lo, size, _NONE),
+            price_hi=_grow(self.price_hi, size, _NONE),
+        )
+        ids = np.fromiter(removed, dtype=np.int64)
+        ids = ids[ids < size]
+        index.online[ids] = False
+        index._put(changed)
+        index.counts(FacetFilter())
+        return index
+
+    def _put(self, records: Sequence) -> None:
+        for r in records:
+            for name in VALUE_FACETS:
+                vocab = self.vocab[name]
+                value = getattr(r, name)
+                code = vocab.get(value)
+                if code is None:
+                    # 编码只增不减，计数为 0 的取值不输出
+                    code = vocab[value] = len(vocab)
+                    self._labels[name].append(value)
+                self.codes[name][r.id] = code
+            self.year[r.id] = r.year
+            if r.price_min is None and r.price_max is None:
+                self.price_lo[r.id] = self.price_hi[r.id] = _NONE
+            else:
+                # 只填上限的按 0 起，只填起价的上不封顶
+                self.price_lo[r.id] = 0 if r.price_min is None else r.price_min
+                self.price_hi[r.id] = _UNBOUNDED if r.price_max is None else r.price_max
+            self.online[r.id] = True
+
+    def _conditions(self, f: FacetFilter) -> Dict[str, np.ndarray]:
+        """各维度自己的筛选条件（按 id 下标的布尔数组），没有条件的维度不出现"""
+        cond: Dict[str, np.ndarray] = {}
+        for name in VALUE_FACETS:
+            value = getattr(f, name)
+            if value is not None:
+                cond[name] = self.codes[name] == self.vocab[name].get(value, -2)
+        if f.year_from is not None or f.year_to is not None:
+            m = np.ones(self.online.size, dtype=bool)
+            if f.year_from is not None:
+                m &= self.year >= f.year_from
+            if f.year_to is not None:
+                m &= self.year <= f.year_to
+            cond["year"] = m
+        if f.price_min is not None or f.price_max is not None:
+            cond["price"] = self._price_overlaps(f.price_min, f.price_max)
+        return cond
+
+    def _price_overlaps(self, lo: Optional[int], hi: Optional[int]) -> np.ndarray:
+        """价格区间与 [lo, hi] 有交集的茶叶（lo/hi 为 None 表示该侧不限），按 id 下标"""
+        m = self.price_lo >= 0
+        if hi is not None:
+            m &= self.price_lo <= hi
+        if lo is not None:
+            m &= self.price_hi >= lo
+        return m
+
+    def match(self, f: FacetFilter) -> np.ndarray:
+        """满足全部条件的在线茶叶，按 id 下标的位图"""
+        mask = self.online.copy()
+        for m in self._conditions(f).values():
+            mask &= m
+        return mask
+
+    def counts(self, f: FacetFilter) -> dict:
+        """各维度的计数：某一维度按除它自己以外的条件过滤后计数，选中一项时同维度的其他取值仍可见"""
+        cached = self._counts.get(f)
+        if cached is not None:
+            return cached
+
+        cond = self._conditions(f)
+
+        def base(skip: str) -> np.ndarray:
+            mask = self.online
+            for name, m in cond.items():
+                if name != skip:
+                    mask = mask & m
+            return mask
+
+        out: Dict[str, List[dict]] = {}
+        for name in VALUE_FACETS:
+            codes = self.codes[name][base(name)]
+            counts = np.bincount(codes[codes >= 0], minlength=len(self._labels[name]))
+            labels = self._labels[name]
+            items = [{"value": labels[i], "count": int(counts[i])} for i in np.flatnonzero(counts)]
+            items.sort(key=lambda x: (-x["count"], x["value"]))
+            out[name] = items
+
+        buckets = self.year[base("year")] // YEAR_BUCKET
+        out["year"] = [
+            {"min": int(b) * YEAR_BUCKET, "max": int(b) * YEAR_BUCKET + YEAR_BUCKET - 1, "count": int(n)}
+            for b, n in zip(*np.unique(buckets, return_counts=True))
+        ]
+
+        # 与筛选一致：一款茶的价格区间跨几段就计入几段，某段的计数即选中该段后的结果数
+        price_base = base("price")
+        out["price"] = []
+        for i, lo in enumerate(PRICE_BANDS):
+            hi = PRICE_BANDS[i + 1] - 1 if i + 1 < len(PRICE_BANDS) else None
+            n = int(np.count_nonzero(price_base & self._price_overlaps(lo, hi)))
+            if n:
+                out["price"].append({"min": lo, "max": hi, "count": n})
+
+        with self._lock:
+            if len(self._counts) >= COUNTS_CACHE_SIZE:
+                self._counts.clear()
+            self._counts[f] = out
+        return out
+
+    def __len__(self) -> int:
+        return int(self.online.sum())
+
+
+def _grow(arr: np.ndarray, size: int, fill) -> np.ndarray:
+    out = np.full(size, fill, dtype=arr.dtype)
+    out[: arr.size] = arr
+    return out
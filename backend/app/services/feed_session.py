@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import logging
+import secrets
+import threading
+import zlib
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models import FeedSession
+from app.services.writer import WriteQueue, writer
+
+logger = logging.getLogger(__name__)
+
+
+class ServedSet:
+    """已下发茶叶 id 的位图（下标即 id），落库时 packbits + zlib 压缩"""
+
+    __slots__ = ("bits",)
+
+    def __init__(self, bits: Optional[np.ndarray] = None):
+        self.bits = bits if bits is not None else np.zeros(0, dtype=bool)
+
+    @classmethod
+    def from_blob(cls, blob: Optional[bytes]) -> "ServedSet":
+        if not blob:
+            return cls()
+        packed = np.frombuffer(zlib.decompress(blob), dtype=np.uint8)
+        return cls(np.unpackbits(packed).astype(bool))
+
+    def to_blob(self) -> bytes:
+        return zlib.compress(np.packbits(self.bits).tobytes())
+
+    def add(self, ids: Iterable[int]) -> None:
+        arr = np.fromiter(ids, dtype=np.int64)
+        if not arr.size:
+            return
+        top = int(arr.max()) + 1
+        if top > self.bits.size:
+            grown = np.zeros(top, dtype=bool)
+            grown[: self.bits.size] = self.bits
+            self.bits = grown
+        self.bits[arr] = True
+
+    def __len__(self) -> int:
+        return int(self.bits.sum())
+
+
+def new_token() -> str:
+    return secrets.token_urlsafe(16)
+
+
+def load_served(db: Session, token: str, anon_user_id: Optional[str], now: Optional[datetime] = None) -> Optional[ServedSet]:
+    """读取会话的已下发集合；会话不存在、已过期或不属于该用户时返回 None"""
+    now = now or datetime.utcnow()
+    row = db.execute(
+        select(FeedSession.anon_user_id, FeedSession.served, FeedSession.expires_at).where(FeedSession.token == token)
+    ).first()
+    if row is None or row.expires_at < now or row.anon_user_id != (anon_user_id or ""):
+        return None
+    return ServedSet.from_blob(row.served)
+
+
+def record_served_op(token: str, anon_user_id: Optional[str], ids: Iterable[int], ttl_seconds: float, new: bool):
+    """写操作：把本页 id 并入会话位图并顺延过期时间。在写线程里读改写，同一会话的并发请求不会丢更新"""
+    ids = list(ids)
+
+    def op(db: Session) -> None:
+        now = datetime.utcnow()
+        if new:
+            # 新建会话时顺带清理过期会话，表大小随 TTL 有界
+            db.execute(delete(FeedSession).where(FeedSession.expires_at < now))
+            served = ServedSet()
+        else:
+            blob = db.execute(select(FeedSession.served).where(FeedSession.token == token)).scalar()
+            served = ServedSet.from_blob(blob)
+        served.add(ids)
+
+        stmt = sqlite_insert(FeedSession).values(
+            token=token,
+            anon_user_id=anon_user_id or "",
+            served=served.to_blob(),
+            expires_at=now + timedelta(seconds=ttl_seconds),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[FeedSession.token],
+            set_={"served": stmt.excluded.served, "expires_at": stmt.excluded.expires_at},
+        )
+        db.execute(stmt)
+
+    return op
+
+
+class ServedRecorder:
+    """把每页下发的 id 交给单写线程后立即返回，读接口不等组提交。
+
+    提交之前，本进程内同一会话的下一页请求从这里补上还没落库的 id，不会重复下发；
+    其他 worker 在提交前（毫秒级）读到的是上一次提交的集合。
+    """
+
+    def __init__(self, queue: WriteQueue):
+        self.queue = queue
+        self._lock = threading.Lock()
+        # token -> (anon_user_id, 未提交的 id, 未完成的写入数)
+        self._pending: Dict[str, Tuple[str, Set[int], int]] = {}
+        self._failed = 0
+
+    def record(self, token: str, anon_user_id: Optional[str], ids: List[int], ttl_seconds: float, new: bool) -> None:
+        with self._lock:
+            owner, pending, n = self._pending.get(token, (anon_user_id or "", set(), 0))
+            pending.update(ids)
+            self._pending[token] = (owner, pending, n + 1)
+        fut = self.queue.submit(record_served_op(token, anon_user_id, ids, ttl_seconds, new))
+        fut.add_done_callback(lambda f, t=token: self._done(t, f))
+
+    def _done(self, token: str, fut: Future) -> None:
+        with self._lock:
+            owner, pending, n = self._pending[token]
+            if n > 1:
+                self._pending[token] = (owner, pending, n - 1)
+            else:
+                del self._pending[token]
+        err = fut.exception()
+        if err is not None:
+            self._failed += 1
+            logger.warning(f"Failed to record served ids for feed session: {err}")
+
+    def load(self, db: Session, token: str, anon_user_id: Optional[str]) -> Optional[ServedSet]:
+        """load_served 加上本进程还没提交的 id；新建的会话在提交前也能认出来"""
+        # 先取未提交的 id 再读库：两者之间刚好提交的那批会出现在库里，不会漏
+        with self._lock:
+            entry = self._pending.get(token)
+            ids = list(entry[1]) if entry is not None and entry[0] == (anon_user_id or "") else None
+        served = load_served(db, token, anon_user_id)
+        if ids is None:
+            return served
+        if served is None:
+            served = ServedSet()
+        served.add(ids)
+        return served
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"pending_sessions": len(self._pending), "failed": self._failed}
+
+
+served_recorder = ServedRecorder(writer)
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import threading
+from typing import Dict, Optional, Sequence
+
+try:
+    import fcntl
+except ImportError:  # Windows 本地开发只跑单进程，不需要跨进程锁
+    fcntl = None
+
+from app.db import DB_PATH
+
+GENERATIONS_PATH = os.path.join(os.path.dirname(os.path.abspath(DB_PATH)), "generations.bin")
+
+# 每个名字占一个 8 字节槽位，只能在末尾追加，不能调整顺序
+SLOTS = ("catalog", "feedback")
+
+_SLOT = struct.Struct("<Q")
+
+
+class GenerationBus:
+    """跨 worker 的代数计数器：各进程 mmap 同一个小文件，写方加文件锁 +1，读方直接读共享内存。
+
+    每次请求读一次的开销只是一次内存读取，不依赖外部服务，worker 数量不限。
+    """
+
+    def __init__(self, path: str, slots: Sequence[str] = SLOTS):
+        self.path = path
+        self.slots: Dict[str, int] = {name: i * _SLOT.size for i, name in enumerate(slots)}
+        self._lock = threading.Lock()
+        self._fd: Optional[int] = None
+        self._mm: Optional[mmap.mmap] = None
+
+    def _map(self) -> mmap.mmap:
+        mm = self._mm
+        if mm is not None:
+            return mm
+        with self._lock:
+            if self._mm is None:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                size = len(self.slots) * _SLOT.size
+                # 只会变大：新增槽位时补零，已有计数不受影响
+                if os.fstat(fd).st_size < size:
+                    os.ftruncate(fd, size)
+                self._fd = fd
+                self._mm = mmap.mmap(fd, size)
+            return self._mm
+
+    def get(self, name: str) -> int:
+        return _SLOT.unpack_from(self._map(), self.slots[name])[0]
+
+    def bump(self, name: str) -> int:
+        mm = self._map()
+        offset = self.slots[name]
+        with self._lock:
+            # lockf 是进程级记录锁，fork 出来的 worker 之间同样互斥
+            if fcntl is not None:
+                fcntl.lockf(self._fd, fcntl.LOCK_EX)
+            try:
+                value = _SLOT.unpack_from(mm, offset)[0] + 1
+                _SLOT.pack_into(mm, offset, value)
+            finally:
+                if fcntl is not None:
+                    fcntl.lockf(self._fd, fcntl.LOCK_UN)
+        return value
+
+    def snapshot(self) -> Dict[str, int]:
+        return {name: self.get(name) for name in self.slots}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._mm is not None:
+                self._mm.close()
+                self._mm = None
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+
+generations = GenerationBus(GENERATIONS_PATH)
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import logging
+import os
+import re
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from app.core.config import get_settings
+from app.services.uploads import UPLOADS_DIR
+
+logger = logging.getLogger(__name__)
+
+# 封面缩略图变体：data/uploads/v/，由 /uploads/v/{name} 提供（缺失时首次请求现生成）
+VARIANTS_DIR = os.path.join(UPLOADS_DIR, "v")
+VARIANTS_URL = "/uploads/v/"
+VARIANT_WIDTHS = (240, 480, 960)
+VARIANT_EXT = ".webp"
+VARIANT_QUALITY = 75
+
+# 能生成变体的原图扩展名（upload_ext 已把 .jpeg 等统一）
+SOURCE_EXTS = (".jpg", ".png", ".webp", ".gif", ".bmp", ".tiff")
+
+# 变体名 `{原文件名，点换成下划线}-{宽度}.webp`，例如 `3fa9….jpg` -> `3fa9…_jpg-480.webp`
+_VARIANT_NAME = re.compile(r"^(?P<stem>[A-Za-z0-9_-]+)_(?P<ext>[a-z0-9]+)-(?P<width>\d+)\.webp$")
+_SOURCE_NAME = re.compile(r"^[A-Za-z0-9_-]+\.[a-z0-9]+$")
+
+
+def source_name(cover_url: Optional[str]) -> Optional[str]:
+    """本地上传的封面 `/uploads/{name}` -> name；外链、子目录、非图片返回 None"""
+    if not cover_url or not cover_url.startswith("/uploads/"):
+        return None
+    name = cover_url[len("/uploads/"):]
+    if not _SOURCE_NAME.match(name) or os.path.splitext(name)[1] not in SOURCE_EXTS:
+        return None
+    return name
+
+
+def variant_name(source: str, width: int) -> str:
+    return f"{source.replace('.', '_')}-{width}{VARIANT_EXT}"
+
+
+def parse_variant(name: str) -> Optional[tuple]:
+    """变体名 -> (原文件名, 宽度)；宽度不在 VARIANT_WIDTHS 里的不认，避免任意尺寸生成"""
+    m = _VARIANT_NAME.match(name)
+    if not m or int(m.group("width")) not in VARIANT_WIDTHS:
+        return None
+    return f"{m.group('stem')}.{m.group('ext')}", int(m.group("width"))
+
+
+def cover_variants(cover_url: Optional[str]) -> List[dict]:
+    """TeaOut.cover_variants：按宽度升序的 {width, url}，本地图片才有"""
+    source = source_name(cover_url)
+    if source is None:
+        return []
+    return [{"width": w, "url": VARIANTS_URL + variant_name(source, w)} for w in VARIANT_WIDTHS]
+
+
+def render_variants(src_path: str, out_dir: str, source: str, widths: Sequence[int], quality: int) -> List[str]:
+    """在子进程里跑：解码一次原图，按各宽度等比缩小存成 webp（原图更窄时不放大），返回写出的文件名"""
+    from PIL import Image, ImageOps
+
+    os.makedirs(out_dir, exist_ok=True)
+    written = []
+    with Image.open(src_path) as im:
+        # JPEG 可以在解码时直接按 1/2、1/4… 缩小，省掉大图全尺寸解码；按正方形要尺寸，EXIF 旋转后宽度也够
+        im.draft("RGB", (max(widths), max(widths)))
+        im = ImageOps.exif_transpose(im)
+        if im.mode not in ("RGB", "RGBA"):
+            im = im.convert("RGBA" if "transparency" in im.info or im.mode in ("LA", "PA") else "RGB")
+        for width in widths:
+            w = min(width, im.width)
+            h = max(1, round(im.height * w / im.width))
+            out = im if (w, h) == im.size else im.resize((w, h), Image.LANCZOS)
+            name = variant_name(source, width)
+            tmp = os.path.join(out_dir, f".{name}.{os.getpid()}.tmp")
+            out.save(tmp, "WEBP", quality=quality, method=4)
+            os.replace(tmp, os.path.join(out_dir, name))
+            written.append(name)
+    return written
+
+
+def _noop() -> None:
+    return None
+
+
+class VariantPool:
+    """在进程池里生成封面变体，缩放、编码不占 API worker 的 GIL。
+
+    同一原图正在生成时复用同一个 Future；进程池崩溃时重建。
+    """
+
+    def __init__(self, workers: int):
+        self.workers = max(1, workers)
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._inflight: Dict[str, Future] = {}
+        self._generated = 0
+        self._failed = 0
+
+    def start(self) -> None:
+        """建池并预热：fork 方式下子进程在首次提交时一次性拉起，放在启动阶段、其他后台线程起来之前"""
+        self._ensure_pool().submit(_noop).result()
+
+    def stop(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+            self._inflight.clear()
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _ensure_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            return self._pool_locked()
+
+    def _pool_locked(self) -> ProcessPoolExecutor:
+        # 调用方持有锁
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def missing(self, source: str) -> bool:
+        return any(not os.path.exists(os.path.join(VARIANTS_DIR, variant_name(source, w))) for w in VARIANT_WIDTHS)
+
+    def submit(self, source: str) -> Future:
+        """生成 source 的全部变体（不等待）；同一原图已在生成时返回同一个 Future"""
+        src_path = os.path.join(UPLOADS_DIR, source)
+        args = (render_variants, src_path, VARIANTS_DIR, source, VARIANT_WIDTHS, VARIANT_QUALITY)
+        # 查重、提交、登记在同一个临界区里，并发请求同一原图只会生成一次
+        with self._lock:
+            fut = self._inflight.get(source)
+            if fut is not None:
+                return fut
+            try:
+                fut = self._pool_locked().submit(*args)
+            except BrokenProcessPool:
+                logger.warning("Image variant pool broken, recreating")
+                self._pool = None
+                fut = self._pool_locked().submit(*args)
+            self._inflight[source] = fut
+        # 回调可能当场执行（已完成的 Future），要在锁外注册
+        fut.add_done_callback(lambda f, s=source: self._done(s, f))
+        return fut
+
+    def _done(self, source: str, fut: Future) -> None:
+        with self._lock:
+            if self._inflight.get(source) is fut:
+                del self._inflight[source]
+        if fut.cancelled():
+            return
+        err = fut.exception()
+        if err is None:
+            self._generated += 1
+        else:
+            self._failed += 1
+            logger.warning(f"Failed to render variants for {source}: {err}")
+
+    def ensure(self, cover_urls: Iterable[Optional[str]]) -> int:
+        """对本地上传、变体还不全的封面在后台生成，返回提交数（上传、导入后调用，不等结果）。
+
+        进程池没启动（脚本里）时什么也不做，留给首次请求现生成。
+        """
+        if self._pool is None:
+            return 0
+        n = 0
+        for source in {source_name(url) for url in cover_urls} - {None}:
+            if os.path.exists(os.path.join(UPLOADS_DIR, source)) and self.missing(source):
+                self.submit(source)
+                n += 1
+        return n
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "started": self._pool is not None,
+            "in_flight": len(self._inflight),
+            "generated": self._generated,
+            "failed": self._failed,
+        }
+
+
+variants = VariantPool(get_settings().image_workers)
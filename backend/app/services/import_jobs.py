@@ -0,0 +1,333 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import partial
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Set
+from uuid import uuid4
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import get_settings
+from app.db import SessionLocal
+from app.models import ImportJob
+from app.services.catalog import catalog
+from app.services.images import variants
+from app.services.importer import (
+    COMMIT_ROWS,
+    ImportFormatError,
+    iter_ok_items,
+    load_meta,
+    stage_source,
+    upsert_chunk,
+)
+from app.services.writer import writer
+
+logger = logging.getLogger(__name__)
+
+JOB_FINISHED = ("done", "failed")
+
+# 预览任务写进度（心跳）的最小间隔；确认导入的进度随每批一起提交
+PROGRESS_INTERVAL_SECONDS = 0.5
+
+
+class _Interrupted(Exception):
+    """进程停止时中断正在跑的任务，任务退回排队由下次启动继续"""
+
+
+class _Superseded(Exception):
+    """任务因心跳超时被重新排队、已由别的线程认领，本线程停止且不再写任务记录"""
+
+
+def _job_fence(job_id: str, attempt: int):
+    # 每次认领 attempts + 1，写任务记录时带上认领时的值，被别处重新认领后写入不生效
+    return (ImportJob.id == job_id, ImportJob.attempts == attempt)
+
+
+def _commit_chunk(db: Session, items: List[dict], job: Optional[ImportJob]) -> Dict[str, int]:
+    counts = upsert_chunk(db, items)
+    if job is not None:
+        # 和这一批数据同一事务：重启后从 processed_rows 接着导，计数不重不漏
+        fenced = db.execute(
+            update(ImportJob)
+            .where(*_job_fence(job.id, job.attempts))
+            .values(
+                processed_rows=ImportJob.processed_rows + len(items),
+                inserted=ImportJob.inserted + counts["inserted"],
+                updated=ImportJob.updated + counts["updated"],
+                skipped=ImportJob.skipped + counts["skipped"],
+                heartbeat_at=datetime.utcnow(),
+            )
+        ).rowcount
+        if not fenced:
+            # 抛出让这一批随事务回滚
+            raise _Superseded()
+    return counts
+
+
+def commit_items(items: Iterable[dict], job: Optional[ImportJob] = None, should_stop=None) -> Dict[str, int]:
+    """按自然键分批 upsert，每批经单写线程单独提交：写锁只占一批的时间，公共写入可以插在批与批之间"""
+    items = iter(items)
+    report = {"inserted": 0, "updated": 0, "skipped": 0}
+    try:
+        while True:
+            if should_stop is not None and should_stop():
+                raise _Interrupted()
+            chunk = list(islice(items, COMMIT_ROWS))
+            if not chunk:
+                break
+            counts = writer.run(partial(_commit_chunk, items=chunk, job=job))
+            for key, n in counts.items():
+                report[key] += n
+            # 引用本地上传图片的封面补生成缩略图（后台进程池，不等结果）
+            variants.ensure(item.get("cover_url") for item in chunk)
+    finally:
+        # 中途失败时已提交的批次也要让目录快照看到
+        if report["inserted"] or report["updated"]:
+            catalog.bump()
+    return report
+
+
+def rows_per_sec(job: ImportJob) -> float:
+    if job.started_at is None or not job.processed_rows:
+        return 0.0
+    elapsed = ((job.finished_at or datetime.utcnow()) - job.started_at).total_seconds()
+    return round(job.processed_rows / elapsed, 1) if elapsed > 0 else 0.0
+
+
+class ImportJobRunner:
+    """导入后台任务。任务记录在 import_job 表里，由本进程的线程池执行。
+
+    多个 worker 共用一张表，靠 `status='queued'` 的条件更新认领任务，同一任务只会被一个线程执行。
+    后台线程定时扫表：认领排队中的任务；把心跳超时的运行中任务（所在 worker 已退出）重新排队。
+    """
+
+    def __init__(self, session_factory: sessionmaker, workers: int, stale_seconds: float, poll_seconds: float):
+        self.session_factory = session_factory
+        self.workers = max(1, workers)
+        self.stale = timedelta(seconds=stale_seconds)
+        self.poll_seconds = poll_seconds
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._sweeper: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        # 已交给线程池、还没开始跑的任务，避免扫表时重复提交
+        self._pending: Set[str] = set()
+        self._finished = 0
+        self._failed = 0
+        self._requeued = 0
+
+    @property
+    def running(self) -> bool:
+        return self._executor is not None
+
+    def start(self) -> None:
+        with self._lock:
+            if self.running:
+                return
+            self._stopping.clear()
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="import-job")
+            self._sweeper = threading.Thread(target=self._sweep_loop, name="import-job-sweeper", daemon=True)
+            self._sweeper.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        with self._lock:
+            executor, sweeper = self._executor, self._sweeper
+            if executor is None:
+                return
+            self._stopping.set()
+            self._executor = None
+            self._sweeper = None
+        if sweeper is not None:
+            sweeper.join(timeout)
+        # 正在跑的任务在批与批之间发现停止标记后退回排队
+        executor.shutdown(wait=True, cancel_futures=True)
+        self._pending.clear()
+
+    def create(self, kind: str, import_id: str, filename: Optional[str] = None, total_rows: int = 0) -> ImportJob:
+        now = datetime.utcnow()
+        job = ImportJob(
+            id=uuid4().hex,
+            kind=kind,
+            status="queued",
+            import_id=import_id,
+            filename=filename,
+            total_rows=total_rows,
+            created_at=now,
+        )
+        with self.session_factory() as db:
+            db.add(job)
+            db.commit()
+            db.refresh(job)
+            db.expunge(job)
+        self._dispatch(job.id)
+        return job
+
+    def purge(self, ttl_seconds: float) -> int:
+        """删除结束超过 ttl 的任务记录（暂存文件同一 ttl 清理）"""
+        cutoff = datetime.utcnow() - timedelta(seconds=ttl_seconds)
+        with self.session_factory() as db:
+            n = db.execute(
+                delete(ImportJob).where(ImportJob.status.in_(JOB_FINISHED), ImportJob.finished_at < cutoff)
+            ).rowcount
+            db.commit()
+        return n
+
+    def _dispatch(self, job_id: str) -> None:
+        executor = self._executor
+        if executor is None:
+            # 未启动（脚本、测试）时直接在调用线程里执行
+            self._run(job_id)
+            return
+        with self._lock:
+            if job_id in self._pending:
+                return
+            self._pending.add(job_id)
+        try:
+            executor.submit(self._run, job_id)
+        except RuntimeError:
+            # 线程池已关闭，留在队列里等下次启动
+            self._pending.discard(job_id)
+
+    def _claim(self, job_id: str) -> Optional[ImportJob]:
+        now = datetime.utcnow()
+        with self.session_factory() as db:
+            claimed = db.execute(
+                update(ImportJob)
+                .where(ImportJob.id == job_id, ImportJob.status == "queued")
+                .values(
+                    status="running",
+                    started_at=func.coalesce(ImportJob.started_at, now),
+                    heartbeat_at=now,
+                    attempts=ImportJob.attempts + 1,
+                )
+            ).rowcount
+            db.commit()
+            if not claimed:
+                return None
+            job = db.get(ImportJob, job_id)
+            db.expunge(job)
+        return job
+
+    def _set(self, job: ImportJob, **values) -> None:
+        with self.session_factory() as db:
+            fenced = db.execute(update(ImportJob).where(*_job_fence(job.id, job.attempts)).values(**values)).rowcount
+            db.commit()
+        if not fenced:
+            raise _Superseded()
+
+    def _run(self, job_id: str) -> None:
+        self._pending.discard(job_id)
+        if self._stopping.is_set():
+            return
+        job = self._claim(job_id)
+        if job is None:
+            return
+        try:
+            try:
+                if job.kind == "preview":
+                    values = self._run_preview(job)
+                else:
+                    values = self._run_commit(job)
+            except _Interrupted:
+                self._set(job, status="queued")
+                logger.info(f"Import job {job_id} interrupted, requeued")
+                return
+            except (ImportFormatError, KeyError) as e:
+                message = str(e) if isinstance(e, ImportFormatError) else "import not found or expired"
+                self._set(job, status="failed", error=message, finished_at=datetime.utcnow())
+                self._failed += 1
+                return
+            except _Superseded:
+                raise
+            except Exception as e:
+                logger.exception(f"Import job {job_id} failed")
+                self._set(job, status="failed", error=f"{type(e).__name__}: {e}", finished_at=datetime.utcnow())
+                self._failed += 1
+                return
+            now = datetime.utcnow()
+            self._set(job, status="done", finished_at=now, heartbeat_at=now, **values)
+            self._finished += 1
+        except _Superseded:
+            logger.warning(f"Import job {job_id} was claimed elsewhere, stopping this run")
+
+    def _run_preview(self, job: ImportJob) -> dict:
+        last = [0.0]
+
+        def on_progress(processed: int, errors: int) -> None:
+            if self._stopping.is_set():
+                raise _Interrupted()
+            now = time.monotonic()
+            if now - last[0] < PROGRESS_INTERVAL_SECONDS:
+                return
+            last[0] = now
+            self._set(job, processed_rows=processed, error_rows=errors, ok_rows=processed - errors, heartbeat_at=datetime.utcnow())
+
+        meta = stage_source(job.import_id, job.filename, on_progress)
+        return {
+            "total_rows": meta["total_rows"],
+            "processed_rows": meta["total_rows"],
+            "ok_rows": meta["ok_rows"],
+            "error_rows": meta["error_rows"],
+        }
+
+    def _run_commit(self, job: ImportJob) -> dict:
+        # 上次中断前已提交的行直接跳过
+        items = islice(iter_ok_items(load_meta(job.import_id)), job.processed_rows, None)
+        commit_items(items, job=job, should_stop=self._stopping.is_set)
+        return {}
+
+    def sweep(self) -> int:
+        """把心跳超时的运行中任务退回排队，并认领所有排队中的任务，返回本次提交的任务数"""
+        cutoff = datetime.utcnow() - self.stale
+        with self.session_factory() as db:
+            requeued = db.execute(
+                update(ImportJob)
+                .where(ImportJob.status == "running", ImportJob.heartbeat_at < cutoff)
+                .values(status="queued")
+            ).rowcount
+            db.commit()
+            queued = db.execute(
+                select(ImportJob.id).where(ImportJob.status == "queued").order_by(ImportJob.created_at)
+            ).scalars().all()
+        if requeued:
+            self._requeued += requeued
+            logger.warning(f"Requeued {requeued} stale import jobs")
+        for job_id in queued:
+            self._dispatch(job_id)
+        return len(queued)
+
+    def _sweep_loop(self) -> None:
+        # 启动时先扫一次，接上重启前没跑完的任务
+        while True:
+            try:
+                self.sweep()
+            except Exception:
+                logger.exception("Import job sweep failed")
+            if self._stopping.wait(self.poll_seconds):
+                return
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "workers": self.workers,
+            "pending": len(self._pending),
+            "finished": self._finished,
+            "failed": self._failed,
+            "requeued": self._requeued,
+        }
+
+
+_settings = get_settings()
+import_jobs = ImportJobRunner(
+    SessionLocal,
+    workers=_settings.import_job_workers,
+    stale_seconds=_settings.import_job_stale_seconds,
+    poll_seconds=_settings.import_job_poll_seconds,
+)
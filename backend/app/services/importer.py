@@ -0,0 +1,454 @@
+from __future__ import annotations
+
+import csv
+import io
+import os
+import re
+import shutil
+import time
+from datetime import datetime
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from uuid import uuid4
+
+import orjson
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+from app.core.responses import dumps
+from app.db import DB_PATH
+from app.models import Tea
+from app.services.uploads import copy_limited
+
+IMPORTS_DIR = os.path.join(os.path.dirname(os.path.abspath(DB_PATH)), "imports")
+
+# 模板列名 -> 字段（docs/import-template.csv）
+COLUMNS = {
+    "名称": "name",
+    "分类": "category",
+    "年份": "year",
+    "产地": "origin",
+    "规格": "spec",
+    "主图URL": "cover_url",
+    "价格下限": "price_min",
+    "价格上限": "price_max",
+    "简介": "intro",
+}
+REQUIRED_COLUMNS = ["名称", "分类", "年份", "产地", "规格", "主图URL"]
+
+# 必填文本字段 -> 错误提示
+_REQUIRED_TEXT = (
+    ("name", "名称必填"),
+    ("category", "分类必填"),
+    ("origin", "产地必填"),
+    ("spec", "规格必填"),
+    ("cover_url", "主图URL必填"),
+)
+
+# 每次按列校验的行数
+CHUNK_ROWS = 1000
+# 暂存文件每隔多少行记一个字节偏移，分页时直接 seek 过去
+CHECKPOINT_ROWS = 1000
+# 确认导入每批写入（单独提交）的行数
+COMMIT_ROWS = 1000
+
+# 进度回调 (已处理行数, 其中失败行数)
+Progress = Callable[[int, int], None]
+
+# 重复导入按自然键匹配已有茶叶（迁移 6 建了同名索引）
+NATURAL_KEY = ("name", "year", "spec")
+# 匹配上时用表格内容覆盖的字段；status / weight 是后台运营设置，重复导入不覆盖
+UPSERT_FIELDS = ("category", "origin", "price_min", "price_max", "intro", "cover_url")
+
+_IMPORT_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+class ImportFormatError(ValueError):
+    """文件格式或表头不符合模板"""
+
+
+def detect_format(filename: Optional[str], head: bytes) -> str:
+    ext = os.path.splitext(filename or "")[1].lower()
+    if ext in (".xlsx", ".xlsm") or (not ext and head.startswith(b"PK")):
+        return "xlsx"
+    if ext in (".csv", ".txt") or not ext:
+        return "csv"
+    raise ImportFormatError("仅支持 .xlsx 或 .csv（.xls 请另存为 .xlsx）")
+
+
+def iter_xlsx(f: IO[bytes]) -> Iterator[Sequence[Any]]:
+    # 只读模式按行流式读取，不把整张表载入内存
+    from openpyxl import load_workbook
+
+    wb = load_workbook(f, read_only=True, data_only=True)
+    try:
+        yield from wb.active.iter_rows(values_only=True)
+    finally:
+        wb.close()
+
+
+def iter_csv(f: IO[bytes]) -> Iterator[Sequence[Any]]:
+    # utf-8-sig 兼容 Excel 另存的带 BOM 文件
+    text = io.TextIOWrapper(f, encoding="utf-8-sig", newline="")
+    try:
+        yield from csv.reader(text)
+    finally:
+        text.detach()
+
+
+def _text(v: Any) -> str:
+    return "" if v is None else str(v).strip()
+
+
+def _int(v: Any) -> Optional[int]:
+    """单元格 -> 整数；空值为 None，无法解析时抛 ValueError"""
+    if v is None or isinstance(v, bool):
+        return None
+    if isinstance(v, int):
+        return v
+    if isinstance(v, float):
+        if v != v or not v.is_integer():
+            raise ValueError(v)
+        return int(v)
+    s = str(v).strip()
+    if not s:
+        return None
+    try:
+        return int(s)
+    except ValueError:
+        f = float(s)
+        if not f.is_integer():
+            raise
+        return int(f)
+
+
+def _int_column(values: List[Any]) -> Tuple[List[Optional[int]], List[bool]]:
+    out: List[Optional[int]] = []
+    bad: List[bool] = []
+    for v in values:
+        try:
+            out.append(_int(v))
+            bad.append(False)
+        except (ValueError, OverflowError):
+            out.append(None)
+            bad.append(True)
+    return out, bad
+
+
+def validate_chunk(positions: Dict[str, int], rows: List[Sequence[Any]], indexes: List[int]) -> List[dict]:
+    """按列校验一批行，返回与预览行结构一致的 dict（index/ok/errors/data）"""
+    n = len(rows)
+
+    def column(field: str) -> List[Any]:
+        i = positions.get(field)
+        if i is None:
+            return [None] * n
+        return [r[i] if i < len(r) else None for r in rows]
+
+    text = {field: [_text(v) for v in column(field)] for field, _ in _REQUIRED_TEXT}
+    intro = [_text(v) or None for v in column("intro")]
+    year, year_bad = _int_column(column("year"))
+    price_min, price_min_bad = _int_column(column("price_min"))
+    price_max, price_max_bad = _int_column(column("price_max"))
+
+    errors: List[List[str]] = [[] for _ in range(n)]
+    for field, message in _REQUIRED_TEXT[:2]:
+        for i, v in enumerate(text[field]):
+            if not v:
+                errors[i].append(message)
+    for i, v in enumerate(year):
+        if year_bad[i] or v is None or v <= 0:
+            errors[i].append("年份必须为数字")
+    for field, message in _REQUIRED_TEXT[2:]:
+        for i, v in enumerate(text[field]):
+            if not v:
+                errors[i].append(message)
+    for i in range(n):
+        if price_min_bad[i] or price_max_bad[i]:
+            errors[i].append("价格必须为数字")
+
+    out = []
+    for i in range(n):
+        if errors[i]:
+            out.append({"index": indexes[i], "ok": False, "errors": errors[i], "data": None})
+            continue
+        out.append({
+            "index": indexes[i],
+            "ok": True,
+            "errors": [],
+            "data": {
+                "name": text["name"][i],
+                "category": text["category"][i],
+                "year": year[i],
+                "origin": text["origin"][i],
+                "spec": text["spec"][i],
+                "price_min": price_min[i],
+                "price_max": price_max[i],
+                "intro": intro[i],
+                "cover_url": text["cover_url"][i],
+                "status": "online",
+                "weight": 0,
+            },
+        })
+    return out
+
+
+class _StagingFile:
+    """一行一条 JSON 的追加写文件，每 CHECKPOINT_ROWS 行记一次字节偏移"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._f = open(path, "wb")
+        self.count = 0
+        self.offsets: List[int] = []
+
+    def write(self, line: bytes) -> None:
+        if self.count % CHECKPOINT_ROWS == 0:
+            self.offsets.append(self._f.tell())
+        self._f.write(line)
+        self._f.write(b"\n")
+        self.count += 1
+
+    def close(self) -> None:
+        self._f.close()
+
+
+def _staging_dir(import_id: str) -> str:
+    if not _IMPORT_ID.match(import_id):
+        raise KeyError(import_id)
+    return os.path.join(IMPORTS_DIR, import_id)
+
+
+def purge_expired(ttl_seconds: float) -> int:
+    """删除超过 ttl 的暂存目录，返回删除数"""
+    if not os.path.isdir(IMPORTS_DIR):
+        return 0
+    cutoff = time.time() - ttl_seconds
+    removed = 0
+    for name in os.listdir(IMPORTS_DIR):
+        path = os.path.join(IMPORTS_DIR, name)
+        if os.path.isdir(path) and os.path.getmtime(path) < cutoff:
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+    return removed
+
+
+def save_upload(f: IO[bytes], filename: Optional[str], max_bytes: int) -> str:
+    """把上传文件流式拷进新建的暂存目录（source.xlsx / source.csv），返回 import_id。
+
+    扩展名不支持时抛 ImportFormatError，超过 max_bytes 时抛 UploadTooLarge（不留暂存目录）。
+    """
+    head = f.read(4)
+    f.seek(0)
+    fmt = detect_format(filename, head)
+    import_id = uuid4().hex
+    directory = _staging_dir(import_id)
+    os.makedirs(directory)
+    try:
+        with open(os.path.join(directory, f"source.{fmt}"), "wb") as out:
+            copy_limited(f, out, max_bytes)
+    except BaseException:
+        shutil.rmtree(directory, ignore_errors=True)
+        raise
+    return import_id
+
+
+def stage_source(import_id: str, filename: Optional[str], on_progress: Optional[Progress] = None) -> dict:
+    """解析 save_upload 存下的文件并暂存校验结果；可重复执行（上次中断留下的半截结果会被覆盖）"""
+    directory = _staging_dir(import_id)
+    for fmt in ("xlsx", "csv"):
+        path = os.path.join(directory, f"source.{fmt}")
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                return stage_import(f, filename, import_id=import_id, fmt=fmt, on_progress=on_progress)
+    raise KeyError(import_id)
+
+
+def stage_import(
+    f: IO[bytes],
+    filename: Optional[str],
+    import_id: Optional[str] = None,
+    fmt: Optional[str] = None,
+    on_progress: Optional[Progress] = None,
+) -> dict:
+    """流式解析上传文件并逐块校验，结果写入暂存目录（全部行 + 失败行各一份），返回 meta。
+
+    内存只占一个块（CHUNK_ROWS 行）和偏移表，与文件大小无关。
+    """
+    if fmt is None:
+        head = f.read(4)
+        f.seek(0)
+        fmt = detect_format(filename, head)
+    rows = iter_xlsx(f) if fmt == "xlsx" else iter_csv(f)
+    try:
+        return _stage_rows(rows, filename, fmt, import_id or uuid4().hex, on_progress)
+    finally:
+        # 在上传文件关闭前结束生成器（关闭工作簿 / 解绑文本包装）
+        rows.close()
+
+
+def _stage_rows(
+    rows: Iterator[Sequence[Any]],
+    filename: Optional[str],
+    fmt: str,
+    import_id: str,
+    on_progress: Optional[Progress],
+) -> dict:
+    try:
+        header = next(rows, None)
+    except UnicodeDecodeError:
+        raise ImportFormatError("CSV 需为 UTF-8 编码")
+    except Exception:
+        raise ImportFormatError("文件无法解析，请使用导入模板")
+    columns = [_text(c) for c in (header or ())]
+    missing = [c for c in REQUIRED_COLUMNS if c not in columns]
+    if missing:
+        raise ImportFormatError(f"missing columns: {missing}")
+    positions = {COLUMNS[c]: i for i, c in enumerate(columns) if c in COLUMNS}
+
+    directory = _staging_dir(import_id)
+    os.makedirs(directory, exist_ok=True)
+    all_rows = _StagingFile(os.path.join(directory, "rows.jsonl"))
+    bad_rows = _StagingFile(os.path.join(directory, "errors.jsonl"))
+    try:
+        chunk: List[Sequence[Any]] = []
+        indexes: List[int] = []
+
+        def flush() -> None:
+            for item in validate_chunk(positions, chunk, indexes):
+                line = dumps(item)
+                all_rows.write(line)
+                if not item["ok"]:
+                    bad_rows.write(line)
+            chunk.clear()
+            indexes.clear()
+            if on_progress is not None:
+                on_progress(all_rows.count, bad_rows.count)
+
+        # index 为数据行序号（从 0 开始，对应表格第 index+2 行），整行为空的跳过
+        try:
+            for index, row in enumerate(rows):
+                if not any(_text(v) for v in row):
+                    continue
+                chunk.append(row)
+                indexes.append(index)
+                if len(chunk) >= CHUNK_ROWS:
+                    flush()
+        except UnicodeDecodeError:
+            raise ImportFormatError("CSV 需为 UTF-8 编码")
+        if chunk:
+            flush()
+    except BaseException:
+        all_rows.close()
+        bad_rows.close()
+        # 只删本次写的暂存文件，上传的原文件留着（后台任务中断后可重跑）
+        for staged in (all_rows.path, bad_rows.path):
+            os.remove(staged)
+        if not os.listdir(directory):
+            os.rmdir(directory)
+        raise
+    all_rows.close()
+    bad_rows.close()
+
+    meta = {
+        "import_id": import_id,
+        "filename": filename,
+        "format": fmt,
+        "columns": columns,
+        "total_rows": all_rows.count,
+        "ok_rows": all_rows.count - bad_rows.count,
+        "error_rows": bad_rows.count,
+        "offsets": {"all": all_rows.offsets, "error": bad_rows.offsets},
+        "created_at": time.time(),
+    }
+    with open(os.path.join(directory, "meta.json"), "wb") as out:
+        out.write(orjson.dumps(meta))
+    return meta
+
+
+def load_meta(import_id: str) -> dict:
+    """暂存不存在或已过期清理时抛 KeyError"""
+    try:
+        with open(os.path.join(_staging_dir(import_id), "meta.json"), "rb") as f:
+            return orjson.loads(f.read())
+    except FileNotFoundError:
+        raise KeyError(import_id)
+
+
+def read_page(meta: dict, offset: int, limit: int, status: str = "all") -> List[bytes]:
+    """从暂存文件读取一页预览行（已编码的 JSON），先按偏移表 seek 再跳过不足一段的行"""
+    name = "errors.jsonl" if status == "error" else "rows.jsonl"
+    offsets = meta["offsets"][status]
+    block = offset // CHECKPOINT_ROWS
+    if block >= len(offsets):
+        return []
+    lines: List[bytes] = []
+    with open(os.path.join(_staging_dir(meta["import_id"]), name), "rb") as f:
+        f.seek(offsets[block])
+        for _ in range(offset - block * CHECKPOINT_ROWS):
+            if not f.readline():
+                return []
+        for line in f:
+            lines.append(line.rstrip(b"\n"))
+            if len(lines) >= limit:
+                break
+    return lines
+
+
+def iter_ok_items(meta: dict) -> Iterator[dict]:
+    """逐行读出可导入的数据（TeaBase 字段），供确认导入分批写库"""
+    with open(os.path.join(_staging_dir(meta["import_id"]), "rows.jsonl"), "rb") as f:
+        for line in f:
+            item = orjson.loads(line)
+            if item["ok"]:
+                yield item["data"]
+
+
+def natural_key(item: dict) -> Tuple[str, int, str]:
+    return (item["name"], item["year"], item["spec"])
+
+
+def existing_by_name_query(names):
+    # 按 name 走 ix_tea_natural_key 前缀查找，year / spec 在内存里比对；
+    # 行值 (name, year, spec) IN (VALUES …) 在 SQLite 里会扫整个索引
+    return (
+        select(Tea.id, *(getattr(Tea, f) for f in NATURAL_KEY + UPSERT_FIELDS))
+        .where(Tea.name.in_(names))
+        .order_by(Tea.id)
+    )
+
+
+def upsert_chunk(db: Session, items: List[dict]) -> Dict[str, int]:
+    """按自然键写入一批：新键插入，已有且内容有变的更新，内容相同的跳过。不提交，由调用方提交。
+
+    同一批内键重复时以后出现的行为准，前面的计为 skipped；库里已有重复键时只更新 id 最小的一条。
+    时间戳取执行时刻，保证 updated_at 与提交时间接近（目录增量刷新按它取变更）。
+    """
+    latest: Dict[Tuple[str, int, str], dict] = {}
+    for item in items:
+        latest[natural_key(item)] = item
+    skipped = len(items) - len(latest)
+
+    existing: Dict[Tuple[str, int, str], Any] = {}
+    for row in db.execute(existing_by_name_query({k[0] for k in latest})):
+        key = (row.name, row.year, row.spec)
+        if key in latest and key not in existing:
+            existing[key] = row
+
+    now = datetime.utcnow()
+    inserts: List[dict] = []
+    updates: List[dict] = []
+    for key, item in latest.items():
+        row = existing.get(key)
+        if row is None:
+            inserts.append(dict(item, created_at=now, updated_at=now))
+        elif any(getattr(row, f) != item.get(f) for f in UPSERT_FIELDS):
+            updates.append(dict({f: item.get(f) for f in UPSERT_FIELDS}, id=row.id, updated_at=now))
+        else:
+            skipped += 1
+
+    if inserts:
+        db.execute(insert(Tea.__table__), inserts)
+    if updates:
+        # ORM 按主键批量 UPDATE（executemany）
+        db.execute(update(Tea), updates)
+    return {"inserted": len(inserts), "updated": len(updates), "skipped": skipped}
@@ -0,0 +1,371 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import get_settings
+from app.db import ReadSessionLocal
+from app.models import Feedback, Tea, TeaStats
+from app.services.catalog import catalog
+from app.services.generations import GenerationBus, generations
+from app.services.reco import (
+    PERSONAL_CATEGORY_CAP,
+    PERSONAL_CATEGORY_STEP,
+    PERSONAL_YEAR_CAP,
+    PERSONAL_YEAR_STEP,
+    YEAR_BUCKET,
+    laplace_like_rate,
+    personal_boost,
+    recency_boost_days,
+)
+
+_EPOCH = datetime(1970, 1, 1)
+
+# (score, created_ts, id)
+SortKey = Tuple[float, float, int]
+
+
+def to_ts(dt: Optional[datetime]) -> float:
+    # 库里的时间都是 naive UTC，按 naive 纪元换算，避免本地时区参与
+    if dt is None:
+        return 0.0
+    return (dt - _EPOCH).total_seconds()
+
+
+@dataclass(frozen=True)
+class PersonalPrefs:
+    """某个 anon_user_id 的历史偏好：分类 / 年份段 -> 加成分"""
+
+    category: Dict[str, float]
+    year_bucket: Dict[int, float]
+
+    def boost(self, category_codes: np.ndarray, year_buckets: np.ndarray, category_index: Dict[str, int]) -> np.ndarray:
+        lookup = np.zeros(len(category_index) or 1, dtype=np.float64)
+        for cat, value in self.category.items():
+            code = category_index.get(cat)
+            if code is not None:
+                lookup[code] = value
+        out = lookup[category_codes]
+        # 用户涉及的年份段很少，逐段做一次向量比较即可
+        for bucket, value in self.year_bucket.items():
+            out = out + np.where(year_buckets == bucket, value, 0.0)
+        return out
+
+
+@dataclass(frozen=True)
+class RankArrays:
+    """在线茶叶的打分数组快照，下标一一对应"""
+
+    ids: np.ndarray
+    created_ts: np.ndarray
+    category_codes: np.ndarray
+    year_buckets: np.ndarray
+    # weight + 100*likeRate + recency_boost，与请求无关的部分预先算好
+    base_score: np.ndarray
+    category_index: Dict[str, int]
+    built_at: float
+    # 打分相关数组的摘要：各 worker 统计相同时一致，用作 feed ETag 的一部分
+    digest: str
+
+    @classmethod
+    def from_columns(
+        cls,
+        ids: Sequence[int],
+        categories: Sequence[str],
+        years: Sequence[int],
+        weights: Sequence[int],
+        created_ts: Sequence[float],
+        pv: Sequence[int],
+        likes: Sequence[int],
+        now_ts: Optional[float] = None,
+    ) -> "RankArrays":
+        if now_ts is None:
+            now_ts = to_ts(datetime.utcnow())
+
+        category_index: Dict[str, int] = {}
+        codes = np.fromiter((category_index.setdefault(c, len(category_index)) for c in categories), dtype=np.int32, count=len(categories))
+
+        created = np.asarray(created_ts, dtype=np.float64)
+        age_days = np.floor((now_ts - created) / 86400.0)
+        base = (
+            np.asarray(weights, dtype=np.float64)
+            + 100.0 * laplace_like_rate(np.asarray(likes, dtype=np.float64), np.asarray(pv, dtype=np.float64))
+            + recency_boost_days(age_days)
+        )
+
+        id_arr = np.asarray(ids, dtype=np.int64)
+        year_buckets = np.asarray(years, dtype=np.int64) // YEAR_BUCKET
+        h = hashlib.sha1()
+        for arr in (id_arr, created, codes, year_buckets, base):
+            h.update(arr.tobytes())
+        h.update(repr(sorted(category_index.items())).encode("utf-8"))
+
+        return cls(
+            ids=id_arr,
+            created_ts=created,
+            category_codes=codes,
+            year_buckets=year_buckets,
+            base_score=base,
+            category_index=category_index,
+            built_at=time.monotonic(),
+            digest=h.hexdigest(),
+        )
+
+    def __len__(self) -> int:
+        return int(self.ids.size)
+
+    def _lookup(self, bitmap: np.ndarray) -> np.ndarray:
+        # 按 id 下标的位图 -> 与 ids 对齐的布尔数组，超出位图范围的 id 视为 False
+        in_range = self.ids < bitmap.size
+        hit = np.zeros(self.ids.size, dtype=bool)
+        hit[in_range] = bitmap[self.ids[in_range]]
+        return hit
+
+    def rank(
+        self,
+        *,
+        category: Optional[str] = None,
+        include: Optional[Iterable[int]] = None,
+        exclude: Optional[Iterable[int]] = None,
+        served: Optional[np.ndarray] = None,
+        allowed: Optional[np.ndarray] = None,
+        prefs: Optional[PersonalPrefs] = None,
+        after: Optional[SortKey] = None,
+        offset: int = 0,
+        limit: int = 10,
+    ) -> "RankPage":
+        """按 score desc, created_at desc, id desc 排序取一页；after 为上一页最后一条的排序键（keyset 翻页），
+        served 为按 id 下标的已下发位图（feed 会话），命中的条目被排除；
+        allowed 为按 id 下标的筛选结果位图（分面筛选），只保留命中的条目"""
+        mask = np.ones(self.ids.size, dtype=bool)
+        if category:
+            code = self.category_index.get(category)
+            if code is None:
+                return RankPage([], 0, None)
+            mask &= self.category_codes == code
+        if include is not None:
+            mask &= np.isin(self.ids, np.fromiter(include, dtype=np.int64))
+        if exclude:
+            mask &= ~np.isin(self.ids, np.fromiter(exclude, dtype=np.int64))
+        if served is not None and served.size:
+            mask &= ~self._lookup(served)
+        if allowed is not None:
+            mask &= self._lookup(allowed)
+
+        idx = np.flatnonzero(mask)
+        total = int(idx.size)
+
+        score = self.base_score[idx]
+        if prefs is not None:
+            score = score + prefs.boost(self.category_codes[idx], self.year_buckets[idx], self.category_index)
+
+        if after is not None:
+            a_score, a_created, a_id = after
+            created = self.created_ts[idx]
+            keep = (score < a_score) | (
+                (score == a_score) & ((created < a_created) | ((created == a_created) & (self.ids[idx] < a_id)))
+            )
+            idx = idx[keep]
+            score = score[keep]
+
+        remaining = int(idx.size)
+        if offset >= remaining:
+            return RankPage([], total, None)
+
+        k = min(offset + limit, remaining)
+        if k < remaining:
+            # 只精排前 k 名：取第 k 大的分数做门槛，连同并列项一起排序，保证与全量排序结果一致
+            kth = np.partition(score, remaining - k)[remaining - k]
+            cand = np.flatnonzero(score >= kth)
+        else:
+            cand = np.arange(remaining)
+
+        rows = idx[cand]
+        order = np.lexsort((-self.ids[rows], -self.created_ts[rows], -score[cand]))
+        picked = order[offset:k]
+        page = rows[picked]
+
+        next_key: Optional[SortKey] = None
+        if k < remaining:
+            last = page[-1]
+            next_key = (float(score[cand[picked[-1]]]), float(self.created_ts[last]), int(self.ids[last]))
+        return RankPage(self.ids[page].tolist(), total, next_key)
+
+
+@dataclass(frozen=True)
+class RankPage:
+    ids: List[int]
+    # 过滤后的命中总数（不受 after/offset 影响）
+    total: int
+    # 本页最后一条的排序键，没有下一页时为 None
+    next_key: Optional[SortKey]
+
+
+def rank_rows_query():
+    # 计数直接读 tea_stats，一条 LEFT JOIN 取齐
+    return (
+        select(Tea.id, Tea.category, Tea.year, Tea.weight, Tea.created_at, TeaStats.pv, TeaStats.likes)
+        .outerjoin(TeaStats, TeaStats.tea_id == Tea.id)
+        .where(Tea.status == "online")
+    )
+
+
+def personal_history_query(anon_user_id: str):
+    return (
+        select(Tea.category, Tea.year, Feedback.action)
+        .join(Tea, Tea.id == Feedback.tea_id)
+        .where(Feedback.anon_user_id == anon_user_id)
+    )
+
+
+def feedback_users_since_query(last_id: int):
+    return select(Feedback.id, Feedback.anon_user_id).where(Feedback.id > last_id)
+
+
+def load_rank_arrays(db: Session) -> RankArrays:
+    rows = db.execute(rank_rows_query()).all()
+
+    return RankArrays.from_columns(
+        ids=[r.id for r in rows],
+        categories=[r.category for r in rows],
+        years=[r.year for r in rows],
+        weights=[r.weight or 0 for r in rows],
+        created_ts=[to_ts(r.created_at) for r in rows],
+        pv=[r.pv or 0 for r in rows],
+        likes=[r.likes or 0 for r in rows],
+    )
+
+
+def load_personal_prefs(db: Session, anon_user_id: str) -> Optional[PersonalPrefs]:
+    rows = db.execute(personal_history_query(anon_user_id)).all()
+    if not rows:
+        return None
+
+    cat_net: Dict[str, int] = {}
+    year_net: Dict[int, int] = {}
+    for category, year, action in rows:
+        delta = 1 if action == "like" else -1
+        cat_net[category] = cat_net.get(category, 0) + delta
+        bucket = int(year) // YEAR_BUCKET
+        year_net[bucket] = year_net.get(bucket, 0) + delta
+
+    return PersonalPrefs(
+        category={k: personal_boost(v, PERSONAL_CATEGORY_STEP, PERSONAL_CATEGORY_CAP) for k, v in cat_net.items() if v},
+        year_bucket={k: personal_boost(v, PERSONAL_YEAR_STEP, PERSONAL_YEAR_CAP) for k, v in year_net.items() if v},
+    )
+
+
+class PersonalPrefsCache:
+    """anon_user_id -> 个人偏好的 LRU 缓存，个性化请求不必每次都扫一遍该用户的全部反馈。
+
+    反馈写入会 bump feedback 代数；发现变化时按主键追尾新反馈，只作废涉及到的用户。
+    目录版本变化（茶叶分类、年份可能改了）时整体清空。
+    查库都用新开的只读会话：代数先读，之后开始的读事务一定能看到对应的写入。
+    """
+
+    def __init__(self, session_factory: sessionmaker, bus: GenerationBus, max_users: int, slot: str = "feedback"):
+        self.session_factory = session_factory
+        self.bus = bus
+        self.slot = slot
+        self.max_users = max_users
+        self._lock = threading.Lock()
+        self._users: "OrderedDict[str, Optional[PersonalPrefs]]" = OrderedDict()
+        self._gen = -1
+        self._catalog_version = -1
+        self._last_id = 0
+        self._hits = 0
+        self._misses = 0
+
+    def _sync(self) -> None:
+        gen = self.bus.get(self.slot)
+        version = catalog.version
+        if gen == self._gen and version == self._catalog_version:
+            return
+        with self._lock:
+            if gen == self._gen and version == self._catalog_version:
+                return
+            with self.session_factory() as db:
+                if version != self._catalog_version:
+                    self._users.clear()
+                    self._last_id = db.execute(select(func.max(Feedback.id))).scalar() or 0
+                else:
+                    for feedback_id, anon_user_id in db.execute(feedback_users_since_query(self._last_id)):
+                        self._last_id = max(self._last_id, feedback_id)
+                        self._users.pop(anon_user_id, None)
+            self._gen = gen
+            self._catalog_version = version
+
+    def get(self, anon_user_id: str) -> Optional[PersonalPrefs]:
+        self._sync()
+        with self._lock:
+            if anon_user_id in self._users:
+                self._users.move_to_end(anon_user_id)
+                self._hits += 1
+                return self._users[anon_user_id]
+            self._misses += 1
+            gen, version = self._gen, self._catalog_version
+
+        with self.session_factory() as db:
+            prefs = load_personal_prefs(db, anon_user_id)
+        with self._lock:
+            # 加载期间发生过追尾 / 清空的，结果可能已过时，不缓存
+            if (gen, version) == (self._gen, self._catalog_version):
+                self._users[anon_user_id] = prefs
+                while len(self._users) > self.max_users:
+                    self._users.popitem(last=False)
+        return prefs
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"users": len(self._users), "max_users": self.max_users, "hits": self._hits, "misses": self._misses}
+
+
+class RankingEngine:
+    """进程内打分缓存：目录版本变化时重建，统计数据按 TTL 刷新"""
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._arrays: Optional[RankArrays] = None
+        self._version = 0
+
+    def _fresh(self, arrays: Optional[RankArrays]) -> bool:
+        return (
+            arrays is not None
+            and self._version == catalog.version
+            and time.monotonic() - arrays.built_at < self.ttl_seconds
+        )
+
+    def peek(self) -> Optional[RankArrays]:
+        """不查库：缓存仍有效时返回，否则返回 None（feed 条件请求的快速判断用）"""
+        arrays = self._arrays
+        return arrays if self._fresh(arrays) else None
+
+    def get(self, db: Session) -> RankArrays:
+        arrays = self._arrays
+        if self._fresh(arrays):
+            return arrays
+
+        with self._lock:
+            arrays = self._arrays
+            if self._fresh(arrays):
+                return arrays
+            # 先记版本再加载：加载期间发生的 bump 会在下次请求触发重建
+            version = catalog.version
+            arrays = load_rank_arrays(db)
+            self._arrays = arrays
+            self._version = version
+            return arrays
+
+
+ranking_engine = RankingEngine(ttl_seconds=get_settings().rank_cache_ttl_seconds)
+personal_prefs = PersonalPrefsCache(ReadSessionLocal, generations, max_users=get_settings().personal_prefs_max_users)
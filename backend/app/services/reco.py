@@ -2,9 +2,18 @@ from __future__ import annotations
 
 from datetime import datetime, timedelta
 
+import numpy as np
+
+# 个性化加成：同分类 / 同年份段（YEAR_BUCKET 年一段）按历史 like(+1) / dislike(-1) 净值加减分
+YEAR_BUCKET = 5
+PERSONAL_CATEGORY_STEP = 3.0
+PERSONAL_CATEGORY_CAP = 15.0
+PERSONAL_YEAR_STEP = 1.5
+PERSONAL_YEAR_CAP = 6.0
+
 
 def laplace_like_rate(likes: int, pv: int) -> float:
-    # (likes+1)/(pv+2) 避免冷启动极端
+    # (likes+1)/(pv+2) 避免冷启动极端；也可直接传 numpy 数组逐元素计算
     return (likes + 1) / (pv + 2)
 
 
@@ -16,3 +25,12 @@ def recency_boost(created_at: datetime) -> float:
     if days <= 30:
         return 0.05
     return 0.0
+
+
+def recency_boost_days(age_days: np.ndarray) -> np.ndarray:
+    # recency_boost 的向量化版本，age_days 为已向下取整的天数
+    return np.where(age_days <= 7, 0.15, np.where(age_days <= 30, 0.05, 0.0))
+
+
+def personal_boost(net: int, step: float, cap: float) -> float:
+    return float(min(cap, max(-cap, net * step)))
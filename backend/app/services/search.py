@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import logging
+from typing import Optional, Sequence
+
+from sqlalchemy import and_, case, column, func, literal_column, or_, select, table
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import OperationalError
+
+from app.models import Tea
+
+logger = logging.getLogger(__name__)
+
+# trigram 分词按 3 个字符切分，中文无需分词；更短的词在索引里匹配不到，用 LIKE
+MIN_TRIGRAM_CHARS = 3
+
+# bm25 各列权重：name, origin, spec, intro
+FTS_COLUMNS = ("name", "origin", "spec", "intro")
+FTS_WEIGHTS = (10.0, 3.0, 2.0, 1.0)
+
+tea_fts = table("tea_fts", column("rowid"), *(column(name) for name in FTS_COLUMNS))
+
+_FTS_DDL = [
+    # 外部内容表：索引里不重复存原文，由触发器与 tea 保持同步（后台增删改、导入、手工 SQL 都覆盖）
+    "CREATE VIRTUAL TABLE IF NOT EXISTS tea_fts USING fts5("
+    "name, origin, spec, intro, content='tea', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS tea_fts_ai AFTER INSERT ON tea BEGIN "
+    "INSERT INTO tea_fts(rowid, name, origin, spec, intro) VALUES (new.id, new.name, new.origin, new.spec, new.intro); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS tea_fts_ad AFTER DELETE ON tea BEGIN "
+    "INSERT INTO tea_fts(tea_fts, rowid, name, origin, spec, intro) "
+    "VALUES ('delete', old.id, old.name, old.origin, old.spec, old.intro); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS tea_fts_au AFTER UPDATE OF name, origin, spec, intro ON tea BEGIN "
+    "INSERT INTO tea_fts(tea_fts, rowid, name, origin, spec, intro) "
+    "VALUES ('delete', old.id, old.name, old.origin, old.spec, old.intro); "
+    "INSERT INTO tea_fts(rowid, name, origin, spec, intro) VALUES (new.id, new.name, new.origin, new.spec, new.intro); "
+    "END",
+]
+
+_fts_ready: Optional[bool] = None
+
+
+def create_fts(conn: Connection) -> bool:
+    """建全文索引表与同步触发器并重建索引；SQLite 不支持 FTS5/trigram 时返回 False（搜索退回 LIKE）"""
+    global _fts_ready
+    try:
+        for ddl in _FTS_DDL:
+            conn.exec_driver_sql(ddl)
+    except OperationalError:
+        logger.warning("SQLite FTS5 trigram tokenizer unavailable, keyword search falls back to LIKE", exc_info=True)
+        _fts_ready = False
+        return False
+    conn.exec_driver_sql("INSERT INTO tea_fts(tea_fts) VALUES ('rebuild')")
+    _fts_ready = True
+    return True
+
+
+def fts_ready(conn: Connection) -> bool:
+    global _fts_ready
+    if _fts_ready is None:
+        _fts_ready = conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tea_fts'"
+        ).first() is not None
+    return _fts_ready
+
+
+def fts_match(terms: Sequence[str]) -> Optional[str]:
+    """词列表 -> FTS5 MATCH 表达式：每个词作为短语 AND 连接；没有词时返回 None"""
+    if not terms:
+        return None
+    return " AND ".join('"' + t.replace('"', '""') + '"' for t in terms)
+
+
+def _like_any_column(term: str):
+    pattern = f"%{term}%"
+    return or_(Tea.name.like(pattern), Tea.origin.like(pattern), Tea.spec.like(pattern), Tea.intro.like(pattern))
+
+
+def search_hits(keyword: str, use_fts: bool = True):
+    """命中关键词的 (id, rank) CTE，rank 越小越相关；调用方 join 到 tea 上并按 rank 排序。
+
+    按空白拆词，词之间 AND。不少于 3 个字符的词走全文索引，更短的词在索引命中里再 LIKE 过滤；
+    全是短词（或不用索引）时四列 LIKE 全表扫描。
+    强制物化：否则 SQLite 可能把它展平成以 tea 为外表、逐行按 rowid 探测 MATCH，
+    命中多时比全表 LIKE 还慢。
+    """
+    terms = keyword.split() or [keyword]
+    long_terms = [t for t in terms if len(t) >= MIN_TRIGRAM_CHARS] if use_fts else []
+    short_terms = [t for t in terms if t not in long_terms]
+    match = fts_match(long_terms)
+    if match is not None:
+        fts = literal_column("tea_fts")
+        q = select(tea_fts.c.rowid.label("id"), func.bm25(fts, *FTS_WEIGHTS).label("rank")).where(fts.op("MATCH")(match))
+        if short_terms:
+            q = q.join(Tea, Tea.id == tea_fts.c.rowid).where(*(_like_any_column(t) for t in short_terms))
+        return q.cte("hits").prefix_with("MATERIALIZED")
+
+    # 名称包含全部词的排前
+    name_hit = and_(*(Tea.name.like(f"%{t}%") for t in terms))
+    return (
+        select(Tea.id.label("id"), case((name_hit, 0.0), else_=1.0).label("rank"))
+        .where(*(_like_any_column(t) for t in terms))
+        .cte("hits")
+        .prefix_with("MATERIALIZED")
+    )
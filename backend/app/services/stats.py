@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Dict, Mapping, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models import DailyTeaStats, Event, Feedback, TeaStats
+
+# tea_id -> (pv, likes, dislikes) 的增量
+StatDeltas = Mapping[int, Tuple[int, int, int]]
+
+
+def day_key(dt: datetime) -> str:
+    return dt.strftime("%Y-%m-%d")
+
+
+def apply_stat_deltas(db: Session, deltas: StatDeltas, now: Optional[datetime] = None) -> None:
+    """把增量累加到 tea_stats 和当天的 daily_tea_stats（不提交，由调用方与原始写入放在同一事务）"""
+    if not deltas:
+        return
+    now = now or datetime.utcnow()
+
+    stmt = sqlite_insert(TeaStats)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[TeaStats.tea_id],
+        set_={
+            "pv": TeaStats.pv + stmt.excluded.pv,
+            "likes": TeaStats.likes + stmt.excluded.likes,
+            "dislikes": TeaStats.dislikes + stmt.excluded.dislikes,
+            "last_updated": stmt.excluded.last_updated,
+        },
+    )
+    db.execute(
+        stmt,
+        [
+            {"tea_id": tea_id, "pv": pv, "likes": likes, "dislikes": dislikes, "last_updated": now}
+            for tea_id, (pv, likes, dislikes) in deltas.items()
+        ],
+    )
+
+    day = day_key(now)
+    daily = sqlite_insert(DailyTeaStats)
+    daily = daily.on_conflict_do_update(
+        index_elements=[DailyTeaStats.day, DailyTeaStats.tea_id],
+        set_={
+            "pv": DailyTeaStats.pv + daily.excluded.pv,
+            "likes": DailyTeaStats.likes + daily.excluded.likes,
+            "dislikes": DailyTeaStats.dislikes + daily.excluded.dislikes,
+        },
+    )
+    db.execute(
+        daily,
+        [
+            {"day": day, "tea_id": tea_id, "pv": pv, "likes": likes, "dislikes": dislikes}
+            for tea_id, (pv, likes, dislikes) in deltas.items()
+        ],
+    )
+
+
+def bump_tea_stats(
+    db: Session, tea_id: int, *, pv: int = 0, likes: int = 0, dislikes: int = 0, now: Optional[datetime] = None
+) -> None:
+    apply_stat_deltas(db, {tea_id: (pv, likes, dislikes)}, now)
+
+
+def feedback_delta(action: str) -> Tuple[int, int, int]:
+    return (0, 1, 0) if action == "like" else (0, 0, 1)
+
+
+def impressions_by_tea_query():
+    return select(Event.tea_id, func.count()).where(Event.type == "impression").group_by(Event.tea_id)
+
+
+def feedback_by_tea_query():
+    return select(Feedback.tea_id, Feedback.action, func.count()).group_by(Feedback.tea_id, Feedback.action)
+
+
+def rebuild_tea_stats(db: Session) -> int:
+    """从 event/feedback 原始记录全量重算 tea_stats，返回写入行数（不提交）"""
+    totals: Dict[int, list] = {}
+
+    pv_rows = db.execute(impressions_by_tea_query()).all()
+    for tea_id, n in pv_rows:
+        totals.setdefault(tea_id, [0, 0, 0])[0] = n
+
+    fb_rows = db.execute(feedback_by_tea_query()).all()
+    for tea_id, action, n in fb_rows:
+        if action == "like":
+            totals.setdefault(tea_id, [0, 0, 0])[1] = n
+        elif action == "dislike":
+            totals.setdefault(tea_id, [0, 0, 0])[2] = n
+
+    now = datetime.utcnow()
+    db.execute(delete(TeaStats))
+    if totals:
+        db.execute(
+            insert(TeaStats),
+            [
+                {"tea_id": tea_id, "pv": pv, "likes": likes, "dislikes": dislikes, "last_updated": now}
+                for tea_id, (pv, likes, dislikes) in totals.items()
+            ],
+        )
+    return len(totals)
+
+
+def impressions_by_day_query():
+    pv_day = func.date(Event.created_at)
+    return select(pv_day, Event.tea_id, func.count()).where(Event.type == "impression").group_by(pv_day, Event.tea_id)
+
+
+def rebuild_daily_tea_stats(db: Session) -> int:
+    """从原始记录按 UTC 日期回填 daily_tea_stats，返回写入行数（不提交）"""
+    totals: Dict[Tuple[str, int], list] = {}
+
+    pv_rows = db.execute(impressions_by_day_query()).all()
+    for day, tea_id, n in pv_rows:
+        totals.setdefault((day, tea_id), [0, 0, 0])[0] = n
+
+    fb_day = func.date(Feedback.created_at)
+    fb_rows = db.execute(
+        select(fb_day, Feedback.tea_id, Feedback.action, func.count()).group_by(fb_day, Feedback.tea_id, Feedback.action)
+    ).all()
+    for day, tea_id, action, n in fb_rows:
+        if action == "like":
+            totals.setdefault((day, tea_id), [0, 0, 0])[1] = n
+        elif action == "dislike":
+            totals.setdefault((day, tea_id), [0, 0, 0])[2] = n
+
+    db.execute(delete(DailyTeaStats))
+    if totals:
+        db.execute(
+            insert(DailyTeaStats),
+            [
+                {"day": day, "tea_id": tea_id, "pv": pv, "likes": likes, "dislikes": dislikes}
+                for (day, tea_id), (pv, likes, dislikes) in totals.items()
+            ],
+        )
+    return len(totals)
+
+
+def _empty(db: Session, column) -> bool:
+    return db.execute(select(column).limit(1)).first() is None
+
+
+def ensure_stats(db: Session) -> bool:
+    """计数表为空但已有原始记录时（老库升级）自动回填一次"""
+    if _empty(db, Event.id) and _empty(db, Feedback.id):
+        return False
+
+    filled = False
+    if _empty(db, TeaStats.tea_id):
+        rebuild_tea_stats(db)
+        filled = True
+    if _empty(db, DailyTeaStats.tea_id):
+        rebuild_daily_tea_stats(db)
+        filled = True
+    if filled:
+        db.commit()
+    return filled
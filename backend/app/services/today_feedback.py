@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import AbstractSet, Dict, Optional, Set, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.models import Feedback
+from app.services.generations import GenerationBus, generations
+from app.services.stats import day_key
+
+
+def today_range(now: Optional[datetime] = None) -> Tuple[datetime, datetime]:
+    now = now or datetime.utcnow()
+    start = datetime(now.year, now.month, now.day)
+    end = start + timedelta(days=1)
+    return start, end
+
+
+def today_feedback_query(anon_user_id: str, start: datetime, end: datetime):
+    return (
+        select(Feedback.tea_id)
+        .where(Feedback.anon_user_id == anon_user_id)
+        .where(Feedback.created_at >= start)
+        .where(Feedback.created_at < end)
+    )
+
+
+def feedback_since_query(last_id: int, start: datetime):
+    # 按主键区间追尾，只取当天的行
+    return (
+        select(Feedback.id, Feedback.anon_user_id, Feedback.tea_id)
+        .where(Feedback.id > last_id)
+        .where(Feedback.created_at >= start)
+    )
+
+
+class TodayFeedbackIndex:
+    """当天（UTC）用户 -> 已反馈茶叶 id 集合的内存索引。
+
+    启动时从 feedback 表预热，跨 UTC 零点时重新加载；按用户 LRU 淘汰，内存有上限。
+    淘汰过之后，不在索引里的用户回表加载一次。
+    其他 worker 写入反馈时会 bump 代数计数器，本进程发现变化后按主键追尾新行。
+    """
+
+    def __init__(self, bus: GenerationBus, max_users: int, slot: str = "feedback"):
+        self.bus = bus
+        self.slot = slot
+        self.max_users = max_users
+        self._lock = threading.RLock()
+        self._users: "OrderedDict[str, Set[int]]" = OrderedDict()
+        self._day: Optional[str] = None
+        self._start: Optional[datetime] = None
+        self._gen = -1
+        self._last_id = 0
+        # 自加载以来是否从未淘汰过：是则不在索引里的用户今天一定没有反馈
+        self._complete = True
+        self._evictions = 0
+        self._db_loads = 0
+
+    def warm(self, db: Session) -> int:
+        """加载当天全部反馈，返回用户数"""
+        with self._lock:
+            self._load_day(db, datetime.utcnow())
+            return len(self._users)
+
+    def _load_day(self, db: Session, now: datetime) -> None:
+        start, end = today_range(now)
+        self._gen = self.bus.get(self.slot)
+        last_id = db.execute(select(func.max(Feedback.id))).scalar() or 0
+
+        self._users = OrderedDict()
+        self._complete = True
+        rows = db.execute(
+            select(Feedback.anon_user_id, Feedback.tea_id)
+            .where(Feedback.id <= last_id)
+            .where(Feedback.created_at >= start)
+            .where(Feedback.created_at < end)
+        )
+        for anon_user_id, tea_id in rows:
+            self._touch(anon_user_id).add(tea_id)
+
+        self._day = day_key(start)
+        self._start = start
+        self._last_id = last_id
+
+    def _touch(self, anon_user_id: str) -> Set[int]:
+        teas = self._users.get(anon_user_id)
+        if teas is None:
+            teas = self._users[anon_user_id] = set()
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+                self._evictions += 1
+                self._complete = False
+        else:
+            self._users.move_to_end(anon_user_id)
+        return teas
+
+    def _sync(self, db: Session) -> None:
+        now = datetime.utcnow()
+        if day_key(now) != self._day:
+            with self._lock:
+                if day_key(now) != self._day:
+                    self._load_day(db, now)
+            return
+
+        gen = self.bus.get(self.slot)
+        if gen == self._gen:
+            return
+        with self._lock:
+            if gen == self._gen:
+                return
+            # 先记代数再追尾：追尾期间的新写入会在下次请求再追
+            self._gen = gen
+            last_id = self._last_id
+            for feedback_id, anon_user_id, tea_id in db.execute(feedback_since_query(last_id, self._start)):
+                last_id = max(last_id, feedback_id)
+                if anon_user_id in self._users:
+                    self._users[anon_user_id].add(tea_id)
+                elif self._complete:
+                    self._touch(anon_user_id).add(tea_id)
+            self._last_id = last_id
+
+    def _user_teas(self, db: Session, anon_user_id: str) -> Set[int]:
+        # 调用方持有锁
+        teas = self._users.get(anon_user_id)
+        if teas is not None:
+            self._users.move_to_end(anon_user_id)
+            return teas
+        if self._complete:
+            return set()
+        start, end = today_range()
+        self._db_loads += 1
+        teas = self._touch(anon_user_id)
+        teas.update(db.execute(today_feedback_query(anon_user_id, start, end)).scalars())
+        return teas
+
+    def tea_ids(self, db: Session, anon_user_id: str) -> AbstractSet[int]:
+        self._sync(db)
+        with self._lock:
+            return frozenset(self._user_teas(db, anon_user_id))
+
+    def contains(self, db: Session, anon_user_id: str, tea_id: int) -> bool:
+        self._sync(db)
+        with self._lock:
+            return tea_id in self._user_teas(db, anon_user_id)
+
+    def add(self, anon_user_id: str, tea_id: int) -> None:
+        """本进程写入成功后调用：更新本地索引并通知其他 worker"""
+        with self._lock:
+            if self._day == day_key(datetime.utcnow()) and (anon_user_id in self._users or self._complete):
+                self._touch(anon_user_id).add(tea_id)
+        self.bus.bump(self.slot)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "day": self._day,
+                "users": len(self._users),
+                "entries": sum(len(v) for v in self._users.values()),
+                "max_users": self.max_users,
+                "complete": self._complete,
+                "evictions": self._evictions,
+                "db_loads": self._db_loads,
+                "last_id": self._last_id,
+            }
+
+
+today_feedback = TodayFeedbackIndex(generations, max_users=get_settings().today_feedback_max_users)
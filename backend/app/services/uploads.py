@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import tempfile
+from typing import IO, Optional, Tuple
+
+from app.db import DB_PATH
+
+UPLOADS_DIR = os.path.join(os.path.dirname(os.path.abspath(DB_PATH)), "uploads")
+
+# 流式拷贝每次读取的字节数
+COPY_CHUNK = 1024 * 1024
+
+# 同一种格式只留一个扩展名，内容相同的文件才能落到同一个名字上
+_EXT_ALIASES = {".jpeg": ".jpg", ".jpe": ".jpg", ".tif": ".tiff"}
+_SAFE_EXT = re.compile(r"^\.[a-z0-9]{1,10}$")
+
+
+class UploadTooLarge(ValueError):
+    """上传内容超过大小上限"""
+
+    def __init__(self, max_bytes: int):
+        super().__init__(f"file exceeds {max_bytes} bytes")
+        self.max_bytes = max_bytes
+
+
+def copy_limited(src: IO[bytes], dst: IO[bytes], max_bytes: int, hasher=None) -> int:
+    """分块拷贝并顺带计算摘要，超过 max_bytes 时抛 UploadTooLarge（已写入的部分由调用方清理），返回字节数"""
+    size = 0
+    while True:
+        chunk = src.read(COPY_CHUNK)
+        if not chunk:
+            return size
+        size += len(chunk)
+        if size > max_bytes:
+            raise UploadTooLarge(max_bytes)
+        if hasher is not None:
+            hasher.update(chunk)
+        dst.write(chunk)
+
+
+def upload_ext(filename: Optional[str]) -> str:
+    ext = os.path.splitext(filename or "")[1].lower()
+    ext = _EXT_ALIASES.get(ext, ext)
+    return ext if _SAFE_EXT.match(ext) else ".bin"
+
+
+def store_upload(f: IO[bytes], filename: Optional[str], max_bytes: int) -> Tuple[str, bool]:
+    """把上传内容按 sha256 存成 `{摘要}{扩展名}`，返回 (文件名, 是否新写入)。
+
+    边读边写临时文件边算摘要，内存只占一个块；同样的内容已存在时丢掉临时文件，直接复用。
+    """
+    os.makedirs(UPLOADS_DIR, exist_ok=True)
+    hasher = hashlib.sha256()
+    # 临时文件放在同一目录，落盘时 rename 是原子的
+    fd, tmp = tempfile.mkstemp(dir=UPLOADS_DIR, prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            copy_limited(f, out, max_bytes, hasher)
+        name = hasher.hexdigest() + upload_ext(filename)
+        path = os.path.join(UPLOADS_DIR, name)
+        if os.path.exists(path):
+            return name, False
+        # mkstemp 建的是 0600，静态服务（nginx）需要可读
+        os.chmod(tmp, 0o644)
+        # 并发上传同一内容时后到的覆盖先到的，内容一样，无妨
+        os.replace(tmp, path)
+        return name, True
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, List, Optional, Tuple, TypeVar
+
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import get_settings
+from app.db import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+WriteOp = Callable[[Session], Any]
+
+_STOP = object()
+
+# 写入超时后建议客户端等待的秒数（Retry-After）
+RETRY_AFTER_SECONDS = 1
+
+
+class WriteTimeout(Exception):
+    """等待写线程提交超时。写操作仍在队列里，之后可能照常提交"""
+
+
+class WriteQueue:
+    """单写线程 + 组提交：各接口把写操作排队，由一个线程按批（条数/时间上限）合并成一个事务提交。
+
+    写操作是 `op(db) -> result` 形式的函数，只做 add/execute，不自行提交。
+    """
+
+    def __init__(self, session_factory: sessionmaker, max_batch: int, max_delay_ms: float):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000.0
+
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        self._started_at = time.monotonic()
+        self._ops = 0
+        self._failed = 0
+        self._timeouts = 0
+        self._commits = 0
+        self._max_batch_seen = 0
+        self._last_commit_ms = 0.0
+        self._max_commit_ms = 0.0
+        self._ewma_commit_ms = 0.0
+        # 最近的提交记录 (时间, 条数)，用来算近期吞吐
+        self._recent: Deque[Tuple[float, int]] = deque(maxlen=256)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        with self._lock:
+            if self.running:
+                return
+            self._thread = threading.Thread(target=self._loop, name="db-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return
+            self._queue.put(_STOP)
+            thread.join(timeout)
+            self._thread = None
+
+    def submit(self, op: WriteOp) -> "Future[Any]":
+        fut: "Future[Any]" = Future()
+        if not self.running:
+            # 未启动（脚本、测试）时直接在调用线程里执行
+            self._run_inline(op, fut)
+            return fut
+        self._queue.put((op, fut))
+        return fut
+
+    def run(self, op: Callable[[Session], T], timeout: Optional[float] = None) -> T:
+        """提交并等待结果；超时抛 WriteTimeout（接口层转成 503），此时写入可能已经或稍后生效"""
+        if timeout is None:
+            timeout = get_settings().writer_timeout_seconds
+        fut = self.submit(op)
+        try:
+            return fut.result(timeout)
+        except TimeoutError:
+            self._timeouts += 1
+            raise WriteTimeout(f"write not committed within {timeout}s")
+
+    def _run_inline(self, op: WriteOp, fut: "Future[Any]") -> None:
+        with self.session_factory() as db:
+            try:
+                result = op(db)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                fut.set_exception(e)
+                return
+        fut.set_result(result)
+
+    def _collect(self, first: Any) -> Tuple[List[Tuple[WriteOp, "Future[Any]"]], bool]:
+        batch = [first]
+        stop = False
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                stop = True
+                break
+            batch.append(item)
+        return batch, stop
+
+    def _loop(self) -> None:
+        db = self.session_factory()
+        try:
+            while True:
+                first = self._queue.get()
+                if first is _STOP:
+                    break
+                batch, stop = self._collect(first)
+                self._commit_batch(db, batch)
+                if stop:
+                    break
+            # 停止前把残留的写入做完
+            rest = []
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not _STOP:
+                    rest.append(item)
+            if rest:
+                self._commit_batch(db, rest)
+        finally:
+            db.close()
+
+    def _commit_batch(self, db: Session, batch: List[Tuple[WriteOp, "Future[Any]"]]) -> None:
+        t0 = time.perf_counter()
+        try:
+            results = [op(db) for op, _ in batch]
+            db.commit()
+        except Exception:
+            db.rollback()
+            # 整批失败时逐条重放，只让出错的那条失败
+            logger.warning("group commit of %d writes failed, replaying one by one", len(batch), exc_info=True)
+            self._replay(db, batch)
+        else:
+            for (_, fut), result in zip(batch, results):
+                fut.set_result(result)
+            self._record(len(batch), (time.perf_counter() - t0) * 1000)
+
+    def _replay(self, db: Session, batch: List[Tuple[WriteOp, "Future[Any]"]]) -> None:
+        for op, fut in batch:
+            t0 = time.perf_counter()
+            try:
+                result = op(db)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                self._failed += 1
+                fut.set_exception(e)
+            else:
+                fut.set_result(result)
+                self._record(1, (time.perf_counter() - t0) * 1000)
+
+    def _record(self, n: int, commit_ms: float) -> None:
+        self._ops += n
+        self._commits += 1
+        self._max_batch_seen = max(self._max_batch_seen, n)
+        self._last_commit_ms = commit_ms
+        self._max_commit_ms = max(self._max_commit_ms, commit_ms)
+        self._ewma_commit_ms = commit_ms if self._commits == 1 else 0.9 * self._ewma_commit_ms + 0.1 * commit_ms
+        self._recent.append((time.monotonic(), n))
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        recent = [(ts, n) for ts, n in list(self._recent) if now - ts <= 60]
+        window = (now - recent[0][0]) if len(recent) > 1 else 0.0
+        return {
+            "running": self.running,
+            "queue_depth": self._queue.qsize(),
+            "ops": self._ops,
+            "failed": self._failed,
+            "timeouts": self._timeouts,
+            "commits": self._commits,
+            "avg_batch": round(self._ops / self._commits, 2) if self._commits else 0.0,
+            "max_batch": self._max_batch_seen,
+            "ops_per_sec": round(sum(n for _, n in recent) / window, 2) if window else 0.0,
+            "ops_per_sec_lifetime": round(self._ops / max(now - self._started_at, 1e-9), 2),
+            "commit_ms_last": round(self._last_commit_ms, 3),
+            "commit_ms_ewma": round(self._ewma_commit_ms, 3),
+            "commit_ms_max": round(self._max_commit_ms, 3),
+        }
+
+
+_settings = get_settings()
+writer = WriteQueue(SessionLocal, max_batch=_settings.writer_max_batch, max_delay_ms=_settings.writer_max_delay_ms)
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+封面缩略图基准：原图 vs 各宽度 WebP 变体的字节数，以及生成耗时
+
+使用方法:
+    python scripts/bench_cover_variants.py [原图宽度，默认 4000] [张数，默认 5]
+
+在临时目录里生成近似照片的 JPEG（4:3，质量 90，模拟手机直出的封面），
+用 render_variants（即进程池里跑的同一函数）生成全部变体，统计单张耗时和各宽度平均字节数。
+一屏 feed 按 10 张卡片估算：原图 vs 手机上 srcset 实际会选的 480w / 960w。
+"""
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from PIL import Image, ImageFilter
+
+from app.services.images import VARIANT_QUALITY, VARIANT_WIDTHS, render_variants, variant_name
+
+FEED_CARDS = 10
+
+
+def make_photo(path: str, width: int, seed: int) -> None:
+    """模糊噪声叠渐变：有大块色彩也有细节，压缩率接近实拍照片"""
+    height = width * 3 // 4
+    small = (width // 8, height // 8)
+    noise = Image.effect_noise(small, 60 + seed * 5).filter(ImageFilter.GaussianBlur(2))
+    r = Image.linear_gradient("L").resize(small)
+    g = noise
+    b = Image.radial_gradient("L").resize(small)
+    base = Image.merge("RGB", (r, g, b)).resize((width, height), Image.BICUBIC)
+    grain = Image.effect_noise((width, height), 24).convert("RGB")
+    Image.blend(base, grain, 0.12).save(path, "JPEG", quality=90)
+
+
+def fmt(n: float) -> str:
+    return f"{n / 1024:.0f}KB" if n < 1024 * 1024 else f"{n / 1024 / 1024:.1f}MB"
+
+
+def main() -> None:
+    width = int(sys.argv[1]) if len(sys.argv) > 1 else 4000
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    with tempfile.TemporaryDirectory() as tmp:
+        out_dir = os.path.join(tmp, "v")
+        originals = []
+        timings = []
+        sizes = {w: [] for w in VARIANT_WIDTHS}
+        for i in range(count):
+            source = f"cover-{i}.jpg"
+            path = os.path.join(tmp, source)
+            make_photo(path, width, i)
+            originals.append(os.path.getsize(path))
+
+            t0 = time.perf_counter()
+            render_variants(path, out_dir, source, VARIANT_WIDTHS, VARIANT_QUALITY)
+            timings.append(time.perf_counter() - t0)
+            for w in VARIANT_WIDTHS:
+                sizes[w].append(os.path.getsize(os.path.join(out_dir, variant_name(source, w))))
+
+        avg_orig = sum(originals) / count
+        print(f"原图 {width}x{width * 3 // 4} JPEG q90，{count} 张")
+        print(f"  原图平均 {fmt(avg_orig)}")
+        for w in VARIANT_WIDTHS:
+            avg = sum(sizes[w]) / count
+            print(f"  {w:>4}w webp 平均 {fmt(avg):>6}  原图的 1/{avg_orig / avg:.0f}")
+        timings.sort()
+        print(f"  生成全部变体：平均 {sum(timings) / count * 1000:.0f}ms，最慢 {timings[-1] * 1000:.0f}ms（单进程）")
+
+        print(f"一屏 {FEED_CARDS} 张卡片的图片字节：")
+        print(f"  原图 {fmt(avg_orig * FEED_CARDS)}")
+        for w in VARIANT_WIDTHS[1:]:
+            avg = sum(sizes[w]) / count
+            print(f"  {w}w  {fmt(avg * FEED_CARDS)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+分面索引基准与一致性检查
+
+使用方法:
+    python scripts/bench_facets.py [茶叶数量，默认 10000] [每轮后台改动条数，默认 5] [轮数，默认 20]
+
+在临时 SQLite 库里写入茶叶，然后：
+- 每轮随机新增/修改/下线/删除几条，分别做增量刷新与全量重建，核对两者的快照内容与分面计数完全一致
+- 对比刷新耗时（增量 vs 全量）
+- 对比分面计数耗时：分面索引（首次计算 / 命中缓存） vs 每个维度一条 GROUP BY
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import create_engine, delete, func, insert, select, update
+from sqlalchemy.orm import sessionmaker
+
+from app.migrations import init_db
+from app.models import Tea, TeaTombstone
+from app.services.catalog import load_snapshot, refresh_snapshot
+from app.services.facets import FacetFilter
+
+CATEGORIES = ["pu_er", "white", "yancha", "black", "green", "oolong"]
+ORIGINS = ["云南西双版纳", "云南临沧", "福建福鼎", "福建武夷山", "湖南安化", "广西梧州", "安徽祁门", "浙江杭州"]
+SPECS = ["357g/饼", "200g/饼", "100g/盒", "500g/砖", "250g/罐"]
+
+
+def tea_row(rng: random.Random, i: int, now: datetime) -> dict:
+    price = rng.randrange(50, 5000)
+    return dict(
+        name=f"茶叶 {i}",
+        category=rng.choice(CATEGORIES),
+        year=rng.randrange(1995, 2026),
+        origin=rng.choice(ORIGINS),
+        spec=rng.choice(SPECS),
+        price_min=price if i % 20 else None,
+        price_max=price + 200,
+        intro="",
+        cover_url=f"/uploads/{i:032x}.jpg",
+        status="online" if i % 10 else "offline",
+        weight=i % 100,
+        created_at=now,
+        updated_at=now,
+    )
+
+
+def mutate(Session, rng: random.Random, n: int, k: int) -> None:
+    now = datetime.utcnow()
+    with Session() as db:
+        ids = db.execute(select(Tea.id)).scalars().all()
+        for _ in range(k):
+            op = rng.random()
+            tea_id = rng.choice(ids)
+            if op < 0.3:
+                db.execute(insert(Tea), [tea_row(rng, n + rng.randrange(10**6), now)])
+            elif op < 0.8:
+                values = {k: v for k, v in tea_row(rng, tea_id, now).items() if k in ("category", "year", "origin", "price_min", "status")}
+                db.execute(update(Tea).where(Tea.id == tea_id).values(updated_at=now, **values))
+            else:
+                db.execute(delete(Tea).where(Tea.id == tea_id))
+                db.merge(TeaTombstone(tea_id=tea_id, deleted_at=now))
+        db.commit()
+
+
+def same(a, b) -> bool:
+    if a.by_id.keys() != b.by_id.keys():
+        return False
+    if any(a.by_id[i].json != b.by_id[i].json for i in a.by_id):
+        return False
+    filters = [FacetFilter(), FacetFilter(origin=ORIGINS[0]), FacetFilter(year_from=2010, price_max=1000), FacetFilter(price_min=500, price_max=800)]
+    return all(a.facets.counts(f) == b.facets.counts(f) for f in filters) and a.approx_bytes == b.approx_bytes
+
+
+def group_by_counts(db) -> None:
+    online = Tea.status == "online"
+    for col in (Tea.category, Tea.origin, Tea.spec, Tea.year / 5, Tea.price_min):
+        db.execute(select(col, func.count()).where(online).group_by(col)).all()
+
+
+def timeit(fn, runs: int) -> float:
+    t = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return (time.perf_counter() - t) / runs * 1000
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    k = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    rounds = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    rng = random.Random(42)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        init_db(engine)
+        Session = sessionmaker(bind=engine)
+        now = datetime.utcnow() - timedelta(hours=1)
+        with Session() as db:
+            db.execute(insert(Tea), [tea_row(rng, i, now) for i in range(n)])
+            db.commit()
+
+        with Session() as db:
+            snap = load_snapshot(db, 0)
+        inc_ms, full_ms = [], []
+        for version in range(1, rounds + 1):
+            mutate(Session, rng, n, k)
+            with Session() as db:
+                snap = refresh_snapshot(db, snap, version)
+                full = load_snapshot(db, version)
+            assert snap.incremental, "变更太少却走了全量重建"
+            if not same(snap, full):
+                print(f"第 {version} 轮增量刷新结果与全量重建不一致")
+                sys.exit(1)
+            inc_ms.append(snap.build_ms)
+            full_ms.append(full.build_ms)
+        print(f"{rounds} 轮 × {k} 条改动，增量刷新与全量重建结果一致")
+        print(f"刷新（{len(snap)} 条在线）：全量 {sum(full_ms) / rounds:.2f} ms -> 增量 {sum(inc_ms) / rounds:.2f} ms")
+
+        flt = FacetFilter(origin=ORIGINS[1], year_from=2005, year_to=2020, price_max=2000)
+        facets = snap.facets
+        first = timeit(lambda: facets.counts(FacetFilter(category=rng.choice(CATEGORIES), year_from=rng.randrange(1995, 2026))), 200)
+        cached = timeit(lambda: facets.counts(flt), 2000)
+        with Session() as db:
+            sql = timeit(lambda: group_by_counts(db), 50)
+        print(f"分面计数：GROUP BY {sql:.3f} ms，分面索引 首次 {first:.3f} ms / 命中缓存 {cached:.4f} ms")
+
+
+if __name__ == "__main__":
+    main()
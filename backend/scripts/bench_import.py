@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+导入预览解析基准：流式解析 + 按列校验 vs pandas.read_excel + iterrows
+
+使用方法:
+    python scripts/bench_import.py [行数，默认 20000]
+
+在临时目录生成同样内容的 .xlsx 与 .csv（每 100 行混入一行错误数据），测量：
+- 旧路径：pd.read_excel + df.iterrows() + 每行一个 TeaBase（未安装 pandas 时跳过）
+- 新路径：stage_import（openpyxl 只读 iter_rows / csv.reader，结果暂存到磁盘）
+输出耗时与 tracemalloc 记录的 Python 内存峰值（两者分开测）。
+"""
+
+import csv
+import importlib.util
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from openpyxl import Workbook
+
+from app.schemas import TeaBase
+from app.services import importer
+
+HEADER = ["名称", "分类", "年份", "产地", "规格", "主图URL", "价格下限", "价格上限", "简介"]
+INTRO = "选用古树茶青，经传统工艺压制，茶汤金黄透亮，香气高扬，回甘持久。"
+
+
+def make_rows(n: int):
+    for i in range(n):
+        if i % 100 == 99:
+            yield [f"坏行 {i}", "", "未知", "云南", "", "/uploads/a.jpg", None, None, None]
+        else:
+            yield [f"茶叶 {i}", "pu_er", 2000 + i % 25, "云南西双版纳", "357g/饼", f"/uploads/{i:032x}.jpg", 100 + i % 500, 600 + i % 500, INTRO]
+
+
+def write_files(tmp: str, n: int):
+    xlsx = os.path.join(tmp, "bench.xlsx")
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(HEADER)
+    for row in make_rows(n):
+        ws.append(row)
+    wb.save(xlsx)
+
+    path_csv = os.path.join(tmp, "bench.csv")
+    with open(path_csv, "w", encoding="utf-8-sig", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(HEADER)
+        w.writerows(make_rows(n))
+    return xlsx, path_csv
+
+
+def old_preview(path: str) -> int:
+    # 与改造前 import_excel 的逐行处理一致
+    import pandas as pd
+
+    df = pd.read_excel(path)
+    ok = 0
+    for _, row in df.iterrows():
+        try:
+            year = int(row.get("年份"))
+        except Exception:
+            continue
+        if not str(row.get("分类") or "").strip() or not str(row.get("规格") or "").strip():
+            continue
+        TeaBase(
+            name=str(row.get("名称") or "").strip(),
+            category=str(row.get("分类") or "").strip(),
+            year=year,
+            origin=str(row.get("产地") or "").strip(),
+            spec=str(row.get("规格") or "").strip(),
+            price_min=int(row.get("价格下限")),
+            price_max=int(row.get("价格上限")),
+            intro=str(row.get("简介") or "").strip() or None,
+            cover_url=str(row.get("主图URL") or "").strip(),
+        )
+        ok += 1
+    return ok
+
+
+def new_preview(path: str) -> int:
+    with open(path, "rb") as f:
+        return importer.stage_import(f, os.path.basename(path))["ok_rows"]
+
+
+def measure(name: str, fn, path: str) -> None:
+    # 计时与测内存分两次跑：tracemalloc 本身会显著拖慢解析
+    t = time.perf_counter()
+    ok = fn(path)
+    elapsed = time.perf_counter() - t
+    tracemalloc.start()
+    fn(path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"{name:<28} {elapsed:>7.2f}s  峰值 {peak / 1024 / 1024:>7.1f} MB  可导入 {ok}")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        importer.IMPORTS_DIR = os.path.join(tmp, "imports")
+        xlsx, path_csv = write_files(tmp, n)
+        print(f"{n} 行：xlsx {os.path.getsize(xlsx) / 1024:.0f} KB，csv {os.path.getsize(path_csv) / 1024:.0f} KB")
+
+        if importlib.util.find_spec("pandas") is None:
+            print("未安装 pandas，跳过旧路径")
+        else:
+            measure("旧：read_excel + iterrows", old_preview, xlsx)
+        measure("新：xlsx 流式解析", new_preview, xlsx)
+        measure("新：csv 流式解析", new_preview, path_csv)
+
+
+if __name__ == "__main__":
+    main()
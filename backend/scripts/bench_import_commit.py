@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+确认导入写库基准：单事务逐条 db.add vs 按自然键分批 upsert（每批经单写线程单独提交）
+
+使用方法:
+    python scripts/bench_import_commit.py [行数，默认 100000]
+
+在临时 SQLite 库（WAL）里：
+- 旧路径：每行一个 db.add，最后一次 commit（整个导入期间占着写锁）
+- 新路径：首次导入、同一份数据重复导入（应全部 skipped）、改动 1/10 行后再导入
+导入期间另有一个线程每 2ms 经单写线程写一条事件，统计这些公共写入的等待时间。
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from functools import partial
+from itertools import islice
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import create_engine, event, func, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app.migrations import init_db
+from app.models import Event, Tea
+from app.services.importer import COMMIT_ROWS, upsert_chunk
+from app.services.writer import WriteQueue
+
+
+def make_items(n: int, price_shift: int = 0):
+    for i in range(n):
+        yield {
+            "name": f"茶叶 {i}",
+            "category": "pu_er",
+            "year": 2000 + i % 25,
+            "origin": "云南西双版纳",
+            "spec": "357g/饼",
+            "price_min": 100 + i % 500 + (price_shift if i % 10 == 0 else 0),
+            "price_max": 600 + i % 500,
+            "intro": "选用古树茶青，经传统工艺压制。",
+            "cover_url": f"/uploads/{i:032x}.jpg",
+            "status": "online",
+            "weight": 0,
+        }
+
+
+class PublicWrites:
+    """后台线程持续经单写线程写事件，记录每次写入从提交到完成的耗时"""
+
+    def __init__(self, writer: WriteQueue, tea_id: int):
+        self.writer = writer
+        self.tea_id = tea_id
+        self.latencies = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+
+    def _write(self, db):
+        db.execute(insert(Event), [{"anon_user_id": "bench", "tea_id": self.tea_id, "type": "impression", "created_at": datetime.utcnow()}])
+
+    def _loop(self):
+        while not self._stop.is_set():
+            t = time.perf_counter()
+            self.writer.run(self._write, timeout=120)
+            self.latencies.append((time.perf_counter() - t) * 1000)
+            time.sleep(0.002)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def summary(self) -> str:
+        lat = sorted(self.latencies)
+        if not lat:
+            return "无公共写入"
+        p99 = lat[min(len(lat) - 1, int(len(lat) * 0.99))]
+        return f"公共写入 {len(lat)} 次，p99 {p99:.1f} ms，最大 {lat[-1]:.1f} ms"
+
+
+def old_commit(Session, items) -> dict:
+    # 与改造前 import_commit 一致：逐条 add，整个导入一个事务
+    now = datetime.utcnow()
+    with Session() as db:
+        n = 0
+        for item in items:
+            db.add(Tea(**item, created_at=now, updated_at=now))
+            n += 1
+        db.commit()
+    return {"inserted": n}
+
+
+def new_commit(writer: WriteQueue, items) -> dict:
+    report = {"inserted": 0, "updated": 0, "skipped": 0}
+    while True:
+        chunk = list(islice(items, COMMIT_ROWS))
+        if not chunk:
+            return report
+        for key, n in writer.run(partial(upsert_chunk, items=chunk), timeout=120).items():
+            report[key] += n
+
+
+def run(name: str, writer: WriteQueue, fn) -> None:
+    with PublicWrites(writer, tea_id=1) as public:
+        t = time.perf_counter()
+        report = fn()
+        elapsed = time.perf_counter() - t
+    print(f"{name:<16} {elapsed:>6.2f}s  {report}")
+    print(f"{'':<16} {public.summary()}")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label in ("old", "new"):
+            engine = create_engine(f"sqlite:///{os.path.join(tmp, label + '.db')}", connect_args={"check_same_thread": False})
+
+            @event.listens_for(engine, "connect")
+            def _pragmas(dbapi_conn, _record):
+                cur = dbapi_conn.cursor()
+                cur.execute("PRAGMA journal_mode=WAL")
+                cur.execute("PRAGMA synchronous=NORMAL")
+                cur.execute("PRAGMA busy_timeout=120000")
+                cur.close()
+
+            init_db(engine)
+            Session = sessionmaker(bind=engine)
+            with Session() as db:
+                db.execute(insert(Tea), [dict(next(make_items(1)), name="占位", created_at=datetime.utcnow(), updated_at=datetime.utcnow())])
+                db.commit()
+
+            writer = WriteQueue(Session, max_batch=200, max_delay_ms=5)
+            writer.start()
+            try:
+                if label == "old":
+                    run("旧：单事务", writer, lambda: old_commit(Session, make_items(n)))
+                else:
+                    run("新：首次导入", writer, lambda: new_commit(writer, make_items(n)))
+                    run("新：重复导入", writer, lambda: new_commit(writer, make_items(n)))
+                    run("新：改动 1/10", writer, lambda: new_commit(writer, make_items(n, price_shift=7)))
+                    with Session() as db:
+                        total = db.execute(select(func.count()).select_from(Tea)).scalar()
+                    assert total == n + 1, f"重复导入后茶叶数 {total}，应为 {n + 1}"
+            finally:
+                writer.stop()
+                engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
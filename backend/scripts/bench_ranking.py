@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+卡片流打分引擎微基准
+
+使用方法:
+    python scripts/bench_ranking.py [茶叶数量，默认 50000] [请求次数，默认 2000]
+
+在内存中构造在线茶叶数组，模拟 GET /api/teas 的打分 + 分页（含分类过滤、排除列表、个性化加成），
+输出单次 rank() 的 p50/p99 耗时。
+
+个性化请求另有读取个人偏好的开销：在临时 SQLite 库里造 USERS 个用户、每人 HISTORY 条反馈，
+对比每次查库（load_personal_prefs）与偏好缓存（PersonalPrefsCache，期间穿插其他用户的新反馈触发作废），
+并统计"取偏好 + rank()"整体耗时。rank() p99 超过 P99_BUDGET_MS、整体 p99 超过 TOTAL_P99_BUDGET_MS 时以非零状态退出。
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.migrations import init_db
+from app.models import Feedback, Tea
+from app.services.generations import GenerationBus
+from app.services.ranking import PersonalPrefs, PersonalPrefsCache, RankArrays, load_personal_prefs, to_ts
+
+P99_BUDGET_MS = 5.0
+# 整体 p99 落在缓存未命中（首次访问、新反馈后）的请求上，含一次按用户的反馈查询
+TOTAL_P99_BUDGET_MS = 10.0
+CATEGORIES = ["pu_er", "white", "yancha", "black"]
+USERS = 1000
+HISTORY = 200
+# 每多少次请求插入一条其他用户的反馈（bump 代数，触发缓存追尾）
+FEEDBACK_EVERY = 20
+
+
+def build_arrays(n: int) -> RankArrays:
+    rng = np.random.default_rng(42)
+    now_ts = to_ts(datetime.utcnow())
+    return RankArrays.from_columns(
+        ids=np.arange(1, n + 1),
+        categories=[CATEGORIES[i] for i in rng.integers(0, len(CATEGORIES), n)],
+        years=rng.integers(2000, 2025, n),
+        weights=rng.integers(0, 100, n),
+        created_ts=now_ts - rng.uniform(0, 365 * 86400, n),
+        pv=rng.integers(0, 5000, n),
+        likes=rng.integers(0, 500, n),
+        now_ts=now_ts,
+    )
+
+
+def percentiles(timings):
+    timings = sorted(timings)
+    return timings[len(timings) // 2], timings[int(len(timings) * 0.99) - 1], timings[-1]
+
+
+def build_feedback_db(path: str, n_teas: int):
+    engine = create_engine(f"sqlite:///{path}")
+    init_db(engine)
+    rng = random.Random(11)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(
+            insert(Tea.__table__),
+            [
+                {
+                    "id": i, "name": f"茶 {i}", "category": rng.choice(CATEGORIES), "year": rng.randint(2000, 2024),
+                    "origin": "云南", "spec": "357g", "cover_url": "", "status": "online", "weight": 0,
+                    "created_at": now, "updated_at": now,
+                }
+                for i in range(1, n_teas + 1)
+            ],
+        )
+        rows = []
+        for u in range(USERS):
+            for k in range(HISTORY):
+                rows.append({
+                    "anon_user_id": f"u{u}", "tea_id": rng.randint(1, n_teas), "action": rng.choice(("like", "dislike")),
+                    "created_at": now, "day": f"2026-01-{k % 28 + 1:02d}",
+                })
+        conn.execute(insert(Feedback.__table__).prefix_with("OR IGNORE"), rows)
+    return engine
+
+
+def bench_prefs(arrays: RankArrays, n_teas: int, runs: int) -> float:
+    """返回缓存路径下"取偏好 + rank()"的 p99（毫秒）"""
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        engine = build_feedback_db(os.path.join(tmp, "bench.db"), n_teas)
+        print(f"构建反馈库 {USERS} 用户 x {HISTORY} 条: {(time.perf_counter() - t0):.1f} s")
+        factory = sessionmaker(bind=engine)
+        bus = GenerationBus(os.path.join(tmp, "generations.bin"))
+        cache = PersonalPrefsCache(factory, bus, max_users=USERS)
+        rnd = random.Random(3)
+        # 活跃用户集中在少数人身上
+        users = [f"u{min(int(rnd.paretovariate(1.2)) - 1, USERS - 1)}" for _ in range(runs)]
+
+        uncached = []
+        with factory() as db:
+            for user in users[:200]:
+                t = time.perf_counter()
+                load_personal_prefs(db, user)
+                uncached.append((time.perf_counter() - t) * 1000)
+        p50, p99, mx = percentiles(uncached)
+        print(f"每次查库取偏好 x {len(uncached)}: p50 {p50:.3f} ms, p99 {p99:.3f} ms, max {mx:.3f} ms")
+
+        cached, total = [], []
+        for i, user in enumerate(users):
+            if i % FEEDBACK_EVERY == 0:
+                with engine.begin() as conn:
+                    conn.execute(insert(Feedback.__table__).prefix_with("OR IGNORE").values(
+                        anon_user_id=f"u{rnd.randrange(USERS)}", tea_id=rnd.randint(1, n_teas), action="like",
+                        created_at=datetime.utcnow(), day="2026-02-01",
+                    ))
+                bus.bump("feedback")
+            t = time.perf_counter()
+            prefs = cache.get(user)
+            t1 = time.perf_counter()
+            arrays.rank(prefs=prefs, limit=10)
+            t2 = time.perf_counter()
+            cached.append((t1 - t) * 1000)
+            total.append((t2 - t) * 1000)
+        p50, p99, mx = percentiles(cached)
+        print(f"偏好缓存取偏好 x {runs}: p50 {p50:.3f} ms, p99 {p99:.3f} ms, max {mx:.3f} ms  {cache.stats()}")
+        p50, p99, mx = percentiles(total)
+        print(f"取偏好 + rank() x {runs}: p50 {p50:.3f} ms, p99 {p99:.3f} ms, max {mx:.3f} ms")
+        bus.close()
+        engine.dispose()
+        return p99
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 2_000
+
+    t0 = time.perf_counter()
+    arrays = build_arrays(n)
+    print(f"构建 {n} 条打分数组: {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+    prefs = PersonalPrefs(category={"pu_er": 6.0, "white": -3.0}, year_bucket={402: 1.5, 403: -1.5})
+    rnd = random.Random(7)
+
+    timings = []
+    for _ in range(runs):
+        category = rnd.choice([None, *CATEGORIES])
+        exclude = {rnd.randint(1, n) for _ in range(rnd.randint(0, 200))}
+        page = rnd.randint(1, 5)
+        t = time.perf_counter()
+        arrays.rank(category=category, exclude=exclude, prefs=prefs, offset=(page - 1) * 10, limit=10)
+        timings.append((time.perf_counter() - t) * 1000)
+
+    p50, p99, mx = percentiles(timings)
+    print(f"rank() x {runs}: p50 {p50:.3f} ms, p99 {p99:.3f} ms, max {mx:.3f} ms")
+
+    total_p99 = bench_prefs(arrays, n, runs)
+
+    if p99 > P99_BUDGET_MS or total_p99 > TOTAL_P99_BUDGET_MS:
+        print(f"p99 超出预算（rank() {P99_BUDGET_MS} ms，整体 {TOTAL_P99_BUDGET_MS} ms）", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+关键词搜索基准：FTS5 trigram 全文索引 vs 四列 LIKE 全表扫描
+
+使用方法:
+    python scripts/bench_search.py [茶叶数量，默认 100000] [每个关键词重复次数，默认 20]
+
+在临时 SQLite 库里写入茶叶（init_db 会建好 tea_fts 和同步触发器），
+对同一组关键词分别走全文索引和 LIKE，取前 20 条相关度结果，输出 p50/p99 耗时，并核对两者命中数一致。
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app.migrations import init_db
+from app.models import Tea
+from app.services.search import fts_ready, search_hits
+
+CATEGORIES = ["pu_er", "white", "yancha", "black"]
+ORIGINS = ["云南西双版纳", "云南临沧", "福建福鼎", "福建武夷山", "湖南安化", "广西梧州"]
+NAMES = ["老班章", "冰岛", "易武", "白毫银针", "白牡丹", "大红袍", "肉桂", "水仙", "千两茶", "六堡"]
+SPECS = ["357g/饼", "200g/饼", "100g/盒", "500g/砖"]
+INTRO = "选用古树茶青，经传统工艺压制，茶汤金黄透亮，香气高扬，回甘持久。"
+KEYWORDS = ["54321", "大红袍 45", "老班章", "白毫银针", "武夷山", "357g", "回甘持久", "老班章 357g", "六堡 梧州"]
+
+
+def seed(Session, n: int) -> None:
+    now = datetime.utcnow()
+    batch = []
+    with Session() as db:
+        for i in range(n):
+            batch.append(dict(
+                name=f"{2000 + i % 25}年 {NAMES[i % len(NAMES)]} {i}",
+                category=CATEGORIES[i % len(CATEGORIES)],
+                year=2000 + i % 25,
+                origin=ORIGINS[i % len(ORIGINS)],
+                spec=SPECS[i % len(SPECS)],
+                price_min=100 + i % 500,
+                price_max=600 + i % 500,
+                intro=INTRO if i % 3 else "",
+                cover_url=f"/uploads/{i:032x}.jpg",
+                status="online",
+                weight=i % 100,
+                created_at=now - timedelta(minutes=i),
+                updated_at=now - timedelta(minutes=i),
+            ))
+            if len(batch) == 5_000:
+                db.execute(insert(Tea), batch)
+                batch = []
+        if batch:
+            db.execute(insert(Tea), batch)
+        db.commit()
+
+
+def run(Session, keyword: str, use_fts: bool, runs: int):
+    hits = search_hits(keyword, use_fts)
+    q = select(Tea.id).join(hits, hits.c.id == Tea.id).where(Tea.status == "online")
+    page = q.order_by(hits.c.rank, Tea.id.desc()).limit(20)
+    count = select(func.count()).select_from(q.subquery())
+    times = []
+    with Session() as db:
+        for _ in range(runs):
+            t = time.perf_counter()
+            total = db.execute(count).scalar_one()
+            db.execute(page).scalars().all()
+            times.append((time.perf_counter() - t) * 1000)
+    times.sort()
+    return total, statistics.median(times), times[min(len(times) - 1, int(len(times) * 0.99))]
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        init_db(engine)
+        Session = sessionmaker(bind=engine)
+        t = time.perf_counter()
+        seed(Session, n)
+        print(f"写入 {n} 条（含触发器维护全文索引）: {time.perf_counter() - t:.1f}s")
+        with engine.connect() as conn:
+            if not fts_ready(conn):
+                print("当前 SQLite 不支持 FTS5 trigram，无法对比")
+                return
+
+        print(f"{'关键词':<12} {'命中':>7} {'FTS p50':>9} {'p99':>8} {'LIKE p50':>9} {'p99':>8}")
+        for keyword in KEYWORDS:
+            total_fts, fts_p50, fts_p99 = run(Session, keyword, True, runs)
+            total_like, like_p50, like_p99 = run(Session, keyword, False, runs)
+            note = "" if total_fts == total_like else f"  (LIKE 命中 {total_like})"
+            print(f"{keyword:<12} {total_fts:>7} {fts_p50:>8.2f}ms {fts_p99:>6.2f}ms {like_p50:>8.2f}ms {like_p99:>6.2f}ms{note}")
+
+
+if __name__ == "__main__":
+    main()
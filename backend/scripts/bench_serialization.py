@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+列表接口序列化微基准（改造前后对比）
+
+使用方法:
+    python scripts/bench_serialization.py [茶叶数量，默认 2000] [每页条数，默认 20] [重复次数，默认 500]
+
+在临时 SQLite 库里写入茶叶，分别测量：
+- feed 一页：旧路径（记录 -> TeaOut -> TeaListOut -> jsonable_encoder -> json.dumps）
+  与新路径（拼接快照里预编码好的 JSON）
+- 后台列表一页：旧路径（ORM Tea 对象 -> TeaOut -> 编码）与新路径（投影查询元组 -> dict -> orjson）
+输出每次的平均耗时和加速比。
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app.core.responses import dumps, join_items
+from app.migrations import init_db
+from app.models import Tea
+from app.schemas import TeaListOut, TeaOut
+from app.services.catalog import TEA_FIELDS, load_snapshot, row_dict, tea_columns
+
+CATEGORIES = ["pu_er", "white", "yancha", "black"]
+INTRO = "选用古树茶青，经传统工艺压制，茶汤金黄透亮，香气高扬，回甘持久。" * 3
+
+
+def fastapi_encode(model) -> bytes:
+    # 与 FastAPI 默认 JSONResponse 的编码方式一致
+    return json.dumps(jsonable_encoder(model), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def timeit(fn, runs: int) -> float:
+    fn()
+    t = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return (time.perf_counter() - t) / runs * 1000
+
+
+def seed(Session, n: int) -> None:
+    now = datetime.utcnow()
+    rows = [
+        dict(
+            name=f"茶叶 {i}",
+            category=CATEGORIES[i % len(CATEGORIES)],
+            year=2000 + i % 25,
+            origin="云南西双版纳",
+            spec="357g/饼",
+            price_min=100 + i % 500,
+            price_max=600 + i % 500,
+            intro=INTRO,
+            cover_url=f"/uploads/{i:032x}.jpg",
+            status="online",
+            weight=i % 100,
+            created_at=now - timedelta(minutes=i),
+            updated_at=now - timedelta(minutes=i),
+        )
+        for i in range(n)
+    ]
+    with Session() as db:
+        db.execute(insert(Tea), rows)
+        db.commit()
+
+
+def report(name: str, before: float, after: float) -> None:
+    print(f"{name}: 旧 {before:.3f} ms -> 新 {after:.3f} ms（{before / after:.1f}x）")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+    page_size = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    runs = int(sys.argv[3]) if len(sys.argv) > 3 else 500
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        init_db(engine)
+        Session = sessionmaker(bind=engine)
+        seed(Session, n)
+
+        with Session() as db:
+            snap = load_snapshot(db, 1)
+        records = list(snap.by_id.values())[:page_size]
+
+        def feed_before():
+            items = [rec.to_out() for rec in records]
+            return fastapi_encode(TeaListOut(items=items, page=1, page_size=page_size, total=n))
+
+        def feed_after():
+            return join_items("items", (rec.json for rec in records), page=1, page_size=page_size, total=n)
+
+        assert json.loads(feed_before())["items"] == json.loads(feed_after())["items"]
+        report(f"feed 一页（{page_size} 条）", timeit(feed_before, runs), timeit(feed_after, runs))
+
+        def admin_before():
+            with Session() as db:
+                rows = db.execute(select(Tea).order_by(Tea.updated_at.desc()).limit(page_size)).scalars().all()
+                items = [TeaOut(**{name: getattr(r, name) for name in TEA_FIELDS}) for r in rows]
+            return fastapi_encode(TeaListOut(items=items, page=1, page_size=page_size, total=n))
+
+        def admin_after():
+            with Session() as db:
+                rows = db.execute(select(*tea_columns()).order_by(Tea.updated_at.desc()).limit(page_size)).all()
+            return dumps({"items": [row_dict(r) for r in rows], "page": 1, "page_size": page_size, "total": n})
+
+        assert json.loads(admin_before())["items"] == json.loads(admin_after())["items"]
+        report(f"后台列表一页（{page_size} 条，含查询）", timeit(admin_before, runs), timeit(admin_after, runs))
+
+
+if __name__ == "__main__":
+    main()
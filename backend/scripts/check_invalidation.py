@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+跨 worker 缓存失效检查
+
+使用方法:
+    python scripts/check_invalidation.py [WORKERS]
+
+在临时目录里建一个 SQLite 库和代数计数文件，启动 WORKERS 个（默认 2）独立进程，
+模拟 uvicorn 多 worker：每个进程各自持有目录快照，轮流由其中一个进程写库并 bump，
+确认其余进程下一次读取就能看到新数据；最后并发 bump，确认计数不丢。任一不符合时以非零状态退出。
+"""
+
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.migrations import init_db
+from app.models import Tea
+from app.services.catalog import Catalog
+from app.services.generations import GenerationBus
+
+BUMPS_PER_WORKER = 500
+
+
+def _tea(name: str) -> dict:
+    now = datetime.utcnow()
+    return dict(
+        name=name, category="绿茶", year=2024, origin="杭州", spec="50g", cover_url="", status="online",
+        weight=0, created_at=now, updated_at=now,
+    )
+
+
+def worker(idx: int, n: int, db_url: str, bus_path: str, barrier, results) -> None:
+    engine = create_engine(db_url, connect_args={"check_same_thread": False})
+    Session = sessionmaker(bind=engine)
+    catalog = Catalog(GenerationBus(bus_path))
+    errors = []
+
+    # 每轮由一个进程写入并 bump，其余进程随后读取
+    for rnd in range(n * 2):
+        writer_idx = rnd % n
+        with Session() as db:
+            catalog.get(db)
+        barrier.wait()
+        if idx == writer_idx:
+            with Session() as db:
+                db.execute(insert(Tea), [_tea(f"r{rnd}")])
+                db.commit()
+            catalog.bump()
+        barrier.wait()
+        with Session() as db:
+            snap = catalog.get(db)
+        names = {r.name for r in snap.by_id.values()}
+        if f"r{rnd}" not in names:
+            errors.append(f"round {rnd}: worker {idx} missed write from worker {writer_idx}")
+
+    barrier.wait()
+    for _ in range(BUMPS_PER_WORKER):
+        catalog.bump()
+    barrier.wait()
+    results.put((idx, catalog.version, errors))
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_url = f"sqlite:///{os.path.join(tmp, 'app.db')}"
+        bus_path = os.path.join(tmp, "generations.bin")
+        init_db(create_engine(db_url))
+        start = GenerationBus(bus_path).get("catalog")
+
+        ctx = mp.get_context("spawn")
+        barrier = ctx.Barrier(n)
+        results = ctx.Queue()
+        procs = [ctx.Process(target=worker, args=(i, n, db_url, bus_path, barrier, results)) for i in range(n)]
+        for p in procs:
+            p.start()
+        out = [results.get(timeout=60) for _ in procs]
+        for p in procs:
+            p.join()
+
+    failed = False
+    expected = start + n * 2 + n * BUMPS_PER_WORKER
+    for idx, version, errors in sorted(out):
+        for e in errors:
+            print(f"✗ {e}")
+            failed = True
+        ok = version == expected
+        failed |= not ok
+        print(f"{'✓' if ok else '✗'} worker {idx}: 看到版本 {version}（期望 {expected}）")
+
+    if failed:
+        sys.exit(1)
+    print(f"✓ {n} 个 worker 均及时看到其他进程的目录变更，并发 bump 无丢失")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+热点查询的执行计划回归检查
+
+使用方法:
+    python scripts/check_query_plans.py
+
+在临时 SQLite 库上建表并执行迁移，对每条热点查询跑 EXPLAIN QUERY PLAN，
+确认命中预期索引、没有退化成全表扫描；任一不符合时以非零状态退出。
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import create_engine, func, select
+
+from app.api.public import search_page_query, search_query
+from app.migrations import init_db
+from app.services.catalog import seq_changes_query, seq_tombstones_query, tea_changes_query, tombstones_query
+from app.services.importer import existing_by_name_query
+from app.services.ranking import personal_history_query, rank_rows_query
+from app.services.search import search_hits
+from app.services.today_feedback import today_feedback_query
+from app.services.stats import feedback_by_tea_query, impressions_by_day_query, impressions_by_tea_query
+
+START = datetime(2026, 1, 1)
+END = START + timedelta(days=1)
+
+# (名称, 查询, 表名, 期望索引)
+HOT_QUERIES = [
+    ("list_teas 今日已反馈", today_feedback_query("u1", START, END), "feedback", "ix_feedback_user_created"),
+    ("个性化历史", personal_history_query("u1"), "feedback", "ix_feedback_user_created"),
+    ("打分数组加载", rank_rows_query(), "tea", "ix_tea_status_category_weight"),
+    ("增量同步 变更", tea_changes_query(START), "tea", "ix_tea_updated_at"),
+    ("增量同步 墓碑", tombstones_query(START), "tea_tombstone", "ix_tea_tombstone_deleted_at"),
+    ("目录增量刷新 变更", seq_changes_query(0), "tea", "ix_tea_change_seq"),
+    ("目录增量刷新 墓碑", seq_tombstones_query(0), "tea_tombstone", "ix_tea_tombstone_change_seq"),
+    # 全文索引是虚拟表，计划里是 "SCAN tea_fts VIRTUAL TABLE INDEX 0:M..."（M 即 MATCH）
+    ("关键词搜索 计数", select(func.count()).select_from(search_query(search_hits("老班章")).subquery()), "tea_fts", "INDEX 0:M"),
+    ("关键词搜索 分页", search_page_query(search_hits("老班章")).limit(20), "tea_fts", "INDEX 0:M"),
+    ("导入 按自然键查已有", existing_by_name_query(["老班章", "白毫银针"]), "tea", "ix_tea_natural_key"),
+    ("tea_stats 重算 pv", impressions_by_tea_query(), "event", "ix_event_type_tea"),
+    ("tea_stats 重算反馈", feedback_by_tea_query(), "feedback", "ix_feedback_tea_action_created"),
+    ("daily_tea_stats 回填 pv", impressions_by_day_query(), "event", "ix_event_type_created"),
+]
+
+
+def explain(conn, stmt) -> list:
+    compiled = stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True})
+    rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}").all()
+    return [r[-1] for r in rows]
+
+
+def check(plan: list, table: str, index: str) -> bool:
+    # 期望的索引要出现，且该表不能有不带索引的 SCAN
+    uses_index = any(index in line for line in plan)
+    bare_scan = any(line.startswith(f"SCAN {table}") and "INDEX" not in line for line in plan)
+    return uses_index and not bare_scan
+
+
+def main():
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        engine = create_engine(f"sqlite:///{path}")
+        init_db(engine)
+
+        failed = 0
+        with engine.connect() as conn:
+            for name, stmt, table, index in HOT_QUERIES:
+                plan = explain(conn, stmt)
+                ok = check(plan, table, index)
+                failed += 0 if ok else 1
+                print(f"{'✓' if ok else '✗'} {name}: 期望 {index}")
+                for line in plan:
+                    print(f"    {line}")
+        engine.dispose()
+    finally:
+        os.remove(path)
+
+    if failed:
+        print(f"\n{failed} 条查询未命中预期索引", file=sys.stderr)
+        sys.exit(1)
+    print("\n全部热点查询命中索引")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+从 event / feedback 原始记录重算统计计数表
+
+使用方法:
+    python scripts/rebuild_stats.py
+
+计数表平时随写入增量维护；在手工修数、导入历史数据或怀疑计数漂移时运行本脚本全量重算。
+"""
+
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.db import SessionLocal, engine
+from app.migrations import init_db
+from app.services.stats import rebuild_daily_tea_stats, rebuild_tea_stats
+
+
+def main():
+    init_db(engine)
+
+    with SessionLocal() as db:
+        n = rebuild_tea_stats(db)
+        n_daily = rebuild_daily_tea_stats(db)
+        db.commit()
+
+    print(f"✓ tea_stats 已重算，共 {n} 条")
+    print(f"✓ daily_tea_stats 已回填，共 {n_daily} 条")
+
+
+if __name__ == "__main__":
+    main()